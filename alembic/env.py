@@ -5,7 +5,7 @@ from sqlalchemy import engine_from_config, pool
 
 from app.core.config import settings
 from app.core.database import Base
-from app.models import user, file, admin_audit_log  # noqa: F401
+from app.models import user, file, admin_audit_log, stats_rollup, revoked_token, storage_blob  # noqa: F401
 
 config = context.config
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("+aiosqlite", ""))
@@ -0,0 +1,41 @@
+"""file stats daily rollup
+
+Revision ID: 20261019_0002
+Revises: 20260212_0001
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0002"
+down_revision: Union[str, None] = "20260212_0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "file_stats_daily",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(length=50), nullable=False),
+        sa.Column("bucket_date", sa.Date(), nullable=False),
+        sa.Column("uploads", sa.Integer(), nullable=False),
+        sa.Column("upload_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("live_files", sa.Integer(), nullable=False),
+        sa.Column("live_bytes", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "bucket_date", name="uq_file_stats_daily_user_date"),
+    )
+    op.create_index("ix_file_stats_daily_user_id", "file_stats_daily", ["user_id"], unique=False)
+    op.create_index("ix_file_stats_daily_bucket_date", "file_stats_daily", ["bucket_date"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_file_stats_daily_bucket_date", table_name="file_stats_daily")
+    op.drop_index("ix_file_stats_daily_user_id", table_name="file_stats_daily")
+    op.drop_table("file_stats_daily")
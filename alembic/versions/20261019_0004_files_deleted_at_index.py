@@ -0,0 +1,25 @@
+"""index files.deleted_at for soft delete
+
+Revision ID: 20261019_0004
+Revises: 20261019_0003
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0004"
+down_revision: Union[str, None] = "20261019_0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_files_deleted_at", "files", ["deleted_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_deleted_at", table_name="files")
@@ -0,0 +1,36 @@
+"""content-addressable storage blobs
+
+Revision ID: 20261019_0005
+Revises: 20261019_0004
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0005"
+down_revision: Union[str, None] = "20261019_0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "storage_blobs",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("path", sa.String(length=500), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+    op.create_index("ix_storage_blobs_path", "storage_blobs", ["path"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_storage_blobs_path", table_name="storage_blobs")
+    op.drop_table("storage_blobs")
@@ -0,0 +1,50 @@
+"""per-user storage quota and usage counters
+
+Revision ID: 20261019_0006
+Revises: 20261019_0005
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0006"
+down_revision: Union[str, None] = "20261019_0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("storage_quota_bytes", sa.BigInteger(), nullable=True))
+    op.add_column(
+        "users",
+        sa.Column("storage_bytes_used", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "users",
+        sa.Column("storage_file_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # 按现有文件回填用量
+    op.execute(
+        """
+        UPDATE users SET
+            storage_bytes_used = (
+                SELECT COALESCE(SUM(file_size), 0) FROM files
+                WHERE files.user_id = users.id AND files.deleted_at IS NULL
+            ),
+            storage_file_count = (
+                SELECT COUNT(id) FROM files
+                WHERE files.user_id = users.id AND files.deleted_at IS NULL
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "storage_file_count")
+    op.drop_column("users", "storage_bytes_used")
+    op.drop_column("users", "storage_quota_bytes")
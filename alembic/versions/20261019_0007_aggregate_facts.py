@@ -0,0 +1,44 @@
+"""aggregate fact table for processed results
+
+Revision ID: 20261019_0007
+Revises: 20261019_0006
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0007"
+down_revision: Union[str, None] = "20261019_0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "aggregate_facts",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("file_id", sa.String(length=50), nullable=False),
+        sa.Column("user_id", sa.String(length=50), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("measure", sa.String(length=255), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_aggregate_facts_file_id", "aggregate_facts", ["file_id"], unique=False)
+    op.create_index(
+        "ix_aggregate_facts_user_measure_period",
+        "aggregate_facts",
+        ["user_id", "measure", "period"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_aggregate_facts_user_measure_period", table_name="aggregate_facts")
+    op.drop_index("ix_aggregate_facts_file_id", table_name="aggregate_facts")
+    op.drop_table("aggregate_facts")
@@ -0,0 +1,28 @@
+"""workbook parse estimate on files
+
+Revision ID: 20261019_0008
+Revises: 20261019_0007
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0008"
+down_revision: Union[str, None] = "20261019_0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("estimated_rows", sa.BigInteger(), nullable=True))
+    op.add_column("files", sa.Column("estimated_memory_bytes", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "estimated_memory_bytes")
+    op.drop_column("files", "estimated_rows")
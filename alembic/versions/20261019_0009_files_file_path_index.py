@@ -0,0 +1,25 @@
+"""index files.file_path for storage reconcile paging
+
+Revision ID: 20261019_0009
+Revises: 20261019_0008
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0009"
+down_revision: Union[str, None] = "20261019_0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_files_file_path", "files", ["file_path"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_file_path", table_name="files")
@@ -1,16 +1,16 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
-import os
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import and_, delete, desc, func, or_, select
+from sqlalchemy import and_, desc, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
-from app.core.security import get_password_hash, verify_token
+from app.core.database import engine, get_db
+from app.core.principal_cache import principal_cache
+from app.core.security import get_password_hash_async, resolve_user, verify_token
 from app.models.admin_audit_log import AdminAuditLog
 from app.models.file import File as FileModel, FileStatus, FileType
 from app.models.user import User
@@ -27,9 +27,15 @@ from app.schemas.admin import (
     AdminUserUpdate,
     CleanupConfigResponse,
     CleanupRunResponse,
+    StorageReconcileResponse,
 )
 from app.schemas.response import ApiResponse
 from app.services.cleanup import cleanup_expired_files
+from app.services.search_index import file_name_search_condition, rebuild_search_index, user_search_condition
+from app.services.file_reaper import run_reaper, soft_delete_files
+from app.services.quota import effective_quota, reconcile_user_usage
+from app.services.stats_rollup import read_stats, rebuild_stats_rollup
+from app.services.storage_reconcile import reconcile_storage
 
 router = APIRouter()
 optional_security = HTTPBearer(auto_error=False)
@@ -64,8 +70,7 @@ async def _get_admin_actor(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效认证凭据")
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await resolve_user(db, user_id)
     if not user or not user.is_active or not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无管理员权限")
 
@@ -101,6 +106,9 @@ def _to_admin_user_item(user: User) -> AdminUserItem:
         isAdmin=user.is_admin,
         createdAt=user.created_at,
         lastLoginAt=user.last_login_at,
+        quotaBytes=effective_quota(user.storage_quota_bytes),
+        storageUsed=user.storage_bytes_used or 0,
+        storageFileCount=user.storage_file_count or 0,
     )
 
 
@@ -131,8 +139,12 @@ async def list_users(
 ):
     conditions = []
     if keyword:
-        like = f"%{keyword}%"
-        conditions.append(or_(User.username.like(like), User.nickname.like(like)))
+        fts_condition = user_search_condition(keyword)
+        if fts_condition is not None:
+            conditions.append(fts_condition)
+        else:
+            like = f"%{keyword}%"
+            conditions.append(or_(User.username.like(like), User.nickname.like(like)))
     if isActive is not None:
         conditions.append(User.is_active == isActive)
 
@@ -172,7 +184,7 @@ async def create_user(
 
     user = User(
         username=payload.username,
-        password=get_password_hash(payload.password),
+        password=await get_password_hash_async(payload.password),
         nickname=payload.nickname,
         avatar="",
         is_active=payload.is_active,
@@ -204,16 +216,10 @@ async def get_user_detail(
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
 
-    file_stats = await db.execute(
-        select(func.count(FileModel.id), func.coalesce(func.sum(FileModel.file_size), 0)).where(
-            FileModel.user_id == user_id
-        )
-    )
-    file_count, total_size = file_stats.one()
     response_data = AdminUserDetailResponse(
         user=_to_admin_user_item(user),
-        fileCount=file_count,
-        totalFileSize=total_size,
+        fileCount=user.storage_file_count or 0,
+        totalFileSize=user.storage_bytes_used or 0,
     )
     return ApiResponse(code=200, data=response_data.model_dump())
 
@@ -236,7 +242,9 @@ async def update_user(
     if payload.is_admin is not None:
         user.is_admin = payload.is_admin
     if payload.reset_password:
-        user.password = get_password_hash(payload.reset_password)
+        user.password = await get_password_hash_async(payload.reset_password)
+    if payload.storage_quota_bytes is not None:
+        user.storage_quota_bytes = None if payload.storage_quota_bytes < 0 else payload.storage_quota_bytes
 
     await _write_audit_log(
         db,
@@ -247,6 +255,7 @@ async def update_user(
         details=payload.model_dump(exclude_none=True, exclude={"reset_password"}),
     )
     await db.commit()
+    principal_cache.invalidate(user_id)
     await db.refresh(user)
 
     return ApiResponse(code=200, message="更新用户成功", data=_to_admin_user_item(user).model_dump())
@@ -255,6 +264,7 @@ async def update_user(
 @router.delete("/users/{user_id}", response_model=ApiResponse)
 async def delete_user(
     user_id: str,
+    background_tasks: BackgroundTasks,
     actor: str = Depends(_get_admin_actor),
     db: AsyncSession = Depends(get_db),
 ):
@@ -262,19 +272,7 @@ async def delete_user(
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
 
-    user_files = (
-        await db.execute(select(FileModel).where(FileModel.user_id == user_id))
-    ).scalars().all()
-    deleted_physical = 0
-    for item in user_files:
-        if item.file_path and os.path.exists(item.file_path):
-            try:
-                os.remove(item.file_path)
-                deleted_physical += 1
-            except Exception:
-                pass
-
-    await db.execute(delete(FileModel).where(FileModel.user_id == user_id))
+    deleted_files = await soft_delete_files(db, FileModel.user_id == user_id)
     await db.delete(user)
     await _write_audit_log(
         db,
@@ -282,9 +280,11 @@ async def delete_user(
         action="delete_user",
         target_type="user",
         target_id=user_id,
-        details={"deletedFiles": len(user_files), "deletedPhysicalFiles": deleted_physical},
+        details={"deletedFiles": deleted_files},
     )
     await db.commit()
+    principal_cache.invalidate(user_id)
+    background_tasks.add_task(run_reaper)
     return ApiResponse(code=200, message="删除用户成功")
 
 
@@ -301,7 +301,7 @@ async def list_files(
     _: str = Depends(_get_admin_actor),
     db: AsyncSession = Depends(get_db),
 ):
-    conditions = []
+    conditions = [FileModel.deleted_at.is_(None)]
     if userId:
         conditions.append(FileModel.user_id == userId)
     if fileType:
@@ -309,17 +309,22 @@ async def list_files(
     if statusFilter:
         conditions.append(FileModel.status == statusFilter)
     if keyword:
-        conditions.append(FileModel.file_name.like(f"%{keyword}%"))
+        fts_condition = file_name_search_condition(keyword)
+        if fts_condition is not None:
+            conditions.append(fts_condition)
+        else:
+            conditions.append(FileModel.file_name.like(f"%{keyword}%"))
     if dateFrom:
         conditions.append(FileModel.upload_time >= dateFrom)
     if dateTo:
         conditions.append(FileModel.upload_time <= dateTo)
 
-    count_stmt = select(func.count()).select_from(FileModel)
-    data_stmt = select(FileModel, User.username).join(User, User.id == FileModel.user_id, isouter=True)
-    if conditions:
-        count_stmt = count_stmt.where(and_(*conditions))
-        data_stmt = data_stmt.where(and_(*conditions))
+    count_stmt = select(func.count()).select_from(FileModel).where(and_(*conditions))
+    data_stmt = (
+        select(FileModel, User.username)
+        .join(User, User.id == FileModel.user_id, isouter=True)
+        .where(and_(*conditions))
+    )
 
     total = (await db.execute(count_stmt)).scalar_one()
     rows = await db.execute(
@@ -334,25 +339,14 @@ async def list_files(
 @router.post("/files/batch-delete", response_model=ApiResponse)
 async def batch_delete_files(
     payload: AdminFileBatchDeleteRequest,
+    background_tasks: BackgroundTasks,
     actor: str = Depends(_get_admin_actor),
     db: AsyncSession = Depends(get_db),
 ):
-    rows = (
-        await db.execute(select(FileModel).where(FileModel.id.in_(payload.fileIds)))
-    ).scalars().all()
-    if not rows:
+    deleted = await soft_delete_files(db, FileModel.id.in_(payload.fileIds))
+    if not deleted:
         return ApiResponse(code=200, message="没有可删除文件", data={"deleted": 0})
 
-    deleted = 0
-    for item in rows:
-        if item.file_path and os.path.exists(item.file_path):
-            try:
-                os.remove(item.file_path)
-            except Exception:
-                pass
-        await db.delete(item)
-        deleted += 1
-
     await _write_audit_log(
         db,
         actor=actor,
@@ -362,6 +356,7 @@ async def batch_delete_files(
         details={"deleted": deleted},
     )
     await db.commit()
+    background_tasks.add_task(run_reaper)
     return ApiResponse(code=200, message="批量删除成功", data={"deleted": deleted})
 
 
@@ -373,7 +368,7 @@ async def get_file_detail(
 ):
     row = await db.execute(
         select(FileModel, User.username).join(User, User.id == FileModel.user_id, isouter=True).where(
-            FileModel.id == file_id
+            FileModel.id == file_id, FileModel.deleted_at.is_(None)
         )
     )
     result = row.one_or_none()
@@ -390,7 +385,9 @@ async def update_file(
     actor: str = Depends(_get_admin_actor),
     db: AsyncSession = Depends(get_db),
 ):
-    file_record = (await db.execute(select(FileModel).where(FileModel.id == file_id))).scalar_one_or_none()
+    file_record = (
+        await db.execute(select(FileModel).where(FileModel.id == file_id, FileModel.deleted_at.is_(None)))
+    ).scalar_one_or_none()
     if not file_record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文件不存在")
 
@@ -414,19 +411,14 @@ async def update_file(
 @router.delete("/files/{file_id}", response_model=ApiResponse)
 async def delete_file(
     file_id: str,
+    background_tasks: BackgroundTasks,
     actor: str = Depends(_get_admin_actor),
     db: AsyncSession = Depends(get_db),
 ):
-    file_record = (await db.execute(select(FileModel).where(FileModel.id == file_id))).scalar_one_or_none()
-    if not file_record:
+    deleted = await soft_delete_files(db, FileModel.id == file_id)
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="文件不存在")
 
-    if file_record.file_path and os.path.exists(file_record.file_path):
-        try:
-            os.remove(file_record.file_path)
-        except Exception:
-            pass
-    await db.delete(file_record)
     await _write_audit_log(
         db,
         actor=actor,
@@ -435,6 +427,7 @@ async def delete_file(
         target_id=file_id,
     )
     await db.commit()
+    background_tasks.add_task(run_reaper)
     return ApiResponse(code=200, message="删除文件成功")
 
 
@@ -443,25 +436,66 @@ async def get_stats(
     _: str = Depends(_get_admin_actor),
     db: AsyncSession = Depends(get_db),
 ):
-    total_users = (await db.execute(select(func.count()).select_from(User))).scalar_one()
-    total_files = (await db.execute(select(func.count()).select_from(FileModel))).scalar_one()
-    total_storage = (
-        await db.execute(select(func.coalesce(func.sum(FileModel.file_size), 0)))
-    ).scalar_one()
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    uploads_last_7_days = (
-        await db.execute(select(func.count()).select_from(FileModel).where(FileModel.upload_time >= seven_days_ago))
-    ).scalar_one()
-
-    data = AdminStatsResponse(
-        totalUsers=total_users,
-        totalFiles=total_files,
-        totalStorageBytes=total_storage,
-        uploadsLast7Days=uploads_last_7_days,
-    )
+    data = AdminStatsResponse(**(await read_stats(db)))
     return ApiResponse(code=200, data=data.model_dump())
 
 
+@router.post("/stats/reconcile", response_model=ApiResponse)
+async def reconcile_stats(
+    actor: str = Depends(_get_admin_actor),
+    db: AsyncSession = Depends(get_db),
+):
+    rows = await rebuild_stats_rollup(db)
+    await _write_audit_log(
+        db,
+        actor=actor,
+        action="reconcile_stats",
+        target_type="system",
+        target_id="stats",
+        details={"rows": rows},
+    )
+    await db.commit()
+    return ApiResponse(code=200, message="统计对账完成", data={"rows": rows})
+
+
+@router.post("/quota/reconcile", response_model=ApiResponse)
+async def reconcile_quota(
+    actor: str = Depends(_get_admin_actor),
+    db: AsyncSession = Depends(get_db),
+):
+    users = await reconcile_user_usage(db)
+    await _write_audit_log(
+        db,
+        actor=actor,
+        action="reconcile_quota",
+        target_type="system",
+        target_id="quota",
+        details={"users": users},
+    )
+    await db.commit()
+    return ApiResponse(code=200, message="配额用量对账完成", data={"users": users})
+
+
+@router.post("/search-index/rebuild", response_model=ApiResponse)
+async def rebuild_search(
+    actor: str = Depends(_get_admin_actor),
+    db: AsyncSession = Depends(get_db),
+):
+    """全量重建关键词搜索索引（VACUUM 或 rowid 变化后执行）"""
+    rebuilt = await rebuild_search_index(engine)
+    await _write_audit_log(
+        db,
+        actor=actor,
+        action="rebuild_search_index",
+        target_type="system",
+        target_id="search_index",
+        details={"rebuilt": rebuilt},
+    )
+    await db.commit()
+    message = "搜索索引已重建" if rebuilt else "当前数据库不支持搜索索引，无需重建"
+    return ApiResponse(code=200, message=message, data={"rebuilt": rebuilt})
+
+
 @router.get("/cleanup/config", response_model=ApiResponse)
 async def get_cleanup_config(_: str = Depends(_get_admin_actor)):
     data = CleanupConfigResponse(
@@ -489,3 +523,26 @@ async def run_cleanup(
     await db.commit()
     response = CleanupRunResponse(**result)
     return ApiResponse(code=200, message="清理任务执行完成", data=response.model_dump())
+
+
+@router.post("/storage/reconcile", response_model=ApiResponse)
+async def run_storage_reconcile(
+    background_tasks: BackgroundTasks,
+    repair: bool = Query(default=False),
+    actor: str = Depends(_get_admin_actor),
+    db: AsyncSession = Depends(get_db),
+):
+    report = await reconcile_storage(db, repair=repair)
+    response = StorageReconcileResponse(**report)
+    await _write_audit_log(
+        db,
+        actor=actor,
+        action="reconcile_storage",
+        target_type="system",
+        target_id="storage",
+        details=response.model_dump(mode="json", exclude={"orphanSamples", "missingSamples"}),
+    )
+    await db.commit()
+    if repair:
+        background_tasks.add_task(run_reaper)
+    return ApiResponse(code=200, message="存储对账完成", data=response.model_dump())
@@ -1,15 +1,48 @@
-from fastapi import APIRouter, HTTPException, status
-import httpx
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.background import BackgroundTask
 
 from app.core.config import settings
+from app.core.security import verify_token
 from app.schemas.ai import ChatRequest, ChatResponse
 from app.schemas.response import ApiResponse
+from app.services.ai_chat import (
+    build_request_body,
+    cached_complete,
+    cached_reply,
+    close_stream,
+    open_stream,
+    relay_stream,
+    replay_cached,
+)
 
 router = APIRouter()
+optional_security = HTTPBearer(auto_error=False)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # 关闭 nginx 等反向代理的响应缓冲，增量才能及时到达客户端
+    "X-Accel-Buffering": "no",
+}
+
+
+def _requester_key(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+) -> str:
+    """准入队列按请求方分组：已登录按用户，否则按客户端 IP"""
+    user_id = verify_token(credentials.credentials) if credentials else None
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
 
 
 @router.post("/chat", response_model=ApiResponse)
-async def ai_chat(payload: ChatRequest):
+async def ai_chat(payload: ChatRequest, requester: str = Depends(_requester_key)):
+    """机器人对话；stream 为 true 时以 SSE（text/event-stream）逐段返回"""
     if not settings.AI_API_KEY:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -17,38 +50,26 @@ async def ai_chat(payload: ChatRequest):
         )
 
     model = payload.model or settings.AI_MODEL
-    base_url = settings.AI_BASE_URL.rstrip("/")
-    url = f"{base_url}/chat/completions"
-
-    req_body = {
-        "model": model,
-        "messages": [m.model_dump() for m in payload.messages],
-        "temperature": payload.temperature,
-    }
-    if payload.max_tokens is not None:
-        req_body["max_tokens"] = payload.max_tokens
 
     try:
-        async with httpx.AsyncClient(timeout=settings.AI_TIMEOUT_SECONDS) as client:
-            resp = await client.post(
-                url,
-                headers={
-                    "Authorization": f"Bearer {settings.AI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json=req_body,
+        if payload.stream:
+            body = build_request_body(payload, model, stream=True)
+            reply = await cached_reply(body)
+            if reply is not None:
+                return StreamingResponse(replay_cached(reply, model), media_type="text/event-stream", headers=SSE_HEADERS)
+            resp, ticket = await open_stream(body, requester)
+            return StreamingResponse(
+                relay_stream(resp, ticket, body),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+                # 客户端在推送开始前断开时生成器不会运行，由后台任务关闭上游连接并释放名额
+                background=BackgroundTask(close_stream, resp, ticket),
             )
-        resp.raise_for_status()
-        data = resp.json()
-        choices = data.get("choices") or []
-        if not choices:
-            raise HTTPException(status_code=502, detail="AI 接口返回空结果")
-        reply = choices[0].get("message", {}).get("content", "")
-
-        output = ChatResponse(model=model, reply=reply)
+
+        reply, cached = await cached_complete(build_request_body(payload, model), requester)
+        output = ChatResponse(model=model, reply=reply, cached=cached)
         return ApiResponse(code=200, data=output.model_dump())
-    except httpx.HTTPStatusError as e:
-        detail = e.response.text if e.response is not None else str(e)
-        raise HTTPException(status_code=502, detail=f"AI 请求失败: {detail}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI 服务异常: {str(e)}")
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
 
 from app.core.database import get_db
+from app.core.principal_cache import principal_cache
 from app.core.security import (
-    verify_password, 
-    get_password_hash, 
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
-    get_current_user
+    decode_token,
+    get_current_user,
+    security,
 )
+from app.core.token_revocation import revocation_list
 from app.models.user import User
 from app.schemas.user import UserRegister, UserLogin, UserResponse, UserInfo
 from app.schemas.response import ApiResponse
@@ -30,7 +35,7 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
         )
     
     # 创建新用户
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         username=user_data.username,
         password=hashed_password,
@@ -66,7 +71,7 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == user_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_data.password, user.password):
+    if not user or not await verify_password_async(user_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
@@ -80,6 +85,7 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
 
     user.last_login_at = datetime.utcnow()
     await db.commit()
+    principal_cache.invalidate(user.id)
     await db.refresh(user)
     
     # 生成JWT token
@@ -114,8 +120,18 @@ async def get_profile(current_user: User = Depends(get_current_user)):
     )
 
 @router.post("/logout", response_model=ApiResponse)
-async def logout(current_user: User = Depends(get_current_user)):
-    """退出登录"""
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """退出登录：注销当前令牌"""
+    payload = decode_token(credentials.credentials) or {}
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    # 旧版本签发的令牌没有 jti，只能等待自然过期
+    if jti and exp:
+        await revocation_list.revoke(db, jti, current_user.id, datetime.utcfromtimestamp(exp))
     return ApiResponse(
         code=200,
         message="退出成功"
@@ -1,16 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, desc
-from typing import Optional
+from sqlalchemy import select, desc, func
+from typing import List, Optional, Tuple
+import asyncio
 import os
 import uuid
-from datetime import datetime
-import aiofiles
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.core.config import settings
+from app.core.file_response import ConditionalFileResponse
+from app.core.signed_url import sign_download, verify_download
 from app.models.user import User
 from app.models.file import File as FileModel, FileType, FileStatus
 from app.schemas.file import (
@@ -20,10 +22,44 @@ from app.schemas.file import (
     FileDownloadResponse,
     FilePreviewResponse,
     FileHistoryResponse,
-    FileHistoryItem
+    FileHistoryItem,
+    BatchProcessRequest,
+    BatchJobResponse,
+    BatchUploadFailure,
+    BatchUploadResponse,
+    ConsolidateRequest,
+    ConsolidateResponse,
+    AggregateQueryResponse,
+    QueryStoreInfo,
+    FileQueryRequest,
+    FileQueryResponse,
+    SheetListResponse
 )
 from app.schemas.response import ApiResponse
-from app.services.excel_processor import ExcelProcessor
+from app.services.aggregate_cube import GRANULARITIES, list_measures, query_rollup
+from app.services.batch_jobs import BatchJob, batch_jobs
+from app.services.consolidation import consolidate_files
+from app.services.excel_processor import ExcelProcessor, aggregate_sheet, list_sheets
+from app.services.file_processing import ensure_parse_estimate, process_original_file, run_in_process
+from app.services.file_reaper import run_reaper, soft_delete_files
+from app.services.quota import ensure_quota_available
+from app.services import query_store
+from app.services.result_formats import (
+    RESULT_FORMATS,
+    UnsupportedFormatError,
+    render,
+    restore_render,
+)
+from app.services.result_stream import (
+    CSV_MEDIA_TYPE,
+    XLSX_MEDIA_TYPE,
+    content_disposition,
+    iter_csv,
+    iter_xlsx,
+)
+from app.services.stats_rollup import record_file_added
+from app.services.storage import get_storage
+from app.services.workbook_inspector import WorkbookRejected, exceeds_parse_budget, inspect_workbook
 
 router = APIRouter()
 
@@ -31,6 +67,49 @@ ALLOWED_MIME_TYPES = {
     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     "application/vnd.ms-excel",
     "application/octet-stream",
+    "text/csv",
+    "application/csv",
+    "text/plain",
+}
+
+BATCH_UPLOAD_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                        "process": {"type": "boolean", "default": True},
+                    },
+                }
+            }
+        },
+    }
+}
+
+# 下载接口的 format 参数：xlsx 为存储文件本身，其他格式由处理结果按需生成
+DOWNLOAD_FORMAT_PATTERN = "^(xlsx|csv|json|parquet)$"
+
+# multipart 边界和字段头的余量，用于按 Content-Length 预估文件大小
+UPLOAD_FORM_OVERHEAD = 16 * 1024
+
+# 上传接口自行解析表单（先校验配额再读取请求体），这里补充 OpenAPI 描述
+UPLOAD_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
 }
 
 
@@ -40,12 +119,16 @@ def _infer_excel_extension(filename: str, content_type: str, content: bytes) ->
         return ".xlsx"
     if lower_name.endswith(".xls"):
         return ".xls"
+    if lower_name.endswith(".csv"):
+        return ".csv"
 
     lower_type = (content_type or "").lower()
     if lower_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
         return ".xlsx"
     if lower_type == "application/vnd.ms-excel":
         return ".xls"
+    if lower_type in ("text/csv", "application/csv"):
+        return ".csv"
 
     # xlsx zip magic: PK
     if len(content) >= 2 and content[:2] == b"PK":
@@ -55,13 +138,22 @@ def _infer_excel_extension(filename: str, content_type: str, content: bytes) ->
         return ".xls"
     return ""
 
-@router.post("/upload", response_model=ApiResponse)
-async def upload_file(
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """上传Excel文件"""
+async def _check_declared_size(request: Request, db: AsyncSession, user_id: str, max_bytes: int) -> None:
+    """读取请求体之前先按 Content-Length 检查大小和配额"""
+    try:
+        declared_size = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        declared_size = 0
+    if declared_size > max_bytes + UPLOAD_FORM_OVERHEAD:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"文件大小超过限制({max_bytes / 1024 / 1024}MB)"
+        )
+    await ensure_quota_available(db, user_id, max(declared_size - UPLOAD_FORM_OVERHEAD, 0))
+
+
+async def _store_upload(db: AsyncSession, user_id: str, file: UploadFile) -> FileModel:
+    """校验并保存一个上传文件，写入记录（调用方负责提交）"""
     # 读取文件内容
     content = await file.read()
     file_size = len(content)
@@ -84,58 +176,139 @@ async def upload_file(
     if not file_extension:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="文件格式无法识别，请上传Excel文件(.xlsx/.xls)"
+            detail="文件格式无法识别，请上传Excel或CSV文件(.xlsx/.xls/.csv)"
         )
     if file.content_type and file.content_type.lower() not in ALLOWED_MIME_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"不支持的文件类型: {file.content_type}"
         )
+    await ensure_quota_available(db, user_id, file_size)
 
-    # 生成文件ID和路径
+    # 只读 zip 中央目录，解压后过大的文件（压缩炸弹）在解析前拒绝
+    try:
+        estimate = await asyncio.to_thread(inspect_workbook, content, file_extension)
+    except WorkbookRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    # 生成文件ID
     file_id = f"file_{uuid.uuid4().hex[:12]}"
-    timestamp = datetime.now().strftime("%Y%m")
-    upload_dir = os.path.join(settings.UPLOAD_DIR, timestamp)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # 保存文件
-    safe_filename = f"{file_id}{file_extension}"
-    file_path = os.path.join(upload_dir, safe_filename)
     original_filename = (file.filename or "").strip() or f"{file_id}{file_extension}"
     
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    # 保存文件（相同内容在内容寻址存储中只保存一份）
+    file_path = await get_storage().save_bytes(db, content, file_extension, file_id)
     
     # 创建数据库记录
     new_file = FileModel(
         id=file_id,
-        user_id=current_user.id,
+        user_id=user_id,
         file_name=original_filename,
         file_type=FileType.ORIGINAL,
         file_path=file_path,
         file_size=file_size,
-        status=FileStatus.COMPLETED
+        status=FileStatus.COMPLETED,
+        estimated_rows=estimate["estimatedRows"] if estimate else None,
+        estimated_memory_bytes=estimate["estimatedMemoryBytes"] if estimate else None
     )
     
     db.add(new_file)
+    await record_file_added(db, new_file)
+    return new_file
+
+
+def _to_upload_response(file_record: FileModel) -> FileUploadResponse:
+    return FileUploadResponse(
+        fileId=file_record.id,
+        fileName=file_record.file_name,
+        fileSize=file_record.file_size,
+        filePath=file_record.file_path,
+        uploadTime=file_record.upload_time,
+        status=file_record.status,
+        estimatedRows=file_record.estimated_rows
+    )
+
+
+@router.post("/upload", response_model=ApiResponse, openapi_extra=UPLOAD_OPENAPI_EXTRA)
+async def upload_file(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """上传Excel文件"""
+    await _check_declared_size(request, db, current_user.id, settings.MAX_FILE_SIZE)
+
+    form = await request.form(max_files=1)
+    try:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="请选择要上传的文件"
+            )
+        new_file = await _store_upload(db, current_user.id, file)
+    finally:
+        await form.close()
+
     await db.commit()
     await db.refresh(new_file)
     
-    # 构建响应
-    response_data = FileUploadResponse(
-        fileId=new_file.id,
-        fileName=new_file.file_name,
-        fileSize=new_file.file_size,
-        filePath=new_file.file_path,
-        uploadTime=new_file.upload_time,
-        status=new_file.status
-    )
-    
     return ApiResponse(
         code=200,
         message="上传成功",
-        data=response_data.model_dump()
+        data=_to_upload_response(new_file).model_dump()
+    )
+
+async def _get_owned_file(db: AsyncSession, user_id: str, file_id: str) -> FileModel:
+    result = await db.execute(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == user_id,
+            FileModel.deleted_at.is_(None)
+        )
     )
+    file_record = result.scalar_one_or_none()
+    if not file_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件不存在"
+        )
+    return file_record
+
+async def _read_sheet_names(path: str) -> List[str]:
+    try:
+        return await asyncio.to_thread(list_sheets, path)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+def _ensure_sheets_exist(available: List[str], requested: List[str]) -> None:
+    missing = [name for name in requested if name not in available]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"工作表不存在: {', '.join(missing)}"
+        )
+
+async def _ensure_within_parse_budget(db: AsyncSession, file_record: FileModel) -> None:
+    """整表载入的操作（预览、建立查询索引）不接受估算内存超出预算的文件"""
+    try:
+        estimate = await ensure_parse_estimate(file_record)
+    except WorkbookRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await db.commit()
+    if exceeds_parse_budget(estimate):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="文件数据量过大，暂不支持该操作，请直接处理（汇总）文件"
+        )
 
 @router.post("/process", response_model=ApiResponse)
 async def process_file(
@@ -148,7 +321,8 @@ async def process_file(
     result = await db.execute(
         select(FileModel).where(
             FileModel.id == request.fileId,
-            FileModel.user_id == current_user.id
+            FileModel.user_id == current_user.id,
+            FileModel.deleted_at.is_(None)
         )
     )
     original_file = result.scalar_one_or_none()
@@ -165,85 +339,286 @@ async def process_file(
             detail="文件已被删除"
         )
     
+    sheets = None
+    if request.sheets or request.allSheets:
+        available = await _read_sheet_names(original_file.file_path)
+        sheets = available if request.allSheets else list(dict.fromkeys(request.sheets))
+        _ensure_sheets_exist(available, sheets)
+
     try:
-        # 更新状态为处理中
-        original_file.status = FileStatus.PROCESSING
-        await db.commit()
-        
-        # 处理Excel文件
-        processor = ExcelProcessor(original_file.file_path)
-        processor.load_file()
-        result_data = processor.process_by_accounting_month()
-        
-        processed_df = result_data["df"]
-        summary = result_data["summary"]
-        
-        # 生成处理后的文件
-        processed_file_id = f"{original_file.id}_processed"
-        processed_filename = f"{os.path.splitext(original_file.file_name)[0]}_处理后.xlsx"
-        
-        timestamp = datetime.now().strftime("%Y%m")
-        upload_dir = os.path.join(settings.UPLOAD_DIR, timestamp)
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        processed_file_path = os.path.join(upload_dir, f"{processed_file_id}.xlsx")
-        processor.save_processed_file(processed_file_path, processed_df)
-        
-        # 获取文件大小
-        processed_file_size = os.path.getsize(processed_file_path)
-        
-        # 创建处理后文件的数据库记录
-        processed_file = FileModel(
-            id=processed_file_id,
-            user_id=current_user.id,
-            file_name=processed_filename,
-            file_type=FileType.PROCESSED,
-            file_path=processed_file_path,
-            file_size=processed_file_size,
-            original_file_id=original_file.id,
-            process_time=datetime.now(),
-            status=FileStatus.COMPLETED
+        processed_file, summary = await process_original_file(db, original_file, sheets, request.sheetMode)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"文件处理失败: {str(e)}"
         )
-        
-        db.add(processed_file)
-        
-        # 更新原文件状态
-        original_file.status = FileStatus.COMPLETED
-        original_file.process_time = datetime.now()
-        
-        await db.commit()
-        await db.refresh(processed_file)
-        
-        # 构建响应
-        response_data = FileProcessResponse(
-            originalFileId=original_file.id,
-            processedFileId=processed_file.id,
-            processedFileName=processed_file.file_name,
-            processedFilePath=processed_file.file_path,
-            processTime=processed_file.process_time,
-            status=processed_file.status,
-            summary=summary
+    
+    # 构建响应
+    response_data = FileProcessResponse(
+        originalFileId=original_file.id,
+        processedFileId=processed_file.id,
+        processedFileName=processed_file.file_name,
+        processedFilePath=processed_file.file_path,
+        processTime=processed_file.process_time,
+        status=processed_file.status,
+        summary=summary
+    )
+    
+    return ApiResponse(
+        code=200,
+        message="处理完成",
+        data=response_data.model_dump()
+    )
+
+@router.post("/batch/upload", response_model=ApiResponse, openapi_extra=BATCH_UPLOAD_OPENAPI_EXTRA)
+async def batch_upload(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """一次上传多个文件（字段名 files），默认上传后立即启动批量处理"""
+    await _check_declared_size(request, db, current_user.id, settings.MAX_FILE_SIZE * settings.BATCH_MAX_FILES)
+
+    form = await request.form(max_files=settings.BATCH_MAX_FILES)
+    uploaded: List[FileModel] = []
+    failed: List[BatchUploadFailure] = []
+    try:
+        files = [item for item in form.getlist("files") if isinstance(item, UploadFile)]
+        if not files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="请选择要上传的文件"
+            )
+        should_process = str(form.get("process", "true")).lower() not in ("false", "0", "no")
+
+        # 单个文件校验失败不影响其他文件
+        for file in files:
+            try:
+                new_file = await _store_upload(db, current_user.id, file)
+                await db.commit()
+            except HTTPException as e:
+                await db.rollback()
+                failed.append(BatchUploadFailure(fileName=file.filename or "", error=e.detail))
+                continue
+            uploaded.append(new_file)
+    finally:
+        await form.close()
+
+    for new_file in uploaded:
+        await db.refresh(new_file)
+
+    job = None
+    if should_process and uploaded:
+        job = batch_jobs.start(
+            BatchJob(current_user.id, [(item.id, item.file_name) for item in uploaded])
+        ).snapshot()
+
+    response_data = BatchUploadResponse(
+        uploaded=[_to_upload_response(item) for item in uploaded],
+        failed=failed,
+        job=job
+    )
+    return ApiResponse(
+        code=200,
+        message=f"上传完成：成功 {len(uploaded)} 个，失败 {len(failed)} 个",
+        data=response_data.model_dump()
+    )
+
+@router.post("/batch/process", response_model=ApiResponse)
+async def batch_process(
+    request: BatchProcessRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """批量处理已上传的文件，立即返回任务进度，通过 GET /batch/{jobId} 查询"""
+    file_ids = list(dict.fromkeys(request.fileIds))
+    if len(file_ids) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多处理 {settings.BATCH_MAX_FILES} 个文件"
         )
-        
-        return ApiResponse(
-            code=200,
-            message="处理完成",
-            data=response_data.model_dump()
+
+    job = batch_jobs.start(BatchJob(current_user.id, [(file_id, "") for file_id in file_ids]))
+    return ApiResponse(
+        code=200,
+        message="批量处理已开始",
+        data=BatchJobResponse(**job.snapshot()).model_dump()
+    )
+
+@router.get("/batch/{job_id}", response_model=ApiResponse)
+async def get_batch_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """查询批量处理进度和每个文件的结果"""
+    job = batch_jobs.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="批量任务不存在或已过期"
+        )
+    return ApiResponse(
+        code=200,
+        data=BatchJobResponse(**job.snapshot()).model_dump()
+    )
+
+@router.post("/consolidate", response_model=ApiResponse)
+async def consolidate(
+    request: ConsolidateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """把多个台账合并为一份按会计月汇总的结果，列按列名对齐，缺失列补 0"""
+    file_ids = list(dict.fromkeys(request.fileIds))
+    if len(file_ids) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多合并 {settings.BATCH_MAX_FILES} 个文件"
+        )
+
+    try:
+        consolidated_file, summary, sources = await consolidate_files(
+            db, current_user.id, file_ids, request.fileName
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"合并失败: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"合并失败: {str(e)}"
+        )
+
+    response_data = ConsolidateResponse(
+        processedFileId=consolidated_file.id,
+        processedFileName=consolidated_file.file_name,
+        processTime=consolidated_file.process_time,
+        summary=summary,
+        sources=sources
+    )
+    return ApiResponse(
+        code=200,
+        message=f"合并完成：成功 {summary['mergedFiles']} 个，失败 {summary['failedFiles']} 个",
+        data=response_data.model_dump()
+    )
+
+@router.get("/aggregates", response_model=ApiResponse)
+async def query_aggregates(
+    granularity: str = Query("month", pattern=f"^({'|'.join(GRANULARITIES)})$", description="汇总粒度"),
+    measure: Optional[List[str]] = Query(None, description="数值列名，可重复传入；不传时返回所有列"),
+    start: Optional[int] = Query(None, ge=100001, le=999912, description="起始会计月（YYYYMM，含）"),
+    end: Optional[int] = Query(None, ge=100001, le=999912, description="结束会计月（YYYYMM，含）"),
+    fileId: Optional[List[str]] = Query(None, description="只统计指定的处理后文件"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """跨所有处理结果按 月/季度/年 汇总数值列，并给出环比变化"""
+    points = await query_rollup(db, current_user.id, granularity, measure, start, end, fileId)
+    response_data = AggregateQueryResponse(
+        granularity=granularity,
+        measures=list(dict.fromkeys(point["measure"] for point in points)),
+        points=points
+    )
+    return ApiResponse(code=200, data=response_data.model_dump())
+
+@router.get("/aggregates/measures", response_model=ApiResponse)
+async def get_aggregate_measures(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """可用于汇总查询的数值列"""
+    return ApiResponse(code=200, data=await list_measures(db, current_user.id))
+
+@router.get("/process-stream/{file_id}")
+async def process_and_stream(
+    file_id: str,
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按会计月汇总并直接把结果流式返回（不保存处理后文件）"""
+    result = await db.execute(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == current_user.id,
+            FileModel.deleted_at.is_(None)
+        )
+    )
+    file_record = result.scalar_one_or_none()
+    
+    if not file_record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件不存在"
+        )
+    
+    if not os.path.exists(file_record.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件已被删除"
+        )
+
+    # 上传早于估算功能的文件在此补做解压检查；估算内存超出预算时逐行汇总
+    try:
+        estimate = await ensure_parse_estimate(file_record)
+    except WorkbookRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await db.commit()
+
+    try:
+        processed_df, _ = await run_in_process(
+            aggregate_sheet, file_record.file_path, None, exceeds_parse_budget(estimate)
         )
-        
     except Exception as e:
-        # 处理失败，更新状态
-        original_file.status = FileStatus.FAILED
-        await db.commit()
-        
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文件处理失败: {str(e)}"
         )
 
+    filename = f"{os.path.splitext(file_record.file_name)[0]}_处理后.{format}"
+    if format == "csv":
+        body, media_type = iter_csv(processed_df), CSV_MEDIA_TYPE
+    else:
+        body, media_type = iter_xlsx(processed_df), XLSX_MEDIA_TYPE
+    # 同步生成器由 StreamingResponse 在线程池中迭代，边生成边发送
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": content_disposition(filename), "Cache-Control": "no-store"},
+    )
+
+async def _resolve_download(file_record: FileModel, format: Optional[str]) -> Tuple[str, str]:
+    """返回 (物理路径, 下载文件名)；非 xlsx 格式首次请求时生成并缓存"""
+    if not format or format == "xlsx":
+        return file_record.file_path, file_record.file_name
+    if file_record.file_type != FileType.PROCESSED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="仅处理后的文件支持转换下载格式"
+        )
+    try:
+        path = await asyncio.to_thread(render, file_record.id, format, file_record.file_path)
+    except UnsupportedFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件已被删除"
+        )
+    filename = f"{os.path.splitext(file_record.file_name)[0]}{RESULT_FORMATS[format][0]}"
+    return path, filename
+
 @router.get("/download/{file_id}", response_model=ApiResponse)
 async def get_download_url(
     file_id: str,
+    format: Optional[str] = Query(None, pattern=DOWNLOAD_FORMAT_PATTERN),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -252,7 +627,8 @@ async def get_download_url(
     result = await db.execute(
         select(FileModel).where(
             FileModel.id == file_id,
-            FileModel.user_id == current_user.id
+            FileModel.user_id == current_user.id,
+            FileModel.deleted_at.is_(None)
         )
     )
     file_record = result.scalar_one_or_none()
@@ -269,12 +645,17 @@ async def get_download_url(
             detail="文件已被删除"
         )
     
-    # 生成下载URL（简化版，实际生产环境建议使用CDN或签名URL）
-    download_url = f"/api/v1/files/direct-download/{file_id}"
+    file_path, filename = await _resolve_download(file_record, format)
+
+    # 生成签名下载URL：下载时只校验签名，不需要 Bearer 头，也不访问数据库
+    # 链接中只包含相对上传目录的路径
+    relative_path = os.path.relpath(file_path, settings.UPLOAD_DIR)
+    token = sign_download(relative_path, current_user.id, filename)
+    download_url = f"/api/v1/files/signed-download/{token}"
     
     response_data = FileDownloadResponse(
         downloadUrl=download_url,
-        expiresIn=3600
+        expiresIn=settings.DOWNLOAD_URL_EXPIRE_SECONDS
     )
     
     return ApiResponse(
@@ -285,6 +666,7 @@ async def get_download_url(
 @router.get("/direct-download/{file_id}")
 async def direct_download(
     file_id: str,
+    format: Optional[str] = Query(None, pattern=DOWNLOAD_FORMAT_PATTERN),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -293,7 +675,8 @@ async def direct_download(
     result = await db.execute(
         select(FileModel).where(
             FileModel.id == file_id,
-            FileModel.user_id == current_user.id
+            FileModel.user_id == current_user.id,
+            FileModel.deleted_at.is_(None)
         )
     )
     file_record = result.scalar_one_or_none()
@@ -304,16 +687,79 @@ async def direct_download(
             detail="文件不存在"
         )
     
-    if not os.path.exists(file_record.file_path):
+    file_path, filename = await _resolve_download(file_record, format)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except (FileNotFoundError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="文件已被删除"
         )
     
-    return FileResponse(
-        path=file_record.file_path,
-        filename=file_record.file_name,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    # 支持 ETag/304 复验和 Range 断点续传
+    return ConditionalFileResponse(
+        file_path,
+        stat_result=stat_result,
+        filename=filename,
+        cache_control="private, no-cache",
+    )
+
+@router.get("/signed-download/{token}")
+async def signed_download(token: str):
+    """通过签名链接下载文件（链接由 /download/{file_id} 生成）"""
+    signed = verify_download(token)
+    if signed is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="下载链接无效或已过期"
+        )
+
+    # 签名已保证路径未被篡改，这里再限制在上传目录内
+    upload_root = os.path.abspath(settings.UPLOAD_DIR)
+    file_path = os.path.abspath(os.path.join(upload_root, signed.path))
+    if not file_path.startswith(os.path.join(upload_root, "")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="下载链接无效或已过期"
+        )
+
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        # 其他格式的缓存可能已被淘汰，按需重新生成
+        restored = await asyncio.to_thread(restore_render, signed.path)
+        if restored is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="文件已被删除"
+            )
+        file_path = restored
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+
+    return ConditionalFileResponse(
+        file_path,
+        stat_result=stat_result,
+        filename=signed.filename,
+        cache_control="private, no-cache",
+    )
+
+@router.get("/sheets/{file_id}", response_model=ApiResponse)
+async def get_sheets(
+    file_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """列出工作簿中的工作表（只读取工作簿元数据）"""
+    file_record = await _get_owned_file(db, current_user.id, file_id)
+    if not os.path.exists(file_record.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件已被删除"
+        )
+    sheets = await _read_sheet_names(file_record.file_path)
+    return ApiResponse(
+        code=200,
+        data=SheetListResponse(fileId=file_record.id, sheets=sheets).model_dump()
     )
 
 @router.get("/preview/{file_id}", response_model=ApiResponse)
@@ -321,6 +767,7 @@ async def preview_file(
     file_id: str,
     page: int = Query(1, ge=1),
     pageSize: int = Query(20, ge=1, le=100),
+    sheet: Optional[str] = Query(None, description="工作表名称，不传时预览第一个工作表"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -329,7 +776,8 @@ async def preview_file(
     result = await db.execute(
         select(FileModel).where(
             FileModel.id == file_id,
-            FileModel.user_id == current_user.id
+            FileModel.user_id == current_user.id,
+            FileModel.deleted_at.is_(None)
         )
     )
     file_record = result.scalar_one_or_none()
@@ -346,9 +794,13 @@ async def preview_file(
             detail="文件已被删除"
         )
     
+    if sheet is not None:
+        _ensure_sheets_exist(await _read_sheet_names(file_record.file_path), [sheet])
+    await _ensure_within_parse_budget(db, file_record)
+
     try:
         # 加载并预览数据
-        processor = ExcelProcessor(file_record.file_path)
+        processor = ExcelProcessor(file_record.file_path, sheet)
         processor.load_file()
         preview_data = processor.preview_data(page=page, page_size=pageSize)
         
@@ -365,6 +817,96 @@ async def preview_file(
             detail=f"文件预览失败: {str(e)}"
         )
 
+@router.post("/query-store/{file_id}", response_model=ApiResponse)
+async def build_query_store(
+    file_id: str,
+    sheet: Optional[str] = Query(None, description="工作表名称，不传时导入第一个工作表（处理结果导入完整结果）"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """把文件的数据行导入查询库（每列建索引），之后的过滤/排序不再解析工作簿"""
+    file_record = await _get_owned_file(db, current_user.id, file_id)
+    if not os.path.exists(file_record.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件已被删除"
+        )
+
+    if sheet is not None:
+        _ensure_sheets_exist(await _read_sheet_names(file_record.file_path), [sheet])
+    await _ensure_within_parse_budget(db, file_record)
+
+    try:
+        info = await run_in_process(query_store.ingest_file, file_record.id, file_record.file_path, sheet)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"建立查询索引失败: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"建立查询索引失败: {str(e)}"
+        )
+
+    return ApiResponse(
+        code=200,
+        message="查询索引已建立",
+        data=QueryStoreInfo(**info).model_dump()
+    )
+
+@router.get("/query-store/{file_id}", response_model=ApiResponse)
+async def get_query_store(
+    file_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """查询索引的行数和列类型"""
+    await _get_owned_file(db, current_user.id, file_id)
+    info = await asyncio.to_thread(query_store.describe, file_id)
+    if info is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件尚未建立查询索引"
+        )
+    return ApiResponse(code=200, data=QueryStoreInfo(**info).model_dump())
+
+@router.post("/query/{file_id}", response_model=ApiResponse)
+async def query_file(
+    file_id: str,
+    request: FileQueryRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按列过滤、排序、分页查询已建立索引的文件数据"""
+    await _get_owned_file(db, current_user.id, file_id)
+    if request.limit > settings.QUERY_STORE_MAX_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多返回 {settings.QUERY_STORE_MAX_LIMIT} 行"
+        )
+
+    try:
+        result = await asyncio.to_thread(
+            query_store.query,
+            file_id,
+            [item.model_dump() for item in request.filters],
+            [item.model_dump() for item in request.sort],
+            request.limit,
+            request.offset
+        )
+    except query_store.QueryStoreError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件尚未建立查询索引"
+        )
+    return ApiResponse(code=200, data=FileQueryResponse(**result).model_dump())
+
 @router.get("/history", response_model=ApiResponse)
 async def get_file_history(
     type: Optional[str] = Query("all", regex="^(all|original|processed)$"),
@@ -375,7 +917,10 @@ async def get_file_history(
 ):
     """获取文件历史列表"""
     # 构建查询
-    query = select(FileModel).where(FileModel.user_id == current_user.id)
+    query = select(FileModel).where(
+        FileModel.user_id == current_user.id,
+        FileModel.deleted_at.is_(None)
+    )
     
     if type != "all":
         file_type = FileType.ORIGINAL if type == "original" else FileType.PROCESSED
@@ -383,9 +928,12 @@ async def get_file_history(
     
     # 获取总数
     count_result = await db.execute(
-        select(FileModel).where(FileModel.user_id == current_user.id)
+        select(func.count()).select_from(FileModel).where(
+            FileModel.user_id == current_user.id,
+            FileModel.deleted_at.is_(None)
+        )
     )
-    total = len(count_result.scalars().all())
+    total = count_result.scalar_one()
     
     # 分页查询
     query = query.order_by(desc(FileModel.upload_time))
@@ -424,35 +972,25 @@ async def get_file_history(
 @router.delete("/{file_id}", response_model=ApiResponse)
 async def delete_file(
     file_id: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """删除文件"""
-    # 查找文件
-    result = await db.execute(
-        select(FileModel).where(
-            FileModel.id == file_id,
-            FileModel.user_id == current_user.id
-        )
+    """删除文件（软删除，物理文件由后台回收）"""
+    deleted = await soft_delete_files(
+        db,
+        FileModel.id == file_id,
+        FileModel.user_id == current_user.id
     )
-    file_record = result.scalar_one_or_none()
     
-    if not file_record:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="文件不存在"
         )
     
-    # 删除物理文件
-    if os.path.exists(file_record.file_path):
-        try:
-            os.remove(file_record.file_path)
-        except:
-            pass
-    
-    # 删除数据库记录
-    await db.delete(file_record)
     await db.commit()
+    background_tasks.add_task(run_reaper)
     
     return ApiResponse(
         code=200,
@@ -461,29 +999,14 @@ async def delete_file(
 
 @router.delete("/history/clear", response_model=ApiResponse)
 async def clear_history(
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """清空所有历史"""
-    # 查找所有文件
-    result = await db.execute(
-        select(FileModel).where(FileModel.user_id == current_user.id)
-    )
-    files = result.scalars().all()
-    
-    # 删除物理文件
-    for file_record in files:
-        if os.path.exists(file_record.file_path):
-            try:
-                os.remove(file_record.file_path)
-            except:
-                pass
-    
-    # 删除数据库记录
-    await db.execute(
-        delete(FileModel).where(FileModel.user_id == current_user.id)
-    )
+    """清空所有历史（软删除，物理文件由后台回收）"""
+    await soft_delete_files(db, FileModel.user_id == current_user.id)
     await db.commit()
+    background_tasks.add_task(run_reaper)
     
     return ApiResponse(
         code=200,
@@ -1,6 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from app.api.v1.admin import _get_admin_actor
+from app.core.ai_admission import ai_admission
+from app.core.ai_cache import ai_cache
 from app.core.config import settings
+from app.core.hash_pool import hash_pool
 from app.schemas.response import ApiResponse
 
 router = APIRouter()
@@ -20,3 +24,16 @@ async def get_system_info():
             "aiModel": settings.AI_MODEL,
         },
     )
+
+
+@router.get("/metrics", response_model=ApiResponse)
+async def get_system_metrics(_: str = Depends(_get_admin_actor)):
+    """运行指标（哈希线程池、AI 缓存与准入队列），仅管理员可见"""
+    return ApiResponse(
+        code=200,
+        data={
+            "passwordHashPool": hash_pool.metrics(),
+            "aiCache": ai_cache.metrics(),
+            "aiAdmission": ai_admission.metrics(),
+        },
+    )
@@ -0,0 +1,166 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+import math
+import time
+from typing import Any, AsyncIterator, Deque, Dict
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+class AdmissionTicket:
+    """一个已获得的上游调用名额；release 可重复调用"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._started_at = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release((time.perf_counter() - self._started_at) * 1000)
+
+
+class AdmissionController:
+    """
+    上游 AI 调用的准入控制：全局并发上限 + 有界等待队列
+    队列按请求方分组，名额释放时在各请求方之间轮转分配，单个请求方的突发不会挤占其他人；
+    队列已满或单个请求方排队过多时立即拒绝（503 + Retry-After），排队超时同样返回 503
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_queue_per_user: int, queue_timeout_seconds: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.completed = 0
+        self.total_run_ms = 0.0
+        # 上游返回 429/503 的次数与实际重试次数（由 ai_chat 记录）
+        self.throttled = 0
+        self.retries = 0
+
+    def retry_after_seconds(self) -> int:
+        """按平均调用耗时估算排到名额所需的时间，至少 1 秒"""
+        avg_run_seconds = self.total_run_ms / self.completed / 1000 if self.completed else 1.0
+        return max(1, math.ceil(avg_run_seconds * (self.queued / self.max_concurrency + 1)))
+
+    def _reject(self, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after_seconds())},
+        )
+
+    def _admit(self, wait_ms: float) -> AdmissionTicket:
+        self.admitted += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        return AdmissionTicket(self)
+
+    def _dequeue(self, requester: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(requester)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue:
+            del self._queues[requester]
+
+    def _release(self, run_ms: float) -> None:
+        self.completed += 1
+        self.total_run_ms += run_ms
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        # 名额直接移交给下一个请求方的队首请求（轮转），running 不变
+        while self._queues:
+            requester, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues.move_to_end(requester)
+            else:
+                del self._queues[requester]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    async def acquire(self, requester: str) -> AdmissionTicket:
+        if self.running < self.max_concurrency and not self._queues:
+            self.running += 1
+            return self._admit(0.0)
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise self._reject("AI 服务繁忙，请稍后重试")
+        queue = self._queues.get(requester)
+        if queue is not None and len(queue) >= self.max_queue_per_user:
+            self.rejected += 1
+            raise self._reject("AI 请求过于频繁，请稍后重试")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(requester, deque()).append(waiter)
+        self.queued += 1
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_seconds)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时/取消与名额移交同时发生：名额已属于本请求，交给下一个
+                self._hand_over()
+            else:
+                waiter.cancel()
+                self._dequeue(requester, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise self._reject("AI 服务排队超时，请稍后重试")
+            raise
+        return self._admit((time.perf_counter() - queued_at) * 1000)
+
+    @asynccontextmanager
+    async def slot(self, requester: str) -> AsyncIterator[AdmissionTicket]:
+        ticket = await self.acquire(requester)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        admitted = self.admitted
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "maxQueue": self.max_queue,
+            "maxQueuePerUser": self.max_queue_per_user,
+            "running": self.running,
+            "queued": self.queued,
+            "queuedRequesters": len(self._queues),
+            "admitted": admitted,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+            "avgWaitMs": round(self.total_wait_ms / admitted, 2) if admitted else 0.0,
+            "maxWaitMs": round(self.max_wait_ms, 2),
+            "avgRunMs": round(self.total_run_ms / self.completed, 2) if self.completed else 0.0,
+            "upstreamThrottled": self.throttled,
+            "retries": self.retries,
+        }
+
+
+ai_admission = AdmissionController(
+    max_concurrency=settings.AI_MAX_CONCURRENCY,
+    max_queue=settings.AI_QUEUE_MAX,
+    max_queue_per_user=settings.AI_QUEUE_MAX_PER_USER,
+    queue_timeout_seconds=settings.AI_QUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,227 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import uuid
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(body: Dict[str, Any]) -> str:
+    """(model, messages, temperature, max_tokens) 的规范化哈希：键排序、紧凑分隔符，与字段顺序无关"""
+    canonical = {
+        "model": body.get("model"),
+        "messages": [{"role": m["role"], "content": m["content"]} for m in body.get("messages", [])],
+        "temperature": float(body.get("temperature", 0)),
+        "max_tokens": body.get("max_tokens"),
+    }
+    text = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class AIResponseCache:
+    """
+    确定性 AI 请求（temperature 不高于 AI_CACHE_MAX_TEMPERATURE）的回复缓存：
+    进程内 LRU + 可选的磁盘层（多进程/重启后共享），两层使用同一个 TTL
+    相同请求并发到达时只向上游发起一次，其余请求等待同一个结果
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, cache_dir: str, max_temperature: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self.max_temperature = max_temperature
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[Tuple[str, bool]]"] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def cacheable(self, body: Dict[str, Any]) -> bool:
+        return self.enabled and float(body.get("temperature", 0)) <= self.max_temperature
+
+    # ---- 内存层 ----
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def _memory_set(self, key: str, reply: str, ttl_seconds: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ---- 磁盘层（在线程中执行） ----
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        """返回 (剩余有效秒数, 回复)；过期的文件随即删除"""
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("AI 缓存文件损坏，已忽略: %s", path)
+            return None
+        if not isinstance(entry, dict) or "expiresAt" not in entry or "reply" not in entry:
+            return None
+        remaining = entry["expiresAt"] - time.time()
+        if remaining <= 0:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return remaining, entry["reply"]
+
+    def _disk_set(self, key: str, reply: str) -> None:
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expiresAt": time.time() + self.ttl_seconds, "reply": reply}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def prune_disk(self) -> int:
+        """删除磁盘层中已过期或损坏的条目，返回删除的文件数"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        now = time.time()
+        removed = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                # 写入中的临时文件（.tmp）不处理
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        expired = json.load(f)["expiresAt"] <= now
+                except (OSError, ValueError, KeyError, TypeError):
+                    expired = True
+                if expired:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+    # ---- 对外接口 ----
+
+    async def get(self, key: str) -> Optional[str]:
+        """只查缓存（内存 -> 磁盘），不发起请求"""
+        reply = self._memory_get(key)
+        if reply is not None:
+            self.hits += 1
+            return reply
+        if self.cache_dir:
+            entry = await asyncio.to_thread(self._disk_get, key)
+            if entry is not None:
+                remaining, reply = entry
+                self._memory_set(key, reply, remaining)
+                self.disk_hits += 1
+                return reply
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, reply: str) -> None:
+        self._memory_set(key, reply, self.ttl_seconds)
+        if self.cache_dir:
+            try:
+                await asyncio.to_thread(self._disk_set, key, reply)
+            except OSError as e:
+                self.errors += 1
+                logger.warning("写入 AI 缓存失败: %s", e)
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        try:
+            reply = await self.get(key)
+            if reply is not None:
+                return reply, True
+            reply = await compute()
+            await self.set(key, reply)
+            return reply, False
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_compute(self, body: Dict[str, Any], compute: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """
+        返回 (回复, 是否来自缓存)；不可缓存的请求直接调用 compute
+        上游调用在独立任务中执行：发起请求的客户端断开不会取消它，等待同一结果的其他请求照常返回
+        """
+        if not self.cacheable(body):
+            self.bypassed += 1
+            return await compute(), False
+
+        key = cache_key(body)
+        reply = self._memory_get(key)
+        if reply is not None:
+            self.hits += 1
+            return reply, True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            reply, _ = await asyncio.shield(task)
+            return reply, True
+
+        task = asyncio.create_task(self._load(key, compute))
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "diskEnabled": bool(self.cache_dir),
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+            "hitRatio": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+ai_cache = AIResponseCache(
+    max_entries=settings.AI_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AI_CACHE_TTL_SECONDS,
+    cache_dir=settings.AI_CACHE_DIR,
+    max_temperature=settings.AI_CACHE_MAX_TEMPERATURE,
+)
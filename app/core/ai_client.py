@@ -0,0 +1,65 @@
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_enabled() -> bool:
+    if not settings.AI_HTTP2:
+        return False
+    # HTTP/2 需要可选依赖 h2（pip install "httpx[http2]"）
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("AI_HTTP2 已开启但未安装 h2，回退到 HTTP/1.1")
+        return False
+    return True
+
+
+class AIHttpClient:
+    """
+    AI 接口的应用级 HTTP 客户端：连接池 + keep-alive 复用到 AI_BASE_URL 的连接，
+    避免每次对话都重新建立 TCP/TLS 连接。在 lifespan 中创建，关闭应用时释放
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _create(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=settings.AI_BASE_URL.rstrip("/"),
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=settings.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.AI_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            # 总超时由调用方按 AI_TIMEOUT_SECONDS 控制
+            timeout=httpx.Timeout(
+                connect=settings.AI_CONNECT_TIMEOUT_SECONDS,
+                read=settings.AI_READ_TIMEOUT_SECONDS,
+                write=settings.AI_WRITE_TIMEOUT_SECONDS,
+                pool=settings.AI_POOL_TIMEOUT_SECONDS,
+            ),
+        )
+
+    def start(self) -> None:
+        if self._client is None:
+            self._client = self._create()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 未经过 lifespan（如脚本直接调用）时按需创建
+        self.start()
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+ai_http = AIHttpClient()
@@ -9,11 +9,53 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production-min-32-characters-long"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24小时
+
+    # 令牌注销（布隆过滤器容量/误判率，多进程同步与过期清理间隔）
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 30
+    TOKEN_REVOCATION_PRUNE_MINUTES: int = 60
+
+    # 密码哈希（bcrypt 在独立线程池中执行，避免阻塞事件循环）
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # 认证用户缓存（0 表示关闭）
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
     
     # 文件存储
     UPLOAD_DIR: str = "./uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    # 每个用户的默认存储配额（0 表示不限制，默认不限制以免升级后已有用户被拒绝上传），以及用量对账时间
+    DEFAULT_USER_QUOTA_BYTES: int = 0
+    QUOTA_RECONCILE_HOUR: int = 4
+    QUOTA_RECONCILE_MINUTE: int = 0
+    # 解析前检查：xlsx 解压后总大小、单个条目压缩比、条目数上限；估算解析内存超过预算时汇总改走流式处理
+    WORKBOOK_MAX_UNCOMPRESSED_BYTES: int = 512 * 1024 * 1024
+    WORKBOOK_MAX_COMPRESSION_RATIO: int = 200
+    WORKBOOK_MAX_ENTRIES: int = 10000
+    PARSE_MEMORY_BUDGET_BYTES: int = 256 * 1024 * 1024
+    # 存储布局：cas（内容寻址、按哈希分片去重）或 monthly（旧的按月目录）
+    STORAGE_BACKEND: str = "cas"
     
+    # 签名下载链接有效期（秒）
+    DOWNLOAD_URL_EXPIRE_SECONDS: int = 600
+
+    # 处理结果其他格式（csv/json/parquet）的磁盘缓存上限
+    RESULT_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+
+    # 批量处理：进程池大小（0 表示按 CPU 核数，最多 4）、单次文件数上限、任务进度保留时间
+    BATCH_PROCESS_WORKERS: int = 0
+    BATCH_MAX_FILES: int = 50
+    BATCH_JOB_RETENTION_SECONDS: int = 3600
+
+    # 按文件建立的查询库（独立 SQLite 文件）、每表最多建索引的列数、单次查询返回行数上限
+    QUERY_STORE_PATH: str = "./query_store.db"
+    QUERY_STORE_MAX_INDEXES: int = 32
+    QUERY_STORE_MAX_LIMIT: int = 1000
+
     # CORS
     CORS_ORIGINS: List[str] = ["*"]
 
@@ -25,12 +67,51 @@ class Settings(BaseSettings):
     CLEANUP_RETENTION_DAYS: int = 3
     CLEANUP_SCHEDULE_HOUR: int = 3
     CLEANUP_SCHEDULE_MINUTE: int = 0
+    CLEANUP_BATCH_SIZE: int = 500
+    CLEANUP_UNLINK_WORKERS: int = 8
+    # 软删除文件的后台回收间隔
+    REAPER_INTERVAL_SECONDS: int = 60
+
+    # 磁盘/数据库对账任务（孤儿文件、丢失文件）
+    RECONCILE_SCHEDULE_HOUR: int = 4
+    RECONCILE_SCHEDULE_MINUTE: int = 30
+    RECONCILE_AUTO_REPAIR: bool = False
+    RECONCILE_BATCH_SIZE: int = 1000
+    # 最近修改的孤儿文件可能是尚未提交记录的上传，跳过
+    RECONCILE_GRACE_MINUTES: int = 60
 
     # AI 机器人配置（OpenAI 兼容接口）
     AI_API_KEY: str = ""
     AI_BASE_URL: str = "https://api.openai.com/v1"
     AI_MODEL: str = "gpt-4o-mini"
+    # 单次请求的总超时
     AI_TIMEOUT_SECONDS: int = 60
+    # 连接/读取/写入/等待连接池 的分项超时
+    AI_CONNECT_TIMEOUT_SECONDS: float = 5
+    AI_READ_TIMEOUT_SECONDS: float = 60
+    AI_WRITE_TIMEOUT_SECONDS: float = 10
+    AI_POOL_TIMEOUT_SECONDS: float = 10
+    # 连接池：最大连接数、保持的空闲连接数与空闲保持时间，是否启用 HTTP/2（需安装 h2）
+    AI_MAX_CONNECTIONS: int = 50
+    AI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    AI_KEEPALIVE_EXPIRY_SECONDS: float = 60
+    AI_HTTP2: bool = False
+    # 回复缓存：只缓存 temperature 不高于 AI_CACHE_MAX_TEMPERATURE 的请求（0 条或 TTL 为 0 表示关闭），
+    # AI_CACHE_DIR 非空时启用磁盘层（多进程/重启后共享），并按间隔清理过期条目
+    AI_CACHE_MAX_ENTRIES: int = 1000
+    AI_CACHE_TTL_SECONDS: int = 24 * 3600
+    AI_CACHE_MAX_TEMPERATURE: float = 0
+    AI_CACHE_DIR: str = ""
+    AI_CACHE_PRUNE_MINUTES: int = 60
+    # 准入控制：同时进行的上游调用上限、等待队列长度（总数/每个请求方）与最长排队时间
+    AI_MAX_CONCURRENCY: int = 8
+    AI_QUEUE_MAX: int = 64
+    AI_QUEUE_MAX_PER_USER: int = 4
+    AI_QUEUE_TIMEOUT_SECONDS: float = 30
+    # 上游返回 429/503 时的重试次数与退避（指数退避 + 随机抖动，优先使用 Retry-After，单次等待不超过上限）
+    AI_RETRY_MAX_ATTEMPTS: int = 3
+    AI_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    AI_RETRY_MAX_DELAY_SECONDS: float = 10
     
     class Config:
         env_file = ".env"
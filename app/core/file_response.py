@@ -0,0 +1,121 @@
+from email.utils import parsedate
+import os
+import re
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# ASGI 零拷贝扩展：服务器声明支持时由服务器调用 sendfile 发送文件
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+MEDIA_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xls": "application/vnd.ms-excel",
+    ".csv": "text/csv; charset=utf-8",
+}
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# 304 响应只保留与缓存校验相关的头
+_NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "vary")
+
+
+def guess_media_type(path: str) -> str:
+    return MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+
+def file_etag(path: str, stat_result: os.stat_result) -> str:
+    """内容寻址存储的文件名就是内容的 sha256，直接作为强 ETag；其他文件按 mtime + 大小生成"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if _SHA256_RE.match(stem):
+        return f'"{stem}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+class ConditionalFileResponse(FileResponse):
+    """
+    带缓存校验的文件响应：
+    - ETag / Last-Modified，If-None-Match（优先）或 If-Modified-Since 命中时返回 304
+    - Range / If-Range 断点续传由 FileResponse 处理（206 / 416）
+    - 服务器支持 zerocopysend 扩展时整文件走 sendfile
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        status_code: int = 200,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        cache_control: str = "no-cache",
+    ):
+        super().__init__(
+            path,
+            status_code=status_code,
+            headers={"etag": file_etag(path, stat_result), "cache-control": cache_control},
+            media_type=media_type or guess_media_type(path),
+            filename=filename,
+            stat_result=stat_result,
+        )
+
+    def is_not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, self.headers["etag"])
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is None:
+            return False
+        since = parsedate(if_modified_since)
+        last_modified = parsedate(self.headers["last-modified"])
+        return since is not None and last_modified is not None and since >= last_modified
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        # FileResponse 默认按自己的 ETag 算法比较，这里改为比较实际下发的 ETag
+        return http_if_range in (self.headers["etag"], self.headers["last-modified"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        method = scope["method"].upper()
+
+        if method in ("GET", "HEAD") and self.status_code == 200 and self.is_not_modified(request_headers):
+            headers = {key: self.headers[key] for key in _NOT_MODIFIED_HEADERS if key in self.headers}
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        if (
+            method == "GET"
+            and "range" not in request_headers
+            and ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        ):
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            with open(self.path, "rb") as f:
+                await send({"type": ZEROCOPY_EXTENSION, "file": f, "more_body": False})
+            if self.background is not None:
+                await self.background()
+            return
+
+        await super().__call__(scope, receive, send)
+
+
+class UploadStaticFiles(StaticFiles):
+    """/uploads 静态目录：与下载接口使用相同的 ETag、媒体类型和零拷贝发送"""
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        return ConditionalFileResponse(full_path, stat_result=stat_result, status_code=status_code)
@@ -0,0 +1,96 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+class HashPool:
+    """
+    密码哈希专用线程池：限制并发数，排队过长时直接拒绝
+    bcrypt 计算期间会释放 GIL，线程池即可让出事件循环
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self.max_pending > 0 and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="服务繁忙，请稍后重试",
+                )
+            self.pending += 1
+
+        submitted_at = time.perf_counter()
+        # started/abandoned 在锁内修改：任务未开始时调用方被取消（或线程池关闭取消任务），
+        # 由调用方归还排队名额，任务之后即使被调度也不再执行
+        state = {"started": False, "abandoned": False}
+
+        def job() -> Any:
+            started_at = time.perf_counter()
+            wait_ms = (started_at - submitted_at) * 1000
+            with self._lock:
+                if state["abandoned"]:
+                    return None
+                state["started"] = True
+                self.pending -= 1
+                self.running += 1
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.total_run_ms += (time.perf_counter() - started_at) * 1000
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, job)
+        finally:
+            with self._lock:
+                if not state["started"] and not state["abandoned"]:
+                    state["abandoned"] = True
+                    self.pending -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.max_workers,
+                "maxPending": self.max_pending,
+                "pending": self.pending,
+                "running": self.running,
+                "completed": completed,
+                "rejected": self.rejected,
+                "avgWaitMs": round(self.total_wait_ms / completed, 2) if completed else 0.0,
+                "maxWaitMs": round(self.max_wait_ms, 2),
+                "avgRunMs": round(self.total_run_ms / completed, 2) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hash_pool = HashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
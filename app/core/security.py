@@ -7,14 +7,18 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import hashlib
+import uuid
 
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.hash_pool import hash_pool
+from app.core.principal_cache import principal_cache
+from app.core.token_revocation import revocation_list
 from app.models.user import User
 
 # 密码加密上下文（尝试使用bcrypt，失败则使用sha256）
 try:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
     USE_BCRYPT = True
 except Exception:
     USE_BCRYPT = False
@@ -42,6 +46,14 @@ def get_password_hash(password: str) -> str:
     # 降级到sha256
     return hashlib.sha256(password.encode()).hexdigest()
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在哈希线程池中验证密码（供异步接口使用）"""
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """在哈希线程池中计算密码哈希（供异步接口使用）"""
+    return await hash_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建JWT访问令牌"""
     to_encode = data.copy()
@@ -49,20 +61,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """验证JWT令牌，返回用户ID"""
+def decode_token(token: str) -> Optional[dict]:
+    """解码JWT令牌，校验签名、有效期及是否已注销"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        return user_id
     except JWTError:
         return None
+    jti = payload.get("jti")
+    if jti and revocation_list.is_revoked(jti):
+        return None
+    return payload
+
+def verify_token(token: str) -> Optional[str]:
+    """验证JWT令牌，返回用户ID"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        return None
+    return user_id
+
+async def resolve_user(db: AsyncSession, user_id: str) -> Optional[User]:
+    """按ID获取用户，优先读取进程内缓存；返回的对象已与会话分离，只读使用"""
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        db.expunge(user)
+        principal_cache.set(user_id, user)
+    return user
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -78,8 +113,7 @@ async def get_current_user(
             detail="无效的认证凭据"
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await resolve_user(db, user_id)
     
     if user is None:
         raise HTTPException(
@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import NamedTuple, Optional
+
+from app.core.config import settings
+
+# 从 SECRET_KEY 派生独立的签名密钥，避免与 JWT 签名共用同一把密钥
+_SIGNING_KEY = hmac.new(settings.SECRET_KEY.encode(), b"signed-download-url", hashlib.sha256).digest()
+
+
+class SignedDownload(NamedTuple):
+    path: str
+    owner_id: str
+    filename: str
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: bytes) -> bytes:
+    return hmac.new(_SIGNING_KEY, payload, hashlib.sha256).digest()
+
+
+def sign_download(path: str, owner_id: str, filename: str, expires_in: Optional[int] = None) -> str:
+    """生成下载令牌：base64url(载荷).base64url(HMAC-SHA256)，载荷包含存储路径（相对上传目录）、所有者、文件名和过期时间"""
+    expires_at = int(time.time()) + (expires_in or settings.DOWNLOAD_URL_EXPIRE_SECONDS)
+    payload = json.dumps(
+        {"p": path, "u": owner_id, "n": filename, "e": expires_at},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+
+def verify_download(token: str, now: Optional[float] = None) -> Optional[SignedDownload]:
+    """校验签名和有效期，失败返回 None（不访问数据库）"""
+    try:
+        encoded_payload, encoded_signature = token.split(".", 1)
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        data = json.loads(payload)
+        signed = SignedDownload(str(data["p"]), str(data["u"]), str(data["n"]), int(data["e"]))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if signed.expires_at <= (time.time() if now is None else now):
+        return None
+    return signed
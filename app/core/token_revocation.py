@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+import hashlib
+import math
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+
+
+class BloomFilter:
+    """定长位数组布隆过滤器（双重哈希），只增不删，清理时整体重建"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class TokenRevocationList:
+    """
+    已注销令牌（jti）的进程内索引
+    布隆过滤器负责绝大多数未注销令牌的快速否定，命中时再查精确字典；
+    数据持久化在 revoked_tokens 表，启动时加载，定时同步/清理
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.error_rate = error_rate
+        self._expiry: Dict[str, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_synced_at: Optional[datetime] = None
+
+    def _rebuild(self) -> None:
+        capacity = self._bloom.capacity
+        while len(self._expiry) > capacity:
+            capacity *= 2
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._expiry:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def add(self, jti: str, expires_at: float) -> None:
+        if jti in self._expiry:
+            return
+        self._expiry[jti] = expires_at
+        if len(self._expiry) > self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+
+    def add_many(self, entries: Iterable[Tuple[str, float]]) -> None:
+        for jti, expires_at in entries:
+            self.add(jti, expires_at)
+
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._bloom:
+            return False
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        expired = [jti for jti, expires_at in self._expiry.items() if expires_at <= now]
+        for jti in expired:
+            del self._expiry[jti]
+        if expired:
+            self._rebuild()
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    async def load(self, db: AsyncSession) -> None:
+        """从数据库加载全部未过期的注销记录"""
+        self._expiry.clear()
+        self._rebuild()
+        await self.sync(db, full=True)
+
+    async def sync(self, db: AsyncSession, full: bool = False) -> int:
+        """增量拉取其他进程写入的注销记录（多 worker 部署时使用）"""
+        now = datetime.utcnow()
+        stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > now)
+        if not full and self._last_synced_at is not None:
+            # revoked_at 精度为秒，多取一点重叠，重复 jti 会被忽略
+            stmt = stmt.where(RevokedToken.revoked_at >= self._last_synced_at - timedelta(seconds=5))
+        rows = (await db.execute(stmt)).all()
+        self.add_many((jti, _to_timestamp(expires_at)) for jti, expires_at in rows)
+        self._last_synced_at = now
+        return len(rows)
+
+    async def revoke(self, db: AsyncSession, jti: str, user_id: str, expires_at: datetime) -> None:
+        """写入注销记录并立即在本进程生效"""
+        db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # 同一令牌被并发注销，记录已存在
+            await db.rollback()
+        self.add(jti, _to_timestamp(expires_at))
+
+    async def prune_expired(self, db: AsyncSession) -> int:
+        """删除已自然过期的注销记录（过期令牌本身就会被 JWT 校验拒绝）"""
+        await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        await db.commit()
+        return self.prune()
+
+
+def _to_timestamp(value: datetime) -> float:
+    # 数据库中统一保存 UTC 时间（无时区）
+    if value.tzinfo is None:
+        return (value - datetime(1970, 1, 1)).total_seconds()
+    return value.timestamp()
+
+
+revocation_list = TokenRevocationList(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+)
@@ -1,5 +1,9 @@
 from app.models.user import User
 from app.models.file import File
 from app.models.admin_audit_log import AdminAuditLog
+from app.models.stats_rollup import FileStatsDaily
+from app.models.revoked_token import RevokedToken
+from app.models.storage_blob import StorageBlob
+from app.models.aggregate_fact import AggregateFact
 
-__all__ = ["User", "File", "AdminAuditLog"]
+__all__ = ["User", "File", "AdminAuditLog", "FileStatsDaily", "RevokedToken", "StorageBlob", "AggregateFact"]
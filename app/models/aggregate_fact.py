@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Integer, Float, Index
+from app.core.database import Base
+
+
+class AggregateFact(Base):
+    """处理结果的事实表：每个处理后文件的 会计月 x 数值列 一行，用于跨文件的时间维度汇总查询"""
+    __tablename__ = "aggregate_facts"
+    __table_args__ = (
+        Index("ix_aggregate_facts_user_measure_period", "user_id", "measure", "period"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    file_id = Column(String(50), nullable=False, index=True)
+    user_id = Column(String(50), nullable=False)
+    # 会计月，统一为 YYYYMM 整数
+    period = Column(Integer, nullable=False)
+    measure = Column(String(255), nullable=False)
+    value = Column(Float, nullable=False, default=0)
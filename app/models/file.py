@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Enum, ForeignKey
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
@@ -21,11 +21,14 @@ class File(Base):
     user_id = Column(String(50), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     file_name = Column(String(255), nullable=False)
     file_type = Column(Enum(FileType), nullable=False)
-    file_path = Column(String(500), nullable=False)
+    file_path = Column(String(500), nullable=False, index=True)
     file_size = Column(Integer, nullable=False)
     original_file_id = Column(String(50), nullable=True)
     upload_time = Column(DateTime(timezone=True), server_default=func.now())
     process_time = Column(DateTime(timezone=True), nullable=True)
     status = Column(Enum(FileStatus), default=FileStatus.PENDING)
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True, index=True)
     remark = Column(String(255), default="", nullable=False)
+    # 上传时检查工作簿得到的估算行数和解析所需内存（无法估算时为空）
+    estimated_rows = Column(BigInteger, nullable=True)
+    estimated_memory_bytes = Column(BigInteger, nullable=True)
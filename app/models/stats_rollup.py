@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, UniqueConstraint
+from app.core.database import Base
+
+
+class FileStatsDaily(Base):
+    """按天、按用户维护的文件统计汇总（增量更新，后台统计直接读取）"""
+    __tablename__ = "file_stats_daily"
+    __table_args__ = (UniqueConstraint("user_id", "bucket_date", name="uq_file_stats_daily_user_date"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(50), nullable=False, index=True)
+    bucket_date = Column(Date, nullable=False, index=True)
+    # 当天新写入的文件数/字节数（只增不减，用于趋势图）
+    uploads = Column(Integer, nullable=False, default=0)
+    upload_bytes = Column(BigInteger, nullable=False, default=0)
+    # 当天写入且仍然存在的文件数/字节数（删除、清理时扣减）
+    live_files = Column(Integer, nullable=False, default=0)
+    live_bytes = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StorageBlob(Base):
+    """内容寻址存储中的物理文件（按 sha256 去重，ref_count 为引用它的 File 记录数）"""
+    __tablename__ = "storage_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(500), nullable=False, unique=True, index=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy import Column, String, DateTime, Boolean, BigInteger, Integer
 from sqlalchemy.sql import func
 from app.core.database import Base
 import uuid
@@ -14,5 +14,9 @@ class User(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
     last_login_at = Column(DateTime(timezone=True), nullable=True)
+    # 存储配额（NULL 表示使用默认配额）及已维护的用量
+    storage_quota_bytes = Column(BigInteger, nullable=True)
+    storage_bytes_used = Column(BigInteger, default=0, nullable=False)
+    storage_file_count = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
@@ -18,6 +18,8 @@ class AdminUserUpdate(BaseModel):
     is_active: Optional[bool] = None
     is_admin: Optional[bool] = None
     reset_password: Optional[str] = Field(default=None, min_length=6, max_length=20)
+    # 存储配额（字节）：0 表示不限制，-1 表示恢复默认配额
+    storage_quota_bytes: Optional[int] = Field(default=None, ge=-1)
 
 
 class AdminUserItem(BaseModel):
@@ -29,6 +31,9 @@ class AdminUserItem(BaseModel):
     isAdmin: bool
     createdAt: datetime
     lastLoginAt: Optional[datetime]
+    quotaBytes: int
+    storageUsed: int
+    storageFileCount: int
 
 
 class AdminUserListResponse(BaseModel):
@@ -74,11 +79,31 @@ class AdminFileBatchDeleteRequest(BaseModel):
     fileIds: List[str] = Field(..., min_length=1)
 
 
+class AdminStatsDailyItem(BaseModel):
+    date: date
+    uploads: int
+    uploadBytes: int
+
+
 class AdminStatsResponse(BaseModel):
     totalUsers: int
     totalFiles: int
     totalStorageBytes: int
     uploadsLast7Days: int
+    daily: List[AdminStatsDailyItem] = []
+
+
+class StorageReconcileResponse(BaseModel):
+    scannedFiles: int
+    referencedPaths: int
+    orphanFiles: int
+    orphanBytes: int
+    missingFiles: int
+    skippedRecent: int
+    repaired: bool
+    orphanSamples: List[str]
+    missingSamples: List[str]
+    finishedAt: datetime
 
 
 class CleanupConfigResponse(BaseModel):
@@ -91,3 +116,4 @@ class CleanupRunResponse(BaseModel):
     deletedRecords: int
     deletedPhysicalFiles: int
     failedPhysicalDeletes: int
+    batches: int = 0
@@ -12,8 +12,10 @@ class ChatRequest(BaseModel):
     model: Optional[str] = None
     temperature: float = Field(default=0.7, ge=0, le=2)
     max_tokens: Optional[int] = Field(default=None, ge=1, le=4096)
+    stream: bool = False
 
 
 class ChatResponse(BaseModel):
     model: str
     reply: str
+    cached: bool = False
@@ -11,6 +11,7 @@ class FileUploadResponse(BaseModel):
     filePath: str
     uploadTime: datetime
     status: FileStatus
+    estimatedRows: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -18,6 +19,9 @@ class FileUploadResponse(BaseModel):
 # 文件处理请求
 class FileProcessRequest(BaseModel):
     fileId: str = Field(..., description="待处理的文件ID")
+    sheets: Optional[List[str]] = Field(None, description="要处理的工作表，不传时处理第一个工作表")
+    allSheets: bool = Field(False, description="处理所有工作表")
+    sheetMode: str = Field("combined", pattern="^(combined|separate)$", description="多个工作表合并为一个汇总表或分别汇总")
 
 # 文件处理响应
 class FileProcessResponse(BaseModel):
@@ -35,7 +39,7 @@ class FileProcessResponse(BaseModel):
 # 文件下载响应
 class FileDownloadResponse(BaseModel):
     downloadUrl: str
-    expiresIn: int = 3600
+    expiresIn: int
 
 # 文件预览响应
 class FilePreviewResponse(BaseModel):
@@ -65,3 +69,130 @@ class FileHistoryResponse(BaseModel):
     total: int
     page: int
     pageSize: int
+
+# 批量处理请求
+class BatchProcessRequest(BaseModel):
+    fileIds: List[str] = Field(..., min_length=1, description="待处理的原始文件ID列表")
+
+# 批量任务中的单个文件
+class BatchJobItem(BaseModel):
+    fileId: str
+    fileName: str
+    status: str
+    processedFileId: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+# 批量任务汇总
+class BatchJobSummary(BaseModel):
+    totalRows: int
+    groupedRows: int
+    workers: int
+    elapsedSeconds: float
+
+# 批量任务进度
+class BatchJobResponse(BaseModel):
+    jobId: str
+    status: str
+    total: int
+    pending: int
+    processing: int
+    completed: int
+    failed: int
+    items: List[BatchJobItem]
+    summary: BatchJobSummary
+    createdAt: datetime
+    finishedAt: Optional[datetime] = None
+
+# 批量上传中失败的文件
+class BatchUploadFailure(BaseModel):
+    fileName: str
+    error: str
+
+# 批量上传响应
+class BatchUploadResponse(BaseModel):
+    uploaded: List[FileUploadResponse]
+    failed: List[BatchUploadFailure]
+    job: Optional[BatchJobResponse] = None
+
+# 跨文件合并汇总请求
+class ConsolidateRequest(BaseModel):
+    fileIds: List[str] = Field(..., min_length=1, description="待合并的文件ID列表")
+    fileName: Optional[str] = Field(None, max_length=200, description="合并结果文件名")
+
+# 合并汇总中单个源文件的明细
+class ConsolidateSourceItem(BaseModel):
+    fileId: str
+    fileName: str
+    status: str
+    monthCol: Optional[str] = None
+    totalRows: int
+    months: List[str]
+    columns: List[str]
+    totals: Dict[str, float]
+    error: Optional[str] = None
+
+# 合并汇总响应
+class ConsolidateResponse(BaseModel):
+    processedFileId: str
+    processedFileName: str
+    processTime: datetime
+    summary: Dict[str, Any]
+    sources: List[ConsolidateSourceItem]
+
+# 汇总查询中的一个数据点
+class AggregatePoint(BaseModel):
+    measure: str
+    period: str
+    value: float
+    previousValue: Optional[float] = None
+    delta: Optional[float] = None
+    deltaRatio: Optional[float] = None
+
+# 跨文件汇总查询响应
+class AggregateQueryResponse(BaseModel):
+    granularity: str
+    measures: List[str]
+    points: List[AggregatePoint]
+
+# 查询库中的列
+class QueryStoreColumn(BaseModel):
+    name: str
+    type: str
+
+# 文件查询索引信息
+class QueryStoreInfo(BaseModel):
+    fileId: str
+    rowCount: int
+    columns: List[QueryStoreColumn]
+
+# 查询条件
+class QueryFilter(BaseModel):
+    column: str
+    op: str = Field(..., pattern="^(eq|ne|gt|gte|lt|lte|contains|prefix|in|isnull|notnull)$")
+    value: Optional[Any] = None
+
+# 排序条件
+class QuerySort(BaseModel):
+    column: str
+    desc: bool = False
+
+# 文件数据查询请求
+class FileQueryRequest(BaseModel):
+    filters: List[QueryFilter] = Field(default_factory=list, max_length=20)
+    sort: List[QuerySort] = Field(default_factory=list, max_length=5)
+    limit: int = Field(20, ge=1)
+    offset: int = Field(0, ge=0)
+
+# 文件数据查询响应
+class FileQueryResponse(BaseModel):
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+    total: int
+    limit: int
+    offset: int
+
+# 工作簿中的工作表
+class SheetListResponse(BaseModel):
+    fileId: str
+    sheets: List[str]
@@ -0,0 +1,182 @@
+from datetime import date, datetime
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.aggregate_fact import AggregateFact
+from app.models.file import File as FileModel
+
+GRANULARITY_MONTH = "month"
+GRANULARITY_QUARTER = "quarter"
+GRANULARITY_YEAR = "year"
+GRANULARITIES = (GRANULARITY_MONTH, GRANULARITY_QUARTER, GRANULARITY_YEAR)
+
+# 2025-01 / 2025/1 / 2025.01 / 2025年1月
+_PERIOD_RE = re.compile(r"^(\d{4})\s*[-/.年]\s*(\d{1,2})\s*月?$")
+
+
+def parse_period(value: Any) -> Optional[int]:
+    """把会计月统一为 YYYYMM 整数，无法识别年份和月份时返回 None"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.year * 100 + value.month
+    if isinstance(value, float):
+        if value != value or not value.is_integer():
+            return None
+        value = int(value)
+
+    text = str(value).strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+    if text.isdigit() and len(text) == 6:
+        year, month = int(text[:4]), int(text[4:])
+    else:
+        match = _PERIOD_RE.match(text)
+        if match is None:
+            return None
+        year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return year * 100 + month
+
+
+def _bucket_expression(granularity: str):
+    period = AggregateFact.period
+    if granularity == GRANULARITY_YEAR:
+        return period // 100
+    if granularity == GRANULARITY_QUARTER:
+        # 例如 20251 表示 2025 年第一季度
+        return (period // 100) * 10 + ((period % 100) - 1) // 3 + 1
+    return period
+
+
+def _previous_bucket(bucket: int, granularity: str) -> int:
+    if granularity == GRANULARITY_YEAR:
+        return bucket - 1
+    base, periods = (100, 12) if granularity == GRANULARITY_MONTH else (10, 4)
+    year, index = divmod(bucket, base)
+    return (year - 1) * base + periods if index == 1 else bucket - 1
+
+
+def _bucket_label(bucket: int, granularity: str) -> str:
+    if granularity == GRANULARITY_YEAR:
+        return str(bucket)
+    if granularity == GRANULARITY_QUARTER:
+        return f"{bucket // 10}Q{bucket % 10}"
+    return f"{bucket // 100}-{bucket % 100:02d}"
+
+
+async def write_facts(
+    db: AsyncSession,
+    file_id: str,
+    user_id: str,
+    df: pd.DataFrame,
+    month_col: str,
+    measures: Sequence[str]
+) -> int:
+    """
+    把一个处理结果写入事实表（替换该文件已有的行），与 File 记录在同一事务内提交
+    返回写入的行数；无法识别的会计月跳过
+    """
+    await db.execute(delete(AggregateFact).where(AggregateFact.file_id == file_id))
+
+    rows = []
+    for month, values in zip(df[month_col].tolist(), df[list(measures)].itertuples(index=False, name=None)):
+        period = parse_period(month)
+        if period is None:
+            continue
+        for measure, value in zip(measures, values):
+            if pd.isna(value):
+                continue
+            rows.append({
+                "file_id": file_id,
+                "user_id": user_id,
+                "period": period,
+                "measure": str(measure),
+                "value": float(value),
+            })
+    if rows:
+        await db.execute(insert(AggregateFact), rows)
+    return len(rows)
+
+
+async def discard_facts(db: AsyncSession, file_ids: Sequence[str]) -> None:
+    """文件记录被物理删除时清理事实表（由调用方提交）"""
+    if file_ids:
+        await db.execute(delete(AggregateFact).where(AggregateFact.file_id.in_(list(file_ids))))
+
+
+async def list_measures(db: AsyncSession, user_id: str) -> List[str]:
+    """用户处理结果中出现过的度量（已删除的文件不计入，与 query_rollup 一致）"""
+    result = await db.execute(
+        select(AggregateFact.measure)
+        .join(FileModel, FileModel.id == AggregateFact.file_id)
+        .where(AggregateFact.user_id == user_id, FileModel.deleted_at.is_(None))
+        .group_by(AggregateFact.measure)
+        .order_by(AggregateFact.measure)
+    )
+    return [row[0] for row in result.all()]
+
+
+async def query_rollup(
+    db: AsyncSession,
+    user_id: str,
+    granularity: str = GRANULARITY_MONTH,
+    measures: Optional[Sequence[str]] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    file_ids: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    按 月/季度/年 汇总用户所有处理结果（已删除的文件不计入），
+    同一条 SQL 中用窗口函数取上一周期的值计算环比
+    start / end 为 YYYYMM，包含两端
+    """
+    bucket = _bucket_expression(granularity).label("bucket")
+    grouped = (
+        select(AggregateFact.measure, bucket, func.sum(AggregateFact.value).label("value"))
+        .join(FileModel, FileModel.id == AggregateFact.file_id)
+        .where(AggregateFact.user_id == user_id, FileModel.deleted_at.is_(None))
+        .group_by(AggregateFact.measure, bucket)
+    )
+    if measures:
+        grouped = grouped.where(AggregateFact.measure.in_(list(measures)))
+    if start is not None:
+        grouped = grouped.where(AggregateFact.period >= start)
+    if end is not None:
+        grouped = grouped.where(AggregateFact.period <= end)
+    if file_ids:
+        grouped = grouped.where(AggregateFact.file_id.in_(list(file_ids)))
+    grouped = grouped.subquery()
+
+    window = {"partition_by": grouped.c.measure, "order_by": grouped.c.bucket}
+    result = await db.execute(
+        select(
+            grouped.c.measure,
+            grouped.c.bucket,
+            grouped.c.value,
+            func.lag(grouped.c.bucket).over(**window).label("previous_bucket"),
+            func.lag(grouped.c.value).over(**window).label("previous_value"),
+        ).order_by(grouped.c.measure, grouped.c.bucket)
+    )
+
+    points = []
+    for row in result.all():
+        bucket_value = int(row.bucket)
+        # 中间缺少周期时不计算环比
+        adjacent = row.previous_bucket is not None and int(row.previous_bucket) == _previous_bucket(bucket_value, granularity)
+        previous_value = row.previous_value if adjacent else None
+        delta = row.value - previous_value if previous_value is not None else None
+        points.append({
+            "measure": row.measure,
+            "period": _bucket_label(bucket_value, granularity),
+            "value": row.value,
+            "previousValue": previous_value,
+            "delta": delta,
+            "deltaRatio": round(delta / previous_value, 6) if delta is not None and previous_value else None,
+        })
+    return points
@@ -0,0 +1,219 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import json
+import random
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+import httpx
+
+from app.core.ai_admission import AdmissionTicket, ai_admission
+from app.core.ai_cache import ai_cache, cache_key
+from app.core.ai_client import ai_http
+from app.core.config import settings
+from app.schemas.ai import ChatRequest
+
+SSE_DONE = "[DONE]"
+# 上游限流/暂时不可用，可按 Retry-After 重试
+RETRY_STATUS_CODES = (429, 503)
+
+
+def build_request_body(payload: ChatRequest, model: str, stream: bool = False) -> Dict[str, Any]:
+    body: Dict[str, Any] = {
+        "model": model,
+        "messages": [m.model_dump() for m in payload.messages],
+        "temperature": payload.temperature,
+    }
+    if payload.max_tokens is not None:
+        body["max_tokens"] = payload.max_tokens
+    if stream:
+        body["stream"] = True
+    return body
+
+
+def _upstream_request(body: Dict[str, Any]) -> httpx.Request:
+    return ai_http.client.build_request(
+        "POST",
+        "/chat/completions",
+        headers={"Authorization": f"Bearer {settings.AI_API_KEY}"},
+        json=body,
+    )
+
+
+def _upstream_error(resp: httpx.Response) -> HTTPException:
+    if resp.status_code in RETRY_STATUS_CODES:
+        retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+        return HTTPException(
+            status_code=503,
+            detail="AI 服务繁忙，请稍后重试",
+            headers={"Retry-After": str(max(1, round(retry_after or ai_admission.retry_after_seconds())))},
+        )
+    return HTTPException(status_code=502, detail=f"AI 请求失败: {resp.text}")
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 可以是秒数或 HTTP 日期"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _retry_delay(resp: httpx.Response, attempt: int) -> float:
+    """有 Retry-After 时按其等待并加少量抖动，否则指数退避 + 全抖动，避免被限流的请求同时重试"""
+    retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+    if retry_after is not None:
+        return retry_after + random.uniform(0, settings.AI_RETRY_BASE_DELAY_SECONDS)
+    return random.uniform(0, settings.AI_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+
+
+async def _send(body: Dict[str, Any], stream: bool = False) -> httpx.Response:
+    """
+    发送上游请求，429/503 时按退避重试；重试次数用尽或需要等待的时间超过上限时返回最后一次响应
+    """
+    attempt = 0
+    while True:
+        resp = await ai_http.client.send(_upstream_request(body), stream=stream)
+        if resp.status_code not in RETRY_STATUS_CODES:
+            return resp
+        ai_admission.throttled += 1
+        delay = _retry_delay(resp, attempt)
+        if attempt >= settings.AI_RETRY_MAX_ATTEMPTS or delay > settings.AI_RETRY_MAX_DELAY_SECONDS:
+            return resp
+        await resp.aclose()
+        ai_admission.retries += 1
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def complete(body: Dict[str, Any]) -> str:
+    """调用上游接口并返回完整回复"""
+    try:
+        # 复用应用级连接池；分项超时由客户端控制，这里限制总耗时（含重试）
+        async with asyncio.timeout(settings.AI_TIMEOUT_SECONDS):
+            resp = await _send(body)
+    except (TimeoutError, httpx.TimeoutException):
+        raise HTTPException(status_code=504, detail="AI 服务响应超时")
+    if resp.is_error:
+        raise _upstream_error(resp)
+
+    choices = resp.json().get("choices") or []
+    if not choices:
+        raise HTTPException(status_code=502, detail="AI 接口返回空结果")
+    return choices[0].get("message", {}).get("content", "")
+
+
+async def admitted_complete(body: Dict[str, Any], requester: str) -> str:
+    """占用一个准入名额后调用上游"""
+    async with ai_admission.slot(requester):
+        return await complete(body)
+
+
+async def cached_complete(body: Dict[str, Any], requester: str) -> Tuple[str, bool]:
+    """
+    确定性请求先查缓存，相同请求并发时合并为一次上游调用；返回 (回复, 是否来自缓存)
+    缓存命中不占用准入名额
+    """
+    return await ai_cache.get_or_compute(body, lambda: admitted_complete(body, requester))
+
+
+async def cached_reply(body: Dict[str, Any]) -> Optional[str]:
+    """流式请求只查缓存，未命中时由 relay_stream 在结束后写入"""
+    if not ai_cache.cacheable(body):
+        return None
+    return await ai_cache.get(cache_key(body))
+
+
+async def open_stream(body: Dict[str, Any], requester: str) -> Tuple[httpx.Response, AdmissionTicket]:
+    """
+    占用准入名额后以 stream 模式发起请求，等到上游返回响应头为止（受总超时限制）
+    名额在整个推送期间保持占用；上游返回错误时在开始推送前抛出并释放名额
+    调用方负责用 close_stream 关闭返回的响应
+    """
+    ticket = await ai_admission.acquire(requester)
+    try:
+        try:
+            async with asyncio.timeout(settings.AI_TIMEOUT_SECONDS):
+                resp = await _send(body, stream=True)
+                if resp.is_error:
+                    await resp.aread()
+        except (TimeoutError, httpx.TimeoutException):
+            raise HTTPException(status_code=504, detail="AI 服务响应超时")
+        if resp.is_error:
+            await resp.aclose()
+            raise _upstream_error(resp)
+    except BaseException:
+        ticket.release()
+        raise
+    return resp, ticket
+
+
+async def close_stream(resp: httpx.Response, ticket: AdmissionTicket) -> None:
+    try:
+        await resp.aclose()
+    finally:
+        ticket.release()
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def replay_cached(reply: str, model: str) -> AsyncIterator[bytes]:
+    """缓存命中的流式请求：整段回复作为一个增量发出"""
+    yield _sse({"delta": reply})
+    yield _sse({"model": model, "reply": reply, "cached": True}, event="done")
+
+
+async def relay_stream(resp: httpx.Response, ticket: AdmissionTicket, body: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """
+    把上游的 SSE 增量逐条转发给客户端：data: {"delta": "..."}，结束时发送 done 事件（含完整回复）
+    每条读一行、发一条，客户端读得慢时上游也随之暂停读取；客户端断开时生成器被取消并关闭上游连接
+    只有收到 [DONE] 或 finish_reason 才算完整：确定性请求写入回复缓存并发送 done；
+    上游提前断开时发送 error 事件，不缓存不完整的回复
+    """
+    model = body["model"]
+    reply_parts = []
+    finished = False
+    try:
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == SSE_DONE:
+                finished = True
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            if choices[0].get("finish_reason"):
+                finished = True
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                reply_parts.append(delta)
+                yield _sse({"delta": delta})
+        if not finished:
+            yield _sse({"detail": "AI 回复不完整，请重试"}, event="error")
+            return
+        reply = "".join(reply_parts)
+        if ai_cache.cacheable(body):
+            await ai_cache.set(cache_key(body), reply)
+        yield _sse({"model": model, "reply": reply, "cached": False}, event="done")
+    except httpx.HTTPError as e:
+        yield _sse({"detail": f"AI 服务异常: {str(e)}"}, event="error")
+    finally:
+        await close_stream(resp, ticket)
@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+import uuid
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.file import File as FileModel
+from app.services.file_processing import process_original_file, process_workers
+
+logger = logging.getLogger(__name__)
+
+ITEM_PENDING = "pending"
+ITEM_PROCESSING = "processing"
+ITEM_COMPLETED = "completed"
+ITEM_FAILED = "failed"
+
+
+class BatchJob:
+    """一次批量处理任务的进度（仅保存在当前进程内存中）"""
+
+    def __init__(self, user_id: str, files: List[Tuple[str, str]]):
+        self.id = f"batch_{uuid.uuid4().hex[:12]}"
+        self.user_id = user_id
+        self.items: List[Dict[str, Any]] = [
+            {
+                "fileId": file_id,
+                "fileName": file_name,
+                "status": ITEM_PENDING,
+                "processedFileId": None,
+                "summary": None,
+                "error": None,
+            }
+            for file_id, file_name in files
+        ]
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        counts = {ITEM_PENDING: 0, ITEM_PROCESSING: 0, ITEM_COMPLETED: 0, ITEM_FAILED: 0}
+        total_rows = 0
+        grouped_rows = 0
+        for item in self.items:
+            counts[item["status"]] += 1
+            if item["summary"]:
+                total_rows += item["summary"].get("totalRows", 0)
+                grouped_rows += item["summary"].get("groupedRows", 0)
+
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+        return {
+            "jobId": self.id,
+            "status": "completed" if self.finished else "running",
+            "total": len(self.items),
+            "pending": counts[ITEM_PENDING],
+            "processing": counts[ITEM_PROCESSING],
+            "completed": counts[ITEM_COMPLETED],
+            "failed": counts[ITEM_FAILED],
+            "items": [dict(item) for item in self.items],
+            "summary": {
+                "totalRows": total_rows,
+                "groupedRows": grouped_rows,
+                "workers": process_workers(),
+                "elapsedSeconds": round(elapsed, 3),
+            },
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+async def _process_item(job: BatchJob, item: Dict[str, Any], semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        item["status"] = ITEM_PROCESSING
+        async with AsyncSessionLocal() as db:
+            original_file = (
+                await db.execute(
+                    select(FileModel).where(
+                        FileModel.id == item["fileId"],
+                        FileModel.user_id == job.user_id,
+                        FileModel.deleted_at.is_(None)
+                    )
+                )
+            ).scalar_one_or_none()
+            if original_file is None or not os.path.exists(original_file.file_path):
+                item["status"] = ITEM_FAILED
+                item["error"] = "文件不存在"
+                return
+            item["fileName"] = original_file.file_name
+
+            try:
+                processed_file, summary = await process_original_file(db, original_file)
+            except Exception as e:
+                item["status"] = ITEM_FAILED
+                item["error"] = f"文件处理失败: {str(e)}"
+                return
+
+        item["processedFileId"] = processed_file.id
+        item["summary"] = summary
+        item["status"] = ITEM_COMPLETED
+
+
+async def run_batch_job(job: BatchJob) -> None:
+    """并发处理任务中的所有文件，同时运行的数量不超过进程池大小"""
+    semaphore = asyncio.Semaphore(process_workers())
+    try:
+        await asyncio.gather(*(_process_item(job, item, semaphore) for item in job.items))
+    finally:
+        job._elapsed = time.perf_counter() - job._started
+        job.finished_at = datetime.utcnow()
+        logger.info("batch job %s finished: %s", job.id, {k: v for k, v in job.snapshot().items() if k != "items"})
+
+
+class BatchJobRegistry:
+    """进行中和最近完成的批量任务；多 worker 部署时只能在创建任务的进程中查询进度"""
+
+    def __init__(self):
+        self._jobs: Dict[str, BatchJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self, job: BatchJob) -> BatchJob:
+        self.prune()
+        self._jobs[job.id] = job
+        task = asyncio.create_task(run_batch_job(job))
+        # 保留引用，避免任务在完成前被回收
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[BatchJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def prune(self) -> None:
+        cutoff = datetime.utcnow().timestamp() - settings.BATCH_JOB_RETENTION_SECONDS
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at.timestamp() < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+batch_jobs = BatchJobRegistry()
@@ -1,45 +1,133 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import os
-from typing import Dict
+import logging
+from typing import Callable, Dict, List, Optional
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.file import File as FileModel
+from app.core.config import settings
+from app.models.file import File as FileModel, FileType
+from app.services.aggregate_cube import discard_facts
+from app.services.query_store import drop_tables
+from app.services.result_formats import discard_results
+from app.services.stats_rollup import record_files_removed
+from app.services.storage import UNLINK_DELETED, UNLINK_FAILED, get_storage
 
+logger = logging.getLogger(__name__)
 
-async def cleanup_expired_files(db: AsyncSession, retention_days: int) -> Dict[str, int]:
-    cutoff = datetime.utcnow() - timedelta(days=retention_days)
 
-    result = await db.execute(
-        select(FileModel).where(
-            and_(
-                FileModel.upload_time.is_not(None),
-                FileModel.upload_time < cutoff,
-            )
-        )
-    )
-    files = result.scalars().all()
+async def purge_files(
+    db: AsyncSession,
+    *conditions,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """
+    流式物理删除满足条件的文件：按主键分批读取，线程池并发删除物理文件，
+    每批一次 DELETE ... WHERE id IN (...) 并立即提交，避免长时间占用写锁。
+    物理文件在本批提交成功后才删除，提交失败时记录仍指向完好的文件；
+    每批独立提交，中途中断后重新执行即可继续（提交后、删除前中断留下的孤儿文件由对账任务清理）
+    """
+    batch_size = batch_size or settings.CLEANUP_BATCH_SIZE
+    storage = get_storage()
 
-    deleted_records = 0
-    deleted_physical_files = 0
-    failed_physical_deletes = 0
+    totals = {
+        "deletedRecords": 0,
+        "deletedPhysicalFiles": 0,
+        "failedPhysicalDeletes": 0,
+        "batches": 0,
+    }
+    last_id = ""
 
-    for file_record in files:
-        if file_record.file_path and os.path.exists(file_record.file_path):
-            try:
-                os.remove(file_record.file_path)
-                deleted_physical_files += 1
-            except Exception:
-                failed_physical_deletes += 1
+    with ThreadPoolExecutor(
+        max_workers=settings.CLEANUP_UNLINK_WORKERS, thread_name_prefix="cleanup-unlink"
+    ) as executor:
+        while True:
+            batch = (
+                await db.execute(
+                    select(
+                        FileModel.id,
+                        FileModel.user_id,
+                        FileModel.file_path,
+                        FileModel.file_size,
+                        FileModel.upload_time,
+                        FileModel.deleted_at,
+                        FileModel.file_type,
+                    )
+                    .where(and_(*conditions, FileModel.id > last_id))
+                    .order_by(FileModel.id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
 
-        await db.delete(file_record)
-        deleted_records += 1
+            # 内容寻址存储中被其他记录共享的文件只扣减引用计数；物理文件在本批提交后再删除
+            released = await storage.release(db, [row.file_path for row in batch])
 
-    await db.commit()
+            await db.execute(delete(FileModel).where(FileModel.id.in_([row.id for row in batch])))
+            # 处理结果在事实表中的行随文件一起删除
+            processed_ids = [row.id for row in batch if row.file_type == FileType.PROCESSED]
+            await discard_facts(db, processed_ids)
+            # 已软删除的记录在删除时已扣减过统计
+            await record_files_removed(db, [row for row in batch if row.deleted_at is None])
+            await db.commit()
+            outcomes = await storage.unlink_released(db, released, executor)
+            loop = asyncio.get_running_loop()
+            # 处理结果的规范形式和格式缓存
+            if processed_ids:
+                await loop.run_in_executor(executor, discard_results, processed_ids)
+            # 查询库中为这些文件建立的表
+            await loop.run_in_executor(executor, drop_tables, [row.id for row in batch])
 
-    return {
-        "deletedRecords": deleted_records,
-        "deletedPhysicalFiles": deleted_physical_files,
-        "failedPhysicalDeletes": failed_physical_deletes,
-    }
+            totals["deletedRecords"] += len(batch)
+            totals["deletedPhysicalFiles"] += outcomes.count(UNLINK_DELETED)
+            totals["failedPhysicalDeletes"] += outcomes.count(UNLINK_FAILED)
+            totals["batches"] += 1
+
+            logger.info("purge progress: %s", totals)
+            if progress is not None:
+                progress(dict(totals))
+
+    return totals
+
+
+async def detach_file(db: AsyncSession, file_id: str) -> Optional[List[str]]:
+    """
+    在调用方的事务内物理删除一条文件记录（释放存储引用、删除事实表行、扣减统计），不提交
+    用于以同一主键写入新记录前替换旧记录；记录不存在时返回 None，
+    否则返回提交后要删除的物理路径（交给 storage.unlink_released），并由调用方清理规范形式和查询表
+    """
+    row = await db.get(FileModel, file_id)
+    if row is None:
+        return None
+
+    released = await get_storage().release(db, [row.file_path])
+    await db.execute(delete(FileModel).where(FileModel.id == file_id))
+    # 旧对象移出会话，随后才能以同一主键添加新记录
+    db.expunge(row)
+    if row.file_type == FileType.PROCESSED:
+        await discard_facts(db, [file_id])
+    if row.deleted_at is None:
+        await record_files_removed(db, [row])
+    return released
+
+
+async def cleanup_expired_files(
+    db: AsyncSession,
+    retention_days: int,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """清理超过保留天数的文件（包括已软删除但尚未回收的记录）"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return await purge_files(
+        db,
+        FileModel.upload_time.is_not(None),
+        FileModel.upload_time < cutoff,
+        batch_size=batch_size,
+        progress=progress,
+    )
@@ -0,0 +1,225 @@
+import asyncio
+from datetime import datetime
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import uuid
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File as FileModel, FileStatus, FileType
+from app.services.excel_processor import month_partial_sums
+from app.services.file_processing import process_workers, run_in_process
+from app.services.result_formats import discard_results, promote_canonical, save_canonical
+from app.services.stats_rollup import record_file_added
+from app.services.storage import get_storage
+
+DEFAULT_MONTH_COL = "会计月"
+
+
+def _month_sort_key(month: str) -> Tuple[int, Any]:
+    # 纯数字的会计月按数值排序，其余按文本排在后面
+    return (0, int(month)) if month.isdigit() else (1, month)
+
+
+class MonthRollup:
+    """
+    跨文件的按会计月汇总：按列名对齐，缺失的列补 0
+    只保存 会计月数 x 列数 的部分和，与源文件行数无关
+    """
+
+    def __init__(self):
+        self.month_col: Optional[str] = None
+        self.columns: List[str] = []
+        self._column_index: Dict[str, int] = {}
+        self.sums: Dict[str, Dict[int, float]] = {}
+        self.total_rows = 0
+
+    def merge(self, partial: Dict[str, Any]) -> None:
+        if self.month_col is None:
+            self.month_col = partial["accountingMonthCol"]
+        # 新列追加到末尾，全部合并后再按请求中文件的顺序重排
+        indexes = []
+        for col in partial["numericCols"]:
+            if col not in self._column_index:
+                self._column_index[col] = len(self.columns)
+                self.columns.append(col)
+            indexes.append(self._column_index[col])
+
+        for month, values in partial["sums"].items():
+            bucket = self.sums.setdefault(month, {})
+            for index, value in zip(indexes, values):
+                bucket[index] = bucket.get(index, 0) + value
+        self.total_rows += partial["totalRows"]
+
+    def order_columns(self, preferred: List[str], month_col: str) -> None:
+        """按给定顺序重排列（只调整顺序，不改变已合并的值）"""
+        order = list(dict.fromkeys(col for col in preferred if col in self._column_index))
+        self.sums = {
+            month: {
+                new: bucket[self._column_index[col]]
+                for new, col in enumerate(order)
+                if self._column_index[col] in bucket
+            }
+            for month, bucket in self.sums.items()
+        }
+        self.columns = order
+        self._column_index = {col: index for index, col in enumerate(order)}
+        self.month_col = month_col
+
+    def to_dataframe(self) -> pd.DataFrame:
+        months = sorted(self.sums, key=_month_sort_key)
+        data: Dict[str, list] = {
+            self.month_col or DEFAULT_MONTH_COL: [int(month) if month.isdigit() else month for month in months]
+        }
+        for index, col in enumerate(self.columns):
+            data[col] = [self.sums[month].get(index, 0) for month in months]
+        return pd.DataFrame(data)
+
+
+def _source_breakdown(file_record: FileModel, partial: Dict[str, Any]) -> Dict[str, Any]:
+    totals = [0] * len(partial["numericCols"])
+    for values in partial["sums"].values():
+        totals = [total + value for total, value in zip(totals, values)]
+    return {
+        "fileId": file_record.id,
+        "fileName": file_record.file_name,
+        "status": "completed",
+        "monthCol": partial["accountingMonthCol"],
+        "totalRows": partial["totalRows"],
+        "months": sorted(partial["sums"], key=_month_sort_key),
+        "columns": partial["numericCols"],
+        "totals": dict(zip(partial["numericCols"], totals)),
+        "error": None,
+    }
+
+
+def _failed_breakdown(file_id: str, file_name: str, error: str) -> Dict[str, Any]:
+    return {
+        "fileId": file_id,
+        "fileName": file_name,
+        "status": "failed",
+        "monthCol": None,
+        "totalRows": 0,
+        "months": [],
+        "columns": [],
+        "totals": {},
+        "error": error,
+    }
+
+
+async def consolidate_files(
+    db: AsyncSession,
+    user_id: str,
+    file_ids: List[str],
+    file_name: Optional[str] = None
+) -> Tuple[FileModel, Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    把多个台账合并为一份按会计月汇总的结果：各文件在进程池中并行流式求部分和，
+    按完成顺序合并，返回 (合并结果文件记录, 摘要, 各源文件明细)
+    单个文件失败只记录在明细中；全部失败时抛出 ValueError
+    """
+    result = await db.execute(
+        select(FileModel).where(
+            FileModel.id.in_(file_ids),
+            FileModel.user_id == user_id,
+            FileModel.deleted_at.is_(None)
+        )
+    )
+    records = {record.id: record for record in result.scalars().all()}
+
+    breakdown: Dict[str, Dict[str, Any]] = {}
+    sources: List[FileModel] = []
+    for file_id in file_ids:
+        record = records.get(file_id)
+        if record is None or not os.path.exists(record.file_path):
+            breakdown[file_id] = _failed_breakdown(file_id, record.file_name if record else "", "文件不存在")
+            continue
+        sources.append(record)
+
+    async def _partial(record: FileModel):
+        try:
+            return record, await run_in_process(month_partial_sums, record.file_path), None
+        except Exception as e:
+            return record, None, e
+
+    started = datetime.now()
+    rollup = MonthRollup()
+    # 按完成顺序合并，已合并的部分和随即释放
+    for future in asyncio.as_completed([_partial(record) for record in sources]):
+        record, partial, error = await future
+        if error is not None:
+            breakdown[record.id] = _failed_breakdown(record.id, record.file_name, f"文件处理失败: {str(error)}")
+            continue
+        rollup.merge(partial)
+        breakdown[record.id] = _source_breakdown(record, partial)
+
+    if rollup.month_col is None:
+        raise ValueError("没有可合并的文件")
+    # 列顺序与完成顺序无关：按请求中文件的顺序取列的并集
+    rollup.order_columns(
+        [col for file_id in file_ids for col in breakdown[file_id]["columns"]],
+        next(breakdown[file_id]["monthCol"] for file_id in file_ids if breakdown[file_id]["monthCol"])
+    )
+    elapsed = (datetime.now() - started).total_seconds()
+    consolidated_df = rollup.to_dataframe()
+
+    consolidated_id = f"consolidated_{uuid.uuid4().hex[:12]}"
+    consolidated_name = file_name or f"合并汇总_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
+    if not consolidated_name.lower().endswith(".xlsx"):
+        consolidated_name = f"{consolidated_name}.xlsx"
+
+    storage = get_storage()
+    tmp_path = storage.temp_path(".xlsx")
+    staged_id: Optional[str] = None
+    file_path: Optional[str] = None
+    try:
+        await asyncio.to_thread(consolidated_df.to_excel, tmp_path, index=False, engine="openpyxl")
+        # 规范形式先以临时 id 保存，提交成功后再改为正式 id，失败时不留下无记录的结果
+        staged_id = f"{consolidated_id}.{uuid.uuid4().hex}"
+        await asyncio.to_thread(save_canonical, staged_id, consolidated_df)
+        file_size = os.path.getsize(tmp_path)
+        file_path = await storage.save_file(db, tmp_path, ".xlsx", consolidated_id)
+
+        consolidated_file = FileModel(
+            id=consolidated_id,
+            user_id=user_id,
+            file_name=consolidated_name,
+            file_type=FileType.PROCESSED,
+            file_path=file_path,
+            file_size=file_size,
+            process_time=datetime.now(),
+            status=FileStatus.COMPLETED
+        )
+        db.add(consolidated_file)
+        await record_file_added(db, consolidated_file)
+        await db.commit()
+        await asyncio.to_thread(promote_canonical, staged_id, consolidated_id)
+        staged_id = None
+        await db.refresh(consolidated_file)
+    except Exception:
+        # 撤销未提交的存储引用；本次写入、没有已提交记录引用的文件随之删除
+        await db.rollback()
+        await storage.discard_unreferenced(db, file_path)
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if staged_id is not None:
+            discard_results([staged_id])
+
+    items = [breakdown[file_id] for file_id in file_ids]
+    summary = {
+        "sourceFiles": len(file_ids),
+        "mergedFiles": sum(1 for item in items if item["status"] == "completed"),
+        "failedFiles": sum(1 for item in items if item["status"] == "failed"),
+        "totalRows": rollup.total_rows,
+        "groupedRows": len(consolidated_df),
+        "columns": list(consolidated_df.columns),
+        "accountingMonthCol": consolidated_df.columns[0],
+        "numericCols": rollup.columns,
+        "workers": process_workers(),
+        "elapsedSeconds": round(elapsed, 3),
+    }
+    return consolidated_file, summary, items
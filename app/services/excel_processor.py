@@ -1,23 +1,51 @@
 import pandas as pd
+import csv
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime
+from itertools import chain, islice
 import uuid
+from xml.etree import ElementTree
+import zipfile
+
+from openpyxl import load_workbook
+
+# 会计月列可能的列名
+ACCOUNTING_MONTH_NAMES = ['会计月', '会计期间', '月份', '期间']
+
 
 class ExcelProcessor:
     """Excel文件处理器：按会计月汇总数据"""
     
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, sheet_name: Optional[str] = None):
         self.file_path = file_path
+        # 未指定时读取第一个工作表
+        self.sheet_name = sheet_name
+        # 表头所在行（从 0 开始），标题行、空行在表头之上时不为 0
+        self.header_row = 0
         self.df = None
         
     def load_file(self):
-        """加载Excel文件"""
+        """加载Excel文件（CSV 直接用 pandas 解析，不经过 openpyxl）"""
+        # 先用前几行定位表头，完整解析只做一次
+        self.header_row = detect_header_row(self.file_path, self.sheet_name)
+        skiprows = self.header_row or None
         try:
-            self.df = pd.read_excel(self.file_path, engine='openpyxl')
+            if os.path.splitext(self.file_path)[1].lower() == ".csv":
+                self.df = self._read_csv(skiprows)
+            else:
+                sheet = self.sheet_name if self.sheet_name is not None else 0
+                self.df = pd.read_excel(self.file_path, sheet_name=sheet, skiprows=skiprows, engine='openpyxl')
             return True
         except Exception as e:
             raise ValueError(f"文件读取失败: {str(e)}")
+
+    def _read_csv(self, skiprows: Optional[int] = None) -> pd.DataFrame:
+        # Excel 导出的中文 CSV 常见 GBK 编码
+        try:
+            return pd.read_csv(self.file_path, encoding='utf-8-sig', skiprows=skiprows)
+        except UnicodeDecodeError:
+            return pd.read_csv(self.file_path, encoding='gbk', skiprows=skiprows)
     
     def process_by_accounting_month(self) -> Dict[str, Any]:
         """
@@ -35,7 +63,7 @@ class ExcelProcessor:
         # 查找会计月列（可能的列名）
         accounting_month_col = None
         accounting_month_index = -1
-        possible_names = ['会计月', '会计期间', '月份', '期间']
+        possible_names = ACCOUNTING_MONTH_NAMES
         
         for idx, col in enumerate(self.df.columns):
             if any(name in str(col) for name in possible_names):
@@ -83,7 +111,8 @@ class ExcelProcessor:
             "columns": list(grouped_df.columns),
             "accountingMonthCol": accounting_month_col,
             "numericCols": numeric_cols,
-            "totalNumericCols": len(numeric_cols)
+            "totalNumericCols": len(numeric_cols),
+            "headerRow": self.header_row + 1
         }
         
         return {
@@ -131,3 +160,307 @@ class ExcelProcessor:
             "page": page,
             "pageSize": page_size
         }
+
+
+def aggregate_to_file(
+    source_path: str,
+    output_path: str,
+    sheet_name: Optional[str] = None,
+    streaming: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """读取、按会计月汇总并写出结果文件（供进程池调用，返回汇总结果和摘要）"""
+    df, summary = aggregate_sheet(source_path, sheet_name, streaming)
+    ExcelProcessor(source_path).save_processed_file(output_path, df)
+    return df, summary
+
+
+def aggregate_sheet(
+    source_path: str,
+    sheet_name: Optional[str] = None,
+    streaming: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    按会计月汇总单个工作表，只返回结果不写文件（供进程池调用）
+    streaming 为真时逐行累加，不构建整张表的 DataFrame（用于估算内存超出预算的大文件）
+    """
+    if streaming:
+        return _aggregate_streaming(source_path, sheet_name)
+    processor = ExcelProcessor(source_path, sheet_name)
+    processor.load_file()
+    result = processor.process_by_accounting_month()
+    return result["df"], result["summary"]
+
+
+def _aggregate_streaming(source_path: str, sheet_name: Optional[str]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    partial = month_partial_sums(source_path, sheet_name)
+    month_col = partial["accountingMonthCol"]
+    numeric_cols = partial["numericCols"]
+    months = list(partial["sums"])
+    # 与 pandas 分组结果一致：纯数字的会计月还原为数字并排序
+    if all(month.isdigit() for month in months):
+        months.sort(key=int)
+    data: Dict[str, list] = {month_col: [int(month) if month.isdigit() else month for month in months]}
+    for offset, col in enumerate(numeric_cols):
+        data[col] = [partial["sums"][month][offset] for month in months]
+    grouped_df = pd.DataFrame(data, columns=[month_col, *numeric_cols])
+    summary = {
+        "totalRows": partial["totalRows"],
+        "groupedRows": len(grouped_df),
+        "columns": list(grouped_df.columns),
+        "accountingMonthCol": month_col,
+        "numericCols": numeric_cols,
+        "totalNumericCols": len(numeric_cols),
+        "headerRow": partial["headerRow"],
+        "streaming": True
+    }
+    return grouped_df, summary
+
+
+def combine_grouped(results: List[Tuple[pd.DataFrame, Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    合并多个按会计月汇总的结果：会计月列统一为第一个结果的列名，
+    数值列按列名对齐（缺失补 0），相同会计月求和
+    """
+    month_col = results[0][1]["accountingMonthCol"]
+    frames = [
+        df.rename(columns={summary["accountingMonthCol"]: month_col})
+        for df, summary in results
+    ]
+    combined = pd.concat(frames, ignore_index=True, sort=False)
+    value_cols = [col for col in combined.columns if col != month_col]
+    combined[value_cols] = combined[value_cols].fillna(0)
+    grouped = combined.groupby(month_col, as_index=False, sort=False)[value_cols].sum()
+    try:
+        return grouped.sort_values(month_col, ignore_index=True)
+    except TypeError:
+        # 不同工作表的会计月类型不一致（数字/文本）时保持出现顺序
+        return grouped
+
+
+# 定位表头时读取的行数
+HEADER_SAMPLE_ROWS = 30
+# 给候选表头打分时参考其下方的行数
+HEADER_LOOKAHEAD_ROWS = 5
+
+
+def _is_blank(cell: Any) -> bool:
+    return cell is None or (isinstance(cell, str) and not cell.strip())
+
+
+def find_header_row(rows: List[tuple]) -> int:
+    """
+    在前若干行中找表头行（返回从 0 开始的行号）：候选行必须有单元格包含会计月列名，
+    再按 非空单元格占比、文本占比、下方几行中会计月之后的数值占比 打分；
+    没有候选行时返回 0，保持按第一行作为表头
+    """
+    width = max((sum(not _is_blank(cell) for cell in row) for row in rows), default=0)
+    best_index, best_score = 0, None
+    for index, row in enumerate(rows):
+        month_index = next(
+            (
+                position for position, cell in enumerate(row)
+                if isinstance(cell, str) and any(name in cell for name in ACCOUNTING_MONTH_NAMES)
+            ),
+            None
+        )
+        if month_index is None:
+            continue
+
+        cells = [cell for cell in row if not _is_blank(cell)]
+        filled = len(cells) / width if width else 0
+        # 表头单元格基本都是文本且互不重复
+        text_ratio = sum(_to_number(cell) is None for cell in cells) / len(cells)
+        unique_ratio = len({str(cell) for cell in cells}) / len(cells)
+
+        below = [
+            cell
+            for following in rows[index + 1:index + 1 + HEADER_LOOKAHEAD_ROWS]
+            for cell in following[month_index + 1:]
+            if not _is_blank(cell)
+        ]
+        numeric_below = sum(_to_number(cell) is not None for cell in below) / len(below) if below else 0
+
+        score = filled + text_ratio + unique_ratio + numeric_below
+        if best_score is None or score > best_score:
+            best_index, best_score = index, score
+    return best_index
+
+
+def _sample_rows(source_path: str, sheet_name: Optional[str], limit: int) -> List[tuple]:
+    if os.path.splitext(source_path)[1].lower() == ".csv":
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                with open(source_path, newline='', encoding=encoding) as f:
+                    return [tuple(row) for row in islice(csv.reader(f), limit)]
+            except UnicodeDecodeError:
+                continue
+        return []
+
+    workbook = load_workbook(source_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        return list(worksheet.iter_rows(max_row=limit, values_only=True))
+    finally:
+        workbook.close()
+
+
+def detect_header_row(source_path: str, sheet_name: Optional[str] = None, sample_rows: int = HEADER_SAMPLE_ROWS) -> int:
+    """只流式读取前 sample_rows 行定位表头；读取失败时返回 0，由完整解析报告错误"""
+    try:
+        return find_header_row(_sample_rows(source_path, sheet_name, sample_rows))
+    except Exception:
+        return 0
+
+
+# CSV 没有工作表，按单个工作表处理
+CSV_SHEET_NAME = "Sheet1"
+
+_SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+
+def _workbook_part(archive: zipfile.ZipFile) -> str:
+    # 工作簿部件的位置由包关系决定，通常是 xl/workbook.xml
+    try:
+        rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "xl/workbook.xml"
+    for rel in rels.iter(f"{_RELATIONSHIPS_NS}Relationship"):
+        if rel.get("Type") == _OFFICE_DOCUMENT_REL:
+            return rel.get("Target", "xl/workbook.xml").lstrip("/")
+    return "xl/workbook.xml"
+
+
+def list_sheets(source_path: str) -> List[str]:
+    """
+    列出工作表名称：xlsx 只读取压缩包中的 workbook.xml，不解析单元格数据和共享字符串
+    """
+    if os.path.splitext(source_path)[1].lower() == ".csv":
+        return [CSV_SHEET_NAME]
+    try:
+        with zipfile.ZipFile(source_path) as archive:
+            workbook = ElementTree.fromstring(archive.read(_workbook_part(archive)))
+        return [sheet.get("name") for sheet in workbook.iter(f"{_SPREADSHEET_NS}sheet")]
+    except zipfile.BadZipFile:
+        # 旧版 xls 等非 zip 格式
+        try:
+            return [str(name) for name in pd.ExcelFile(source_path).sheet_names]
+        except Exception as e:
+            raise ValueError(f"文件读取失败: {str(e)}")
+    except (KeyError, ElementTree.ParseError) as e:
+        raise ValueError(f"文件读取失败: 工作簿结构无效 ({str(e)})")
+
+
+def _iter_sheet_rows(source_path: str, sheet_name: Optional[str] = None) -> Iterator[tuple]:
+    """逐行读取工作表（默认第一个，CSV 按行解析），不把整个文件载入内存"""
+    if os.path.splitext(source_path)[1].lower() == ".csv":
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                with open(source_path, newline='', encoding=encoding) as f:
+                    # 先完整校验编码，避免读到一半才发现需要换编码
+                    for _ in f:
+                        pass
+            except UnicodeDecodeError:
+                continue
+            with open(source_path, newline='', encoding=encoding) as f:
+                yield from (tuple(row) for row in csv.reader(f))
+            return
+        raise ValueError("文件读取失败: 无法识别CSV编码")
+
+    workbook = load_workbook(source_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _to_number(value: Any):
+    # 与 pd.to_numeric(errors='coerce') 一致：数字和数字字符串计入，其余视为空
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if value != value else value
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _month_key(value: Any) -> Optional[str]:
+    # 不同文件中的会计月可能是数字或文本（202501 / "202501" / 202501.0），统一成文本
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer():
+            value = int(value)
+    if isinstance(value, datetime):
+        return value.strftime("%Y%m")
+    key = str(value).strip()
+    return key or None
+
+
+def month_partial_sums(source_path: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    流式计算一个文件按会计月的部分和（供进程池调用）
+    内存占用只与 会计月数 x 数值列数 有关，与总行数无关
+    """
+    try:
+        rows = _iter_sheet_rows(source_path, sheet_name)
+        sample = list(islice(rows, HEADER_SAMPLE_ROWS))
+        if not sample:
+            raise ValueError("文件内容为空")
+        header_index = find_header_row(sample)
+        header = sample[header_index]
+        rows = chain(sample[header_index + 1:], rows)
+        columns = [str(name) if name is not None else f"Unnamed: {idx}" for idx, name in enumerate(header)]
+
+        month_index = next(
+            (idx for idx, name in enumerate(columns) if any(key in name for key in ACCOUNTING_MONTH_NAMES)),
+            None
+        )
+        if month_index is None:
+            raise ValueError("未找到'会计月'列，请确保Excel中包含该字段")
+        value_columns = columns[month_index + 1:]
+        if not value_columns:
+            raise ValueError("会计月列之后没有数据列")
+
+        sums: Dict[str, List] = {}
+        has_number = [False] * len(value_columns)
+        total_rows = 0
+        for row in rows:
+            if not any(cell is not None and cell != "" for cell in row):
+                continue
+            total_rows += 1
+            month = _month_key(row[month_index] if month_index < len(row) else None)
+            if month is None:
+                continue
+            bucket = sums.get(month)
+            if bucket is None:
+                bucket = sums[month] = [0] * len(value_columns)
+            for offset, cell in enumerate(row[month_index + 1:month_index + 1 + len(value_columns)]):
+                number = _to_number(cell)
+                if number is not None:
+                    bucket[offset] += number
+                    has_number[offset] = True
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"文件读取失败: {str(e)}")
+
+    numeric_offsets = [offset for offset, flag in enumerate(has_number) if flag]
+    if not numeric_offsets:
+        raise ValueError("会计月之后未找到可汇总的数值列")
+
+    return {
+        "accountingMonthCol": columns[month_index],
+        "numericCols": [value_columns[offset] for offset in numeric_offsets],
+        "sums": {month: [bucket[offset] for offset in numeric_offsets] for month, bucket in sums.items()},
+        "totalRows": total_rows,
+        "headerRow": header_index + 1,
+    }
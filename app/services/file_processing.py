@@ -0,0 +1,240 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import multiprocessing
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import uuid
+
+import pandas as pd
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.file import File as FileModel, FileStatus, FileType
+from app.services.aggregate_cube import write_facts
+from app.services.cleanup import detach_file
+from app.services.excel_processor import aggregate_sheet, aggregate_to_file, combine_grouped
+from app.services.query_store import drop_tables
+from app.services.result_formats import discard_results, promote_canonical, save_canonical
+from app.services.stats_rollup import record_file_added
+from app.services.storage import get_storage
+from app.services.workbook_inspector import exceeds_parse_budget, inspect_workbook
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+# 多个工作表的输出方式：合并为一个汇总表，或每个工作表各自一个汇总表
+SHEET_MODE_COMBINED = "combined"
+SHEET_MODE_SEPARATE = "separate"
+SHEET_COLUMN = "工作表"
+
+
+def process_workers() -> int:
+    if settings.BATCH_PROCESS_WORKERS > 0:
+        return settings.BATCH_PROCESS_WORKERS
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def get_process_executor() -> ProcessPoolExecutor:
+    """
+    Excel 解析/汇总是 CPU 密集且持有 GIL，放到子进程中执行，吞吐随核数扩展
+    使用 spawn 启动，避免在已有线程的进程里 fork
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=process_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_process_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_in_process(func: Callable, *args):
+    """在进程池中执行 func(*args)"""
+    global _executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_process_executor(), func, *args)
+    except BrokenProcessPool:
+        # 子进程异常退出（如内存不足）后进程池不可再用，下次调用时重建
+        _executor = None
+        raise RuntimeError("处理进程异常退出，请稍后重试")
+
+
+async def ensure_parse_estimate(file_record: FileModel) -> Optional[int]:
+    """
+    返回文件的估算解析内存；上传早于估算功能的记录在此补做检查并写回（由调用方提交）
+    工作簿超出解压限制时抛出 WorkbookRejected
+    """
+    if file_record.estimated_memory_bytes is None:
+        info = await asyncio.to_thread(inspect_workbook, file_record.file_path)
+        if info is not None:
+            file_record.estimated_rows = info["estimatedRows"]
+            file_record.estimated_memory_bytes = info["estimatedMemoryBytes"]
+    return file_record.estimated_memory_bytes
+
+
+def _write_sheets(output_path: str, sheets: List[Tuple[str, pd.DataFrame]]) -> None:
+    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        for sheet_name, df in sheets:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+async def _aggregate_sheets(
+    source_path: str,
+    sheets: List[str],
+    sheet_mode: str,
+    output_path: str,
+    streaming: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Any], pd.DataFrame]:
+    """
+    多个工作表在进程池中并行汇总，再合并或分工作表写出，返回 (合并结果, 摘要, 规范形式)
+    单个工作表失败（如缺少会计月列）只记录在摘要中，全部失败时抛出异常
+    """
+    outcomes = await asyncio.gather(
+        *(run_in_process(aggregate_sheet, source_path, sheet, streaming) for sheet in sheets),
+        return_exceptions=True
+    )
+    succeeded = []
+    sheet_summaries = []
+    for sheet, outcome in zip(sheets, outcomes):
+        if isinstance(outcome, BaseException):
+            sheet_summaries.append({"sheet": sheet, "totalRows": 0, "groupedRows": 0, "error": str(outcome)})
+            continue
+        succeeded.append((sheet, outcome))
+        sheet_summaries.append({
+            "sheet": sheet,
+            "totalRows": outcome[1]["totalRows"],
+            "groupedRows": outcome[1]["groupedRows"],
+            "error": None,
+        })
+    if not succeeded:
+        raise ValueError("；".join(f"{item['sheet']}: {item['error']}" for item in sheet_summaries))
+
+    combined_df = combine_grouped([outcome for _, outcome in succeeded])
+    month_col = combined_df.columns[0]
+    if sheet_mode == SHEET_MODE_SEPARATE:
+        await asyncio.to_thread(_write_sheets, output_path, [(sheet, df) for sheet, (df, _) in succeeded])
+        # 其他下载格式只有一张表：各工作表结果加一列工作表名后纵向拼接
+        frames = []
+        for sheet, (df, sheet_summary) in succeeded:
+            frame = df.rename(columns={sheet_summary["accountingMonthCol"]: month_col})
+            frame.insert(0, SHEET_COLUMN, sheet)
+            frames.append(frame)
+        result_df = pd.concat(frames, ignore_index=True, sort=False).fillna(0)
+    else:
+        await asyncio.to_thread(_write_sheets, output_path, [(succeeded[0][0], combined_df)])
+        result_df = combined_df
+
+    numeric_cols = [col for col in combined_df.columns if col != month_col]
+    summary = {
+        "totalRows": sum(item["totalRows"] for item in sheet_summaries),
+        "groupedRows": len(combined_df),
+        "columns": list(result_df.columns),
+        "accountingMonthCol": month_col,
+        "numericCols": numeric_cols,
+        "totalNumericCols": len(numeric_cols),
+        "sheetMode": sheet_mode,
+        "sheets": sheet_summaries,
+        "streaming": streaming,
+    }
+    # 事实表始终按合并结果写入
+    return combined_df, summary, result_df
+
+
+async def process_original_file(
+    db: AsyncSession,
+    original_file: FileModel,
+    sheets: Optional[List[str]] = None,
+    sheet_mode: str = SHEET_MODE_COMBINED
+) -> Tuple[FileModel, Dict[str, Any]]:
+    """
+    按会计月汇总一个原始文件，保存处理后的文件并写入记录，返回 (处理后文件记录, 摘要)
+    sheets 为空时只处理第一个工作表；多个工作表时并行处理后按 sheet_mode 输出
+    失败时把原文件标记为 FAILED 后重新抛出异常
+    """
+    original_file.status = FileStatus.PROCESSING
+    await db.commit()
+
+    storage = get_storage()
+    tmp_path = storage.temp_path(".xlsx")
+    staged_id: Optional[str] = None
+    processed_file_path: Optional[str] = None
+    try:
+        # 估算内存超出预算的文件逐行汇总，避免整表载入把工作进程撑爆
+        streaming = exceeds_parse_budget(await ensure_parse_estimate(original_file))
+        if sheets and len(sheets) > 1:
+            processed_df, summary, result_df = await _aggregate_sheets(
+                original_file.file_path, sheets, sheet_mode, tmp_path, streaming
+            )
+        else:
+            processed_df, summary = await run_in_process(
+                aggregate_to_file, original_file.file_path, tmp_path, sheets[0] if sheets else None, streaming
+            )
+            result_df = processed_df
+
+        processed_file_id = f"{original_file.id}_processed"
+        processed_filename = f"{os.path.splitext(original_file.file_name)[0]}_处理后.xlsx"
+        # 保存规范形式，其他下载格式按需从它生成；先以临时 id 保存，提交成功后再替换上一次的结果
+        staged_id = f"{processed_file_id}.{uuid.uuid4().hex}"
+        await asyncio.to_thread(save_canonical, staged_id, result_df)
+
+        # 重新处理时在同一事务内替换上一次的结果（包括已软删除、尚未回收的记录），避免主键冲突；
+        # 旧的物理文件在提交后才删除，失败回滚时旧记录和文件保持不变
+        released = await detach_file(db, processed_file_id)
+        # 按记录 id 命名的存储布局中，新文件不能覆盖仍被旧记录使用的文件
+        name_hint = processed_file_id if released is None else f"{processed_file_id}_{uuid.uuid4().hex[:8]}"
+        processed_file_size = os.path.getsize(tmp_path)
+        processed_file_path = await storage.save_file(db, tmp_path, ".xlsx", name_hint)
+
+        processed_file = FileModel(
+            id=processed_file_id,
+            user_id=original_file.user_id,
+            file_name=processed_filename,
+            file_type=FileType.PROCESSED,
+            file_path=processed_file_path,
+            file_size=processed_file_size,
+            original_file_id=original_file.id,
+            process_time=datetime.now(),
+            status=FileStatus.COMPLETED
+        )
+        db.add(processed_file)
+        await record_file_added(db, processed_file)
+        # 汇总结果同时写入事实表，供跨文件的时间维度查询
+        await write_facts(
+            db, processed_file_id, original_file.user_id,
+            processed_df, summary["accountingMonthCol"], summary["numericCols"]
+        )
+
+        original_file.status = FileStatus.COMPLETED
+        original_file.process_time = datetime.now()
+
+        await db.commit()
+        await asyncio.to_thread(promote_canonical, staged_id, processed_file_id)
+        staged_id = None
+        if released is not None:
+            await storage.unlink_released(db, released)
+            # 上一次结果建立的查询表已过期
+            await asyncio.to_thread(drop_tables, [processed_file_id])
+        await db.refresh(processed_file)
+        return processed_file, summary
+    except Exception:
+        # 撤销未提交的存储引用后更新状态；本次写入、没有已提交记录引用的文件随之删除
+        await db.rollback()
+        await storage.discard_unreferenced(db, processed_file_path)
+        original_file.status = FileStatus.FAILED
+        await db.commit()
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if staged_id is not None:
+            discard_results([staged_id])
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.file import File as FileModel
+from app.services.cleanup import purge_files
+from app.services.stats_rollup import record_removals_where
+
+logger = logging.getLogger(__name__)
+
+_reaper_lock = asyncio.Lock()
+
+
+async def soft_delete_files(db: AsyncSession, *conditions) -> int:
+    """
+    软删除：只标记 deleted_at 并扣减统计，物理文件由回收任务异步删除
+    调用方负责提交事务
+    """
+    await record_removals_where(db, *conditions)
+    result = await db.execute(
+        update(FileModel)
+        .where(FileModel.deleted_at.is_(None), *conditions)
+        .values(deleted_at=datetime.utcnow())
+    )
+    return result.rowcount or 0
+
+
+async def reap_deleted_files(db: AsyncSession, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """分批物理删除已软删除的文件及记录（幂等，可重复执行）"""
+    return await purge_files(db, FileModel.deleted_at.is_not(None), batch_size=batch_size)
+
+
+async def run_reaper() -> Optional[Dict[str, int]]:
+    """后台回收入口；已有回收任务在运行时直接跳过"""
+    if _reaper_lock.locked():
+        return None
+    async with _reaper_lock:
+        async with AsyncSessionLocal() as session:
+            result = await reap_deleted_files(session)
+    if result["deletedRecords"]:
+        logger.info("reaper finished: %s", result)
+    return result
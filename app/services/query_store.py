@@ -0,0 +1,267 @@
+from contextlib import closing
+from datetime import date, datetime, time
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.excel_processor import ExcelProcessor
+from app.services.result_formats import load_canonical
+
+# 可查询的条件运算符 -> SQL 片段（值一律以参数绑定）
+FILTER_OPERATORS = {
+    "eq": "{col} = ?",
+    "ne": "{col} <> ?",
+    "gt": "{col} > ?",
+    "gte": "{col} >= ?",
+    "lt": "{col} < ?",
+    "lte": "{col} <= ?",
+    "contains": "{col} LIKE ? ESCAPE '\\'",
+    "prefix": "{col} LIKE ? ESCAPE '\\'",
+    "in": "{col} IN ({placeholders})",
+    "isnull": "{col} IS NULL",
+    "notnull": "{col} IS NOT NULL",
+}
+
+CATALOG_TABLE = "_catalog"
+INSERT_CHUNK_ROWS = 2000
+
+
+class QueryStoreError(ValueError):
+    pass
+
+
+def _connect() -> sqlite3.Connection:
+    path = settings.QUERY_STORE_PATH
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    # WAL：查询与其他文件的导入互不阻塞
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+            file_id TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            columns TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def _table_name(file_id: str) -> str:
+    # 文件ID只含字母、数字、下划线；其余字符替换后再加引号使用
+    return "t_" + "".join(ch if ch.isalnum() or ch == "_" else "_" for ch in file_id)
+
+
+def _column_type(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "TEXT"
+    # object 列：全是数字时按数值存储，便于比较和排序
+    values = series.dropna()
+    if len(values) and all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in values):
+        return "INTEGER"
+    if len(values) and all(isinstance(value, (int, float, np.integer, np.floating)) for value in values):
+        return "REAL"
+    return "TEXT"
+
+
+def _to_sql_value(value: Any):
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (np.integer, np.bool_, bool)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (datetime, date, time, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, int):
+        return value
+    return str(value)
+
+
+def _load_frame(file_id: str, source_path: str, sheet_name: Optional[str]) -> pd.DataFrame:
+    # 未指定工作表时，处理结果从规范形式导入（与下载的内容一致，包括多工作表的合并结果）
+    if sheet_name is None:
+        df = load_canonical(file_id)
+        if df is not None:
+            return df
+    processor = ExcelProcessor(source_path, sheet_name)
+    processor.load_file()
+    return processor.df
+
+
+def ingest_file(file_id: str, source_path: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    把文件的数据行导入查询库中的独立表（供进程池调用）：
+    sheet_name 为空时导入第一个工作表（处理结果导入完整的规范形式），
+    列类型按解析后的 DataFrame 推断，每列建索引，已有的表先删除再重建
+    """
+    df = _load_frame(file_id, source_path, sheet_name)
+
+    names = [str(col) for col in df.columns]
+    if len(set(names)) != len(names):
+        raise QueryStoreError("存在重复的列名，无法建立查询索引")
+    columns = [
+        {"name": name, "column": f"c{index}", "type": _column_type(df[col])}
+        for index, (name, col) in enumerate(zip(names, df.columns))
+    ]
+    table = _table_name(file_id)
+    definition = ", ".join(f'"{col["column"]}" {col["type"]}' for col in columns)
+    placeholders = ", ".join("?" for _ in columns)
+
+    with closing(_connect()) as conn:
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'CREATE TABLE "{table}" (rowid INTEGER PRIMARY KEY, {definition})')
+            rows = df.itertuples(index=False, name=None)
+            while True:
+                chunk = [
+                    tuple(_to_sql_value(value) for value in row)
+                    for _, row in zip(range(INSERT_CHUNK_ROWS), rows)
+                ]
+                if not chunk:
+                    break
+                conn.executemany(f'INSERT INTO "{table}" VALUES (NULL, {placeholders})', chunk)
+            # 数据写完后再建索引，比逐行维护索引快
+            for col in columns[:settings.QUERY_STORE_MAX_INDEXES]:
+                conn.execute(f'CREATE INDEX "ix_{table}_{col["column"]}" ON "{table}" ("{col["column"]}")')
+            conn.execute(
+                f"INSERT OR REPLACE INTO {CATALOG_TABLE} VALUES (?, ?, ?, ?, ?)",
+                (file_id, table, json.dumps(columns, ensure_ascii=False), len(df), datetime.utcnow().isoformat()),
+            )
+
+    return {
+        "fileId": file_id,
+        "rowCount": len(df),
+        "columns": [{"name": col["name"], "type": col["type"]} for col in columns],
+    }
+
+
+def _catalog_entry(conn: sqlite3.Connection, file_id: str) -> Optional[Tuple[str, List[Dict[str, str]], int]]:
+    row = conn.execute(
+        f"SELECT table_name, columns, row_count FROM {CATALOG_TABLE} WHERE file_id = ?", (file_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return row[0], json.loads(row[1]), row[2]
+
+
+def describe(file_id: str) -> Optional[Dict[str, Any]]:
+    with closing(_connect()) as conn:
+        entry = _catalog_entry(conn, file_id)
+    if entry is None:
+        return None
+    _, columns, row_count = entry
+    return {
+        "fileId": file_id,
+        "rowCount": row_count,
+        "columns": [{"name": col["name"], "type": col["type"]} for col in columns],
+    }
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filter_clause(column: Dict[str, str], op: str, value: Any) -> Tuple[str, List[Any]]:
+    if op not in FILTER_OPERATORS:
+        raise QueryStoreError(f"不支持的运算符: {op}")
+    col = f'"{column["column"]}"'
+    if op in ("isnull", "notnull"):
+        return FILTER_OPERATORS[op].format(col=col), []
+    if op == "in":
+        if not isinstance(value, list) or not value:
+            raise QueryStoreError("in 运算符需要非空数组")
+        if len(value) > settings.QUERY_STORE_MAX_LIMIT:
+            raise QueryStoreError("in 运算符的值过多")
+        placeholders = ", ".join("?" for _ in value)
+        return FILTER_OPERATORS[op].format(col=col, placeholders=placeholders), [_to_sql_value(v) for v in value]
+    if value is None or isinstance(value, (list, dict)):
+        raise QueryStoreError(f"{op} 运算符需要单个值")
+    if op == "contains":
+        return FILTER_OPERATORS[op].format(col=col), [f"%{_escape_like(str(value))}%"]
+    if op == "prefix":
+        return FILTER_OPERATORS[op].format(col=col), [f"{_escape_like(str(value))}%"]
+    return FILTER_OPERATORS[op].format(col=col), [_to_sql_value(value)]
+
+
+def query(
+    file_id: str,
+    filters: Sequence[Dict[str, Any]] = (),
+    sort: Sequence[Dict[str, Any]] = (),
+    limit: int = 20,
+    offset: int = 0,
+) -> Optional[Dict[str, Any]]:
+    """
+    在已导入的表上执行过滤/排序/分页：列名必须是导入时登记的列，运算符来自白名单，
+    值以参数绑定；未建立索引时返回 None
+    """
+    with closing(_connect()) as conn:
+        entry = _catalog_entry(conn, file_id)
+        if entry is None:
+            return None
+        table, columns, _ = entry
+        by_name = {col["name"]: col for col in columns}
+
+        def resolve(name: str) -> Dict[str, str]:
+            if name not in by_name:
+                raise QueryStoreError(f"列不存在: {name}")
+            return by_name[name]
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        for item in filters:
+            clause, values = _filter_clause(resolve(item["column"]), item["op"], item.get("value"))
+            clauses.append(clause)
+            params.extend(values)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        order_parts = [
+            f'"{resolve(item["column"])["column"]}" {"DESC" if item.get("desc") else "ASC"}'
+            for item in sort
+        ]
+        # 最后按导入顺序，保证分页稳定
+        order_parts.append("rowid ASC")
+
+        total = conn.execute(f'SELECT COUNT(*) FROM "{table}"{where}', params).fetchone()[0]
+        select_cols = ", ".join(f'"{col["column"]}"' for col in columns)
+        cursor = conn.execute(
+            f'SELECT {select_cols} FROM "{table}"{where} ORDER BY {", ".join(order_parts)} LIMIT ? OFFSET ?',
+            [*params, limit, offset],
+        )
+        rows = [dict(zip(by_name, row)) for row in cursor.fetchall()]
+
+    return {
+        "columns": list(by_name),
+        "rows": rows,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+def drop_tables(file_ids: Iterable[str]) -> None:
+    """文件被物理删除时删除对应的查询表"""
+    file_ids = list(file_ids)
+    if not file_ids or not os.path.exists(settings.QUERY_STORE_PATH):
+        return
+    with closing(_connect()) as conn:
+        with conn:
+            for file_id in file_ids:
+                entry = _catalog_entry(conn, file_id)
+                if entry is None:
+                    continue
+                conn.execute(f'DROP TABLE IF EXISTS "{entry[0]}"')
+                conn.execute(f"DELETE FROM {CATALOG_TABLE} WHERE file_id = ?", (file_id,))
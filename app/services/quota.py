@@ -0,0 +1,65 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.file import File as FileModel
+from app.models.user import User
+
+
+def effective_quota(quota_bytes: Optional[int]) -> int:
+    """用户未单独设置时使用默认配额；0 表示不限制"""
+    return settings.DEFAULT_USER_QUOTA_BYTES if quota_bytes is None else quota_bytes
+
+
+async def apply_usage_delta(db: AsyncSession, user_id: str, bytes_delta: int, count_delta: int) -> None:
+    """与 File 记录写入/删除在同一事务中更新用户用量"""
+    if not bytes_delta and not count_delta:
+        return
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            storage_bytes_used=User.storage_bytes_used + bytes_delta,
+            storage_file_count=User.storage_file_count + count_delta,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def ensure_quota_available(db: AsyncSession, user_id: str, incoming_bytes: int) -> None:
+    """按主键读取已维护的用量判断配额，超出时返回 413"""
+    row = (
+        await db.execute(
+            select(User.storage_quota_bytes, User.storage_bytes_used).where(User.id == user_id)
+        )
+    ).one_or_none()
+    if row is None:
+        return
+    quota = effective_quota(row[0])
+    if quota and row[1] + incoming_bytes > quota:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"存储空间不足（已用 {row[1] / 1024 / 1024:.2f}MB / 配额 {quota / 1024 / 1024:.2f}MB）",
+        )
+
+
+async def reconcile_user_usage(db: AsyncSession) -> int:
+    """按 files 表重新计算所有用户的用量（定时对账）"""
+    live_files = FileModel.deleted_at.is_(None)
+    result = await db.execute(
+        update(User)
+        .values(
+            storage_bytes_used=select(func.coalesce(func.sum(FileModel.file_size), 0))
+            .where(FileModel.user_id == User.id, live_files)
+            .scalar_subquery(),
+            storage_file_count=select(func.count(FileModel.id))
+            .where(FileModel.user_id == User.id, live_files)
+            .scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount or 0
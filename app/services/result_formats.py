@@ -0,0 +1,183 @@
+import gzip
+import json
+import logging
+import os
+from typing import Dict, Iterable, Optional, Tuple
+import uuid
+
+import pandas as pd
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# format -> (扩展名, 媒体类型)；xlsx 是处理时直接生成的存储文件，不经过缓存
+RESULT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "csv": (".csv", "text/csv; charset=utf-8"),
+    "json": (".json", "application/json"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+# 上传目录下的汇总结果目录，存储对账时跳过
+RESULTS_DIR = "results"
+CANONICAL_SUFFIX = ".json.gz"
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+def _results_root() -> str:
+    return os.path.join(settings.UPLOAD_DIR, RESULTS_DIR)
+
+
+def canonical_path(file_id: str) -> str:
+    return os.path.join(_results_root(), "canonical", f"{file_id}{CANONICAL_SUFFIX}")
+
+
+def render_path(file_id: str, fmt: str) -> str:
+    return os.path.join(_results_root(), "cache", f"{file_id}{RESULT_FORMATS[fmt][0]}")
+
+
+def _atomic_write(path: str, writer) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def save_canonical(file_id: str, df: pd.DataFrame) -> None:
+    """
+    保存汇总结果的规范形式：gzip 压缩的列式 JSON（列名、dtype、按列存放的值）
+    覆盖保存时同时作废已生成的其他格式
+    """
+    payload = {
+        "columns": [str(col) for col in df.columns],
+        "dtypes": [str(dtype) for dtype in df.dtypes],
+        "data": [df[col].tolist() for col in df.columns],
+    }
+
+    def write(path: str) -> None:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+
+    _atomic_write(canonical_path(file_id), write)
+    for fmt in RESULT_FORMATS:
+        _unlink(render_path(file_id, fmt))
+
+
+def promote_canonical(staged_id: str, file_id: str) -> None:
+    """把以临时 id 保存的规范形式换到正式 id 下，同时作废已生成的其他格式"""
+    os.replace(canonical_path(staged_id), canonical_path(file_id))
+    for fmt in RESULT_FORMATS:
+        _unlink(render_path(file_id, fmt))
+
+
+def load_canonical(file_id: str) -> Optional[pd.DataFrame]:
+    try:
+        with gzip.open(canonical_path(file_id), "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    df = pd.DataFrame(dict(zip(payload["columns"], payload["data"])), columns=payload["columns"])
+    for col, dtype in zip(payload["columns"], payload["dtypes"]):
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            pass
+    return df
+
+
+def _write_format(df: pd.DataFrame, fmt: str, path: str) -> None:
+    if fmt == "csv":
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    elif fmt == "json":
+        df.to_json(path, orient="records", force_ascii=False)
+    elif fmt == "parquet":
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError:
+            raise UnsupportedFormatError("服务器未安装 pyarrow，暂不支持 parquet 格式")
+
+
+def _enforce_budget(keep: str) -> None:
+    """渲染缓存超过 RESULT_CACHE_MAX_BYTES 时按最近访问时间淘汰（规范形式不参与淘汰）"""
+    cache_dir = os.path.dirname(keep)
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            stat_result = entry.stat()
+            entries.append((stat_result.st_mtime, entry.path, stat_result.st_size))
+            total += stat_result.st_size
+
+    for _, path, size in sorted(entries):
+        if total <= settings.RESULT_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        _unlink(path)
+        total -= size
+
+
+def render(file_id: str, fmt: str, source_path: Optional[str] = None) -> str:
+    """
+    返回指定格式的结果文件路径，首次请求时从规范形式生成并缓存
+    旧的处理结果没有规范形式时，从处理后的 xlsx 解析一次并补存
+    """
+    if fmt not in RESULT_FORMATS:
+        raise UnsupportedFormatError(f"不支持的格式: {fmt}")
+
+    path = render_path(file_id, fmt)
+    if os.path.exists(path):
+        # 命中时更新 mtime，供淘汰时作为最近访问时间
+        os.utime(path)
+        return path
+
+    df = load_canonical(file_id)
+    if df is None:
+        if not source_path or not os.path.exists(source_path):
+            raise FileNotFoundError(file_id)
+        df = pd.read_excel(source_path, engine="openpyxl")
+        save_canonical(file_id, df)
+
+    _atomic_write(path, lambda tmp_path: _write_format(df, fmt, tmp_path))
+    _enforce_budget(keep=path)
+    return path
+
+
+def restore_render(relative_path: str) -> Optional[str]:
+    """签名链接指向的缓存文件已被淘汰时，按路径重新生成"""
+    parts = os.path.normpath(relative_path).split(os.sep)
+    if len(parts) != 3 or parts[:2] != [RESULTS_DIR, "cache"]:
+        return None
+    file_id, extension = os.path.splitext(parts[2])
+    for fmt, (ext, _) in RESULT_FORMATS.items():
+        if ext == extension:
+            try:
+                return render(file_id, fmt)
+            except (FileNotFoundError, UnsupportedFormatError):
+                return None
+    return None
+
+
+def discard_results(file_ids: Iterable[str]) -> None:
+    """文件记录被物理删除时清理对应的规范形式和渲染缓存"""
+    for file_id in file_ids:
+        _unlink(canonical_path(file_id))
+        for fmt in RESULT_FORMATS:
+            _unlink(render_path(file_id, fmt))
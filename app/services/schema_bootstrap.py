@@ -16,6 +16,32 @@ async def ensure_sqlite_compat(engine: AsyncEngine) -> None:
             await conn.execute(text("ALTER TABLE users ADD COLUMN is_admin BOOLEAN NOT NULL DEFAULT 0"))
         if "last_login_at" not in user_columns:
             await conn.execute(text("ALTER TABLE users ADD COLUMN last_login_at DATETIME"))
+        if "storage_quota_bytes" not in user_columns:
+            await conn.execute(text("ALTER TABLE users ADD COLUMN storage_quota_bytes BIGINT"))
+        if "storage_bytes_used" not in user_columns:
+            await conn.execute(text("ALTER TABLE users ADD COLUMN storage_bytes_used BIGINT NOT NULL DEFAULT 0"))
+            await conn.execute(
+                text(
+                    """
+                    UPDATE users SET storage_bytes_used = (
+                        SELECT COALESCE(SUM(file_size), 0) FROM files
+                        WHERE files.user_id = users.id AND files.deleted_at IS NULL
+                    )
+                    """
+                )
+            )
+        if "storage_file_count" not in user_columns:
+            await conn.execute(text("ALTER TABLE users ADD COLUMN storage_file_count INTEGER NOT NULL DEFAULT 0"))
+            await conn.execute(
+                text(
+                    """
+                    UPDATE users SET storage_file_count = (
+                        SELECT COUNT(id) FROM files
+                        WHERE files.user_id = users.id AND files.deleted_at IS NULL
+                    )
+                    """
+                )
+            )
 
         files_cols = await conn.execute(text("PRAGMA table_info(files)"))
         file_columns = {row[1] for row in files_cols.fetchall()}
@@ -23,6 +49,13 @@ async def ensure_sqlite_compat(engine: AsyncEngine) -> None:
             await conn.execute(text("ALTER TABLE files ADD COLUMN deleted_at DATETIME"))
         if "remark" not in file_columns:
             await conn.execute(text("ALTER TABLE files ADD COLUMN remark VARCHAR(255) NOT NULL DEFAULT ''"))
+        if "estimated_rows" not in file_columns:
+            await conn.execute(text("ALTER TABLE files ADD COLUMN estimated_rows BIGINT"))
+        if "estimated_memory_bytes" not in file_columns:
+            await conn.execute(text("ALTER TABLE files ADD COLUMN estimated_memory_bytes BIGINT"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_files_deleted_at ON files (deleted_at)"))
+        # 存储对账按 file_path 分页
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_files_file_path ON files (file_path)"))
 
         await conn.execute(
             text(
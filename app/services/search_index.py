@@ -0,0 +1,151 @@
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# FTS5 trigram 分词至少需要 3 个字符，更短的关键词回退到 LIKE
+MIN_FTS_KEYWORD_LENGTH = 3
+
+# 外部内容表：索引只存倒排数据，原文仍在 files/users 表中，通过 rowid 关联
+SEARCH_INDEX_DDL: List[str] = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+        file_name, content='files', content_rowid='rowid', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts(rowid, file_name) VALUES (new.rowid, new.file_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN
+        INSERT INTO files_fts(files_fts, rowid, file_name) VALUES ('delete', old.rowid, old.file_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE OF file_name ON files BEGIN
+        INSERT INTO files_fts(files_fts, rowid, file_name) VALUES ('delete', old.rowid, old.file_name);
+        INSERT INTO files_fts(rowid, file_name) VALUES (new.rowid, new.file_name);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        username, nickname, content='users', content_rowid='rowid', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, username, nickname) VALUES (new.rowid, new.username, new.nickname);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, nickname)
+        VALUES ('delete', old.rowid, old.username, old.nickname);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username, nickname ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, nickname)
+        VALUES ('delete', old.rowid, old.username, old.nickname);
+        INSERT INTO users_fts(rowid, username, nickname) VALUES (new.rowid, new.username, new.nickname);
+    END
+    """,
+]
+
+REBUILD_SEARCH_INDEX_SQL: List[str] = [
+    "INSERT INTO files_fts(files_fts) VALUES ('rebuild')",
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+]
+
+_fts_enabled = False
+
+
+def fts_enabled() -> bool:
+    return _fts_enabled
+
+
+async def ensure_search_index(engine: AsyncEngine) -> None:
+    """
+    创建后台关键词搜索的 FTS5 影子索引（仅 SQLite）
+    首次创建时从现有数据重建；SQLite 不支持 FTS5/trigram 时保持 LIKE 查询
+    """
+    global _fts_enabled
+
+    if engine.url.get_backend_name() != "sqlite":
+        return
+
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')"))
+            await conn.execute(text("DROP TABLE temp.fts_probe"))
+    except Exception:
+        _fts_enabled = False
+        return
+
+    async with engine.begin() as conn:
+        existing = await conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('files_fts', 'users_fts')")
+        )
+        is_new = len(existing.fetchall()) < 2
+        for ddl in SEARCH_INDEX_DDL:
+            await conn.execute(text(ddl))
+        if is_new:
+            for sql in REBUILD_SEARCH_INDEX_SQL:
+                await conn.execute(text(sql))
+
+    _fts_enabled = True
+
+
+async def rebuild_search_index(engine: AsyncEngine) -> bool:
+    """
+    全量重建索引（VACUUM 可能改变 rowid，执行后需要重建），返回是否执行了重建
+    入口：POST /api/v1/admin/search-index/rebuild 或 python -m app.services.search_index
+    """
+    if not _fts_enabled:
+        return False
+    async with engine.begin() as conn:
+        for sql in REBUILD_SEARCH_INDEX_SQL:
+            await conn.execute(text(sql))
+    return True
+
+
+def _fts_phrase(keyword: str) -> str:
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def file_name_search_condition(keyword: str):
+    """files.file_name 子串匹配条件；None 表示调用方应使用 LIKE"""
+    if not _fts_enabled or len(keyword) < MIN_FTS_KEYWORD_LENGTH:
+        return None
+    return text("files.rowid IN (SELECT rowid FROM files_fts WHERE files_fts MATCH :file_kw)").bindparams(
+        file_kw=_fts_phrase(keyword)
+    )
+
+
+def user_search_condition(keyword: str):
+    """users.username / users.nickname 子串匹配条件；None 表示调用方应使用 LIKE"""
+    if not _fts_enabled or len(keyword) < MIN_FTS_KEYWORD_LENGTH:
+        return None
+    return text("users.rowid IN (SELECT rowid FROM users_fts WHERE users_fts MATCH :user_kw)").bindparams(
+        user_kw=_fts_phrase(keyword)
+    )
+
+
+if __name__ == "__main__":
+    # 手动重建：python -m app.services.search_index
+    import asyncio
+
+    import app.models  # noqa: F401  注册全部模型，供 create_all 建表
+    from app.core.database import Base, engine
+
+    async def _main() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await ensure_search_index(engine)
+        rebuilt = await rebuild_search_index(engine)
+        await engine.dispose()
+        print("搜索索引已重建" if rebuilt else "当前数据库不支持 FTS5 搜索索引，无需重建")
+
+    asyncio.run(_main())
@@ -0,0 +1,223 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File as FileModel
+from app.models.stats_rollup import FileStatsDaily
+from app.models.user import User
+from app.services.quota import apply_usage_delta
+
+
+def _bucket_of(value: Optional[datetime]) -> date:
+    if value is None:
+        return datetime.utcnow().date()
+    return value.date()
+
+
+def _as_date(value: Any) -> date:
+    # SQLite 的 date() 返回字符串
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+async def _apply_delta(
+    db: AsyncSession,
+    user_id: str,
+    bucket_date: date,
+    uploads: int = 0,
+    upload_bytes: int = 0,
+    live_files: int = 0,
+    live_bytes: int = 0,
+) -> None:
+    result = await db.execute(
+        update(FileStatsDaily)
+        .where(FileStatsDaily.user_id == user_id, FileStatsDaily.bucket_date == bucket_date)
+        .values(
+            uploads=FileStatsDaily.uploads + uploads,
+            upload_bytes=FileStatsDaily.upload_bytes + upload_bytes,
+            live_files=FileStatsDaily.live_files + live_files,
+            live_bytes=FileStatsDaily.live_bytes + live_bytes,
+        )
+    )
+    if result.rowcount:
+        return
+
+    await db.execute(
+        insert(FileStatsDaily).values(
+            user_id=user_id,
+            bucket_date=bucket_date,
+            uploads=max(uploads, 0),
+            upload_bytes=max(upload_bytes, 0),
+            live_files=max(live_files, 0),
+            live_bytes=max(live_bytes, 0),
+        )
+    )
+
+
+async def record_file_added(db: AsyncSession, file_record: FileModel) -> None:
+    """新写入一个文件记录时调用（与 File 记录在同一事务内提交）"""
+    await _apply_delta(
+        db,
+        file_record.user_id,
+        _bucket_of(file_record.upload_time),
+        uploads=1,
+        upload_bytes=file_record.file_size or 0,
+        live_files=1,
+        live_bytes=file_record.file_size or 0,
+    )
+    await apply_usage_delta(db, file_record.user_id, file_record.file_size or 0, 1)
+
+
+async def record_files_removed(db: AsyncSession, file_records: Iterable[FileModel]) -> None:
+    """删除/清理文件记录时调用，按 (用户, 上传日期) 合并后批量扣减"""
+    deltas: Dict[Tuple[str, date], List[int]] = defaultdict(lambda: [0, 0])
+    usage: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for item in file_records:
+        key = (item.user_id, _bucket_of(item.upload_time))
+        deltas[key][0] += 1
+        deltas[key][1] += item.file_size or 0
+        usage[item.user_id][0] += 1
+        usage[item.user_id][1] += item.file_size or 0
+
+    for (user_id, bucket_date), (count, size) in deltas.items():
+        await _apply_delta(db, user_id, bucket_date, live_files=-count, live_bytes=-size)
+    for user_id, (count, size) in usage.items():
+        await apply_usage_delta(db, user_id, -size, -count)
+
+
+async def record_removals_where(db: AsyncSession, *conditions) -> int:
+    """按条件批量删除文件前调用：在数据库中按 (用户, 上传日期) 聚合后扣减，不加载文件记录"""
+    bucket = func.date(FileModel.upload_time)
+    rows = (
+        await db.execute(
+            select(
+                FileModel.user_id,
+                bucket,
+                func.count(FileModel.id),
+                func.coalesce(func.sum(FileModel.file_size), 0),
+            )
+            .where(FileModel.deleted_at.is_(None), *conditions)
+            .group_by(FileModel.user_id, bucket)
+        )
+    ).all()
+
+    removed = 0
+    usage: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for user_id, bucket_date, count, size in rows:
+        bucket_date = _as_date(bucket_date) if bucket_date is not None else _bucket_of(None)
+        await _apply_delta(db, user_id, bucket_date, live_files=-count, live_bytes=-size)
+        usage[user_id][0] += count
+        usage[user_id][1] += size
+        removed += count
+    for user_id, (count, size) in usage.items():
+        await apply_usage_delta(db, user_id, -size, -count)
+    return removed
+
+
+async def rebuild_stats_rollup(db: AsyncSession) -> int:
+    """
+    从 files 表全量重建统计汇总
+    注意：已删除文件的历史上传量无法恢复，重建后 uploads 与当前存量一致
+    """
+    await db.execute(delete(FileStatsDaily))
+
+    bucket = func.date(FileModel.upload_time)
+    grouped = (
+        select(
+            FileModel.user_id,
+            bucket,
+            func.count(FileModel.id),
+            func.coalesce(func.sum(FileModel.file_size), 0),
+            func.count(FileModel.id),
+            func.coalesce(func.sum(FileModel.file_size), 0),
+        )
+        .where(FileModel.upload_time.is_not(None), FileModel.deleted_at.is_(None))
+        .group_by(FileModel.user_id, bucket)
+    )
+    await db.execute(
+        insert(FileStatsDaily).from_select(
+            ["user_id", "bucket_date", "uploads", "upload_bytes", "live_files", "live_bytes"],
+            grouped,
+        )
+    )
+    await db.commit()
+
+    return (await db.execute(select(func.count()).select_from(FileStatsDaily))).scalar_one()
+
+
+async def ensure_stats_rollup(db: AsyncSession) -> None:
+    """首次部署时汇总表为空，从现有数据初始化一次"""
+    has_rollup = (await db.execute(select(FileStatsDaily.id).limit(1))).first()
+    if has_rollup:
+        return
+    has_files = (await db.execute(select(FileModel.id).where(FileModel.deleted_at.is_(None)).limit(1))).first()
+    if has_files:
+        await rebuild_stats_rollup(db)
+
+
+async def read_stats(db: AsyncSession, series_days: int = 30) -> Dict[str, Any]:
+    """读取后台统计：总量 + 近 series_days 天的每日上传趋势"""
+    today = datetime.utcnow().date()
+    seven_days_ago = today - timedelta(days=6)
+    series_start = today - timedelta(days=series_days - 1)
+
+    total_users = (await db.execute(select(func.count()).select_from(User))).scalar_one()
+    totals = (
+        await db.execute(
+            select(
+                func.coalesce(func.sum(FileStatsDaily.live_files), 0),
+                func.coalesce(func.sum(FileStatsDaily.live_bytes), 0),
+                func.coalesce(
+                    func.sum(
+                        case((FileStatsDaily.bucket_date >= seven_days_ago, FileStatsDaily.uploads), else_=literal(0))
+                    ),
+                    0,
+                ),
+            )
+        )
+    ).one()
+
+    series_rows = await db.execute(
+        select(
+            FileStatsDaily.bucket_date,
+            func.sum(FileStatsDaily.uploads),
+            func.sum(FileStatsDaily.upload_bytes),
+        )
+        .where(FileStatsDaily.bucket_date >= series_start)
+        .group_by(FileStatsDaily.bucket_date)
+        .order_by(FileStatsDaily.bucket_date)
+    )
+
+    return {
+        "totalUsers": total_users,
+        "totalFiles": totals[0],
+        "totalStorageBytes": totals[1],
+        "uploadsLast7Days": totals[2],
+        "daily": [
+            {"date": bucket_date, "uploads": uploads or 0, "uploadBytes": upload_bytes or 0}
+            for bucket_date, uploads, upload_bytes in series_rows.all()
+        ],
+    }
+
+
+if __name__ == "__main__":
+    # 手动对账：python -m app.services.stats_rollup
+    import asyncio
+
+    from app.core.database import AsyncSessionLocal, Base, engine
+
+    async def _main() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as session:
+            rows = await rebuild_stats_rollup(session)
+        await engine.dispose()
+        print(f"统计汇总已重建: {rows} 行")
+
+    asyncio.run(_main())
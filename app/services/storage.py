@@ -0,0 +1,304 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import os
+import shutil
+from typing import List, Optional, Set, Tuple
+import uuid
+
+import aiofiles
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.storage_blob import StorageBlob
+
+UNLINK_DELETED = "deleted"
+UNLINK_MISSING = "missing"
+UNLINK_FAILED = "failed"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def unlink_path(path: Optional[str]) -> str:
+    if not path:
+        return UNLINK_MISSING
+    try:
+        os.remove(path)
+        return UNLINK_DELETED
+    except FileNotFoundError:
+        return UNLINK_MISSING
+    except OSError:
+        return UNLINK_FAILED
+
+
+async def unlink_paths(paths: List[Optional[str]], executor: Optional[ThreadPoolExecutor] = None) -> List[str]:
+    """在线程池中并发删除物理文件（未指定线程池时使用默认线程池），返回每个路径的删除结果"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(executor, unlink_path, path) for path in paths))
+
+
+def sha256_of_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StorageBackend:
+    """文件存储后端：负责物理文件的写入与释放，File.file_path 保存返回的路径"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def temp_path(self, extension: str) -> str:
+        """生成临时文件路径（与存储目录同一文件系统，便于原子移动）"""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, f"{uuid.uuid4().hex}{extension}")
+
+    async def save_bytes(self, db: AsyncSession, content: bytes, extension: str, name_hint: str) -> str:
+        raise NotImplementedError
+
+    async def save_file(self, db: AsyncSession, src_path: str, extension: str, name_hint: str) -> str:
+        """把已写好的临时文件移入存储，返回最终路径"""
+        raise NotImplementedError
+
+    async def release(self, db: AsyncSession, paths: List[Optional[str]]) -> List[str]:
+        """
+        File 记录被删除时释放其物理文件，返回可以删除的物理路径
+        这里不删除文件：调用方在事务提交成功后再删除，回滚时记录仍指向完好的文件
+        """
+        return [path for path in paths if path]
+
+    async def referenced_paths(self, db: AsyncSession, paths: Set[str]) -> Set[str]:
+        """返回 paths 中仍被已有记录引用的路径"""
+        from app.models.file import File as FileModel
+
+        if not paths:
+            return set()
+        result = await db.execute(select(FileModel.file_path).where(FileModel.file_path.in_(list(paths))).distinct())
+        return set(result.scalars().all())
+
+    async def unlink_released(
+        self, db: AsyncSession, paths: List[str], executor: Optional[ThreadPoolExecutor] = None
+    ) -> List[str]:
+        """
+        事务提交后删除 release 返回的物理文件，返回每个文件的删除结果
+        提交后又被重新引用的文件（并发上传了相同内容）保留，按 UNLINK_MISSING 计
+        """
+        if not paths:
+            return []
+        referenced = await self.referenced_paths(db, set(paths))
+        targets = [path for path in paths if path not in referenced]
+        results = dict(zip(targets, await unlink_paths(targets, executor)))
+        return [results.get(path, UNLINK_MISSING) for path in paths]
+
+    async def discard_unreferenced(self, db: AsyncSession, path: Optional[str]) -> None:
+        """事务回滚后调用：删除本次写入、但没有任何已提交记录引用的物理文件"""
+        if path and not await self.referenced_paths(db, {path}):
+            await asyncio.to_thread(unlink_path, path)
+
+
+class MonthlyDirectoryStorage(StorageBackend):
+    """旧布局：UPLOAD_DIR/YYYYMM/{file_id}{ext}，每条记录一个物理文件"""
+
+    def _target_path(self, extension: str, name_hint: str) -> str:
+        upload_dir = os.path.join(self.root, datetime.now().strftime("%Y%m"))
+        os.makedirs(upload_dir, exist_ok=True)
+        return os.path.join(upload_dir, f"{name_hint}{extension}")
+
+    async def save_bytes(self, db: AsyncSession, content: bytes, extension: str, name_hint: str) -> str:
+        path = self._target_path(extension, name_hint)
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(content)
+        return path
+
+    async def save_file(self, db: AsyncSession, src_path: str, extension: str, name_hint: str) -> str:
+        path = self._target_path(extension, name_hint)
+        os.replace(src_path, path)
+        return path
+
+
+class ContentAddressableStorage(StorageBackend):
+    """
+    内容寻址布局：UPLOAD_DIR/cas/ab/cd/{sha256}{ext}
+    按哈希前缀分两级目录，相同内容只存一份，storage_blobs.ref_count 记录引用数，
+    归零时才删除物理文件
+    """
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.cas_root = os.path.join(root, "cas")
+
+    def blob_path(self, sha256: str, extension: str) -> str:
+        return os.path.join(self.cas_root, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+    def owns(self, path: Optional[str]) -> bool:
+        if not path:
+            return False
+        return os.path.abspath(path).startswith(os.path.abspath(self.cas_root) + os.sep)
+
+    async def _acquire(self, db: AsyncSession, sha256: str, extension: str, size: int) -> Tuple[str, bool]:
+        """
+        为一份内容增加一次引用，返回 (路径, 是否需要写入物理文件)
+        已有相同内容且物理文件存在时无需写入
+        """
+        while True:
+            blob = (await db.execute(select(StorageBlob).where(StorageBlob.sha256 == sha256))).scalar_one_or_none()
+            if blob is not None:
+                result = await db.execute(
+                    update(StorageBlob).where(StorageBlob.sha256 == sha256).values(ref_count=StorageBlob.ref_count + 1)
+                )
+                if result.rowcount:
+                    return blob.path, not os.path.exists(blob.path)
+                # 查询之后记录被并发的 release 删除（物理文件随之删除），按新内容重新登记
+                db.expunge(blob)
+
+            path = self.blob_path(sha256, extension)
+            try:
+                async with db.begin_nested():
+                    db.add(StorageBlob(sha256=sha256, path=path, size=size, ref_count=1))
+                return path, not os.path.exists(path)
+            except IntegrityError:
+                # 并发写入了相同内容，重新查询后按已存在处理
+                continue
+
+    async def save_bytes(self, db: AsyncSession, content: bytes, extension: str, name_hint: str) -> str:
+        sha256 = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+        path, needs_write = await self._acquire(db, sha256, extension, len(content))
+        if needs_write:
+            tmp_path = self.temp_path(extension)
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(content)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return path
+
+    async def save_file(self, db: AsyncSession, src_path: str, extension: str, name_hint: str) -> str:
+        sha256 = await asyncio.to_thread(sha256_of_file, src_path)
+        path, needs_write = await self._acquire(db, sha256, extension, os.path.getsize(src_path))
+        if needs_write:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(src_path, path)
+        else:
+            os.remove(src_path)
+        return path
+
+    async def release(self, db: AsyncSession, paths: List[Optional[str]]) -> List[str]:
+        cas_paths = Counter(path for path in paths if self.owns(path))
+        to_unlink = []
+
+        for path, count in cas_paths.items():
+            # 相对递减，不会覆盖并发 _acquire 增加的引用
+            result = await db.execute(
+                update(StorageBlob).where(StorageBlob.path == path).values(ref_count=StorageBlob.ref_count - count)
+            )
+            if not result.rowcount:
+                # 没有引用记录的 CAS 文件视为孤儿，直接删除
+                to_unlink.append(path)
+                continue
+            # 只删除递减后已无引用的记录
+            deleted = await db.execute(
+                delete(StorageBlob)
+                .where(StorageBlob.path == path, StorageBlob.ref_count <= 0)
+                .returning(StorageBlob.path)
+            )
+            to_unlink.extend(deleted.scalars().all())
+
+        # 旧布局文件没有引用计数，一条记录对应一个物理文件
+        return to_unlink + [path for path in paths if path and not self.owns(path)]
+
+    async def referenced_paths(self, db: AsyncSession, paths: Set[str]) -> Set[str]:
+        cas_paths = {path for path in paths if self.owns(path)}
+        referenced = await super().referenced_paths(db, paths - cas_paths)
+        if cas_paths:
+            result = await db.execute(select(StorageBlob.path).where(StorageBlob.path.in_(list(cas_paths))))
+            referenced.update(result.scalars().all())
+        return referenced
+
+
+def get_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "monthly":
+        return MonthlyDirectoryStorage(settings.UPLOAD_DIR)
+    return ContentAddressableStorage(settings.UPLOAD_DIR)
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    tmp_path = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+async def migrate_to_cas(db: AsyncSession, batch_size: int = 200) -> dict:
+    """
+    把旧布局（UPLOAD_DIR/YYYYMM/）的文件迁移到内容寻址存储并更新 File.file_path
+    每批提交一次，可中断后重复执行
+    """
+    from app.models.file import File as FileModel
+
+    storage = ContentAddressableStorage(settings.UPLOAD_DIR)
+    totals = {"migrated": 0, "deduplicated": 0, "missing": 0}
+    last_id = ""
+
+    while True:
+        rows = (
+            await db.execute(
+                select(FileModel)
+                .where(FileModel.id > last_id)
+                .order_by(FileModel.id)
+                .limit(batch_size)
+            )
+        ).scalars().all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        # 旧文件在本批提交成功后再删除，中途失败时记录仍指向原文件
+        legacy_paths = []
+        for file_record in rows:
+            path = file_record.file_path
+            if not path or storage.owns(path):
+                continue
+            if not os.path.exists(path):
+                totals["missing"] += 1
+                continue
+            extension = os.path.splitext(path)[1]
+            sha256 = await asyncio.to_thread(sha256_of_file, path)
+            target, needs_write = await storage._acquire(db, sha256, extension, os.path.getsize(path))
+            if needs_write:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                await asyncio.to_thread(_link_or_copy, path, target)
+            else:
+                totals["deduplicated"] += 1
+            file_record.file_path = target
+            legacy_paths.append(path)
+            totals["migrated"] += 1
+
+        await db.commit()
+        for path in legacy_paths:
+            unlink_path(path)
+
+    return totals
+
+
+if __name__ == "__main__":
+    # 迁移旧文件到内容寻址存储：python -m app.services.storage
+    from app.core.database import AsyncSessionLocal, Base, engine
+
+    async def _main() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as session:
+            result = await migrate_to_cas(session)
+        await engine.dispose()
+        print(f"迁移完成: {result}")
+
+    asyncio.run(_main())
@@ -0,0 +1,203 @@
+import asyncio
+from datetime import datetime
+from itertools import islice
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.file import File as FileModel
+from app.models.storage_blob import StorageBlob
+from app.services.file_reaper import soft_delete_files
+from app.services.result_formats import RESULTS_DIR
+from app.services.storage import unlink_path
+
+logger = logging.getLogger(__name__)
+
+# 上传过程中的临时文件目录和处理结果缓存目录，不参与对账
+SKIP_DIRS = {"tmp", RESULTS_DIR}
+
+
+def iter_disk_files(root: str, skip_dirs=SKIP_DIRS) -> Iterator[Tuple[str, float]]:
+    """
+    按完整路径的字符串顺序流式遍历目录下的文件，产出 (路径, mtime)
+    目录按 "名称 + 分隔符" 排序，保证深度优先遍历的顺序与路径字符串排序一致，
+    内存占用只与目录深度和单个目录的条目数有关
+    """
+    def sorted_entries(path: str) -> List[os.DirEntry]:
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=lambda e: e.name + os.sep if e.is_dir(follow_symlinks=False) else e.name)
+
+    stack = [iter(sorted_entries(root))]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if len(stack) == 1 and entry.name in skip_dirs:
+                continue
+            stack.append(iter(sorted_entries(entry.path)))
+        elif entry.is_file(follow_symlinks=False):
+            try:
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            except FileNotFoundError:
+                continue
+            yield entry.path, mtime
+
+
+async def _aiter_disk_files(root: str, chunk_size: int) -> AsyncIterator[Tuple[str, float]]:
+    # scandir/stat 是阻塞调用，分块在线程中拉取
+    files = iter_disk_files(root)
+    while True:
+        chunk = await asyncio.to_thread(lambda: list(islice(files, chunk_size)))
+        if not chunk:
+            return
+        for item in chunk:
+            yield item
+
+
+async def _aiter_db_paths(db: AsyncSession, prefix: str, batch_size: int) -> AsyncIterator[Tuple[str, bool]]:
+    # 按 file_path 排序的键集分页，同一路径（内容寻址去重）只返回一次，
+    # 同时标记该路径是否还有未软删除的记录
+    has_live = func.max(case((FileModel.deleted_at.is_(None), 1), else_=0))
+    last_path = ""
+    while True:
+        rows = (
+            await db.execute(
+                select(FileModel.file_path, has_live)
+                .where(FileModel.file_path.startswith(prefix, autoescape=True), FileModel.file_path > last_path)
+                .group_by(FileModel.file_path)
+                .order_by(FileModel.file_path)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            return
+        last_path = rows[-1][0]
+        for path, live in rows:
+            yield path, bool(live)
+
+
+async def _anext(iterator: AsyncIterator):
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def reconcile_storage(
+    db: AsyncSession,
+    repair: bool = False,
+    batch_size: Optional[int] = None,
+    sample_limit: int = 100,
+) -> Dict[str, object]:
+    """
+    对账 UPLOAD_DIR 与 files.file_path：
+    - orphanFiles：磁盘上存在但没有任何记录引用（repair 时删除文件及其存储引用）
+    - missingFiles：记录存在但磁盘文件丢失（repair 时软删除这些记录，由回收任务清理）
+    两侧都按路径排序后归并比较，内存占用与文件总数无关；
+    file_path 不在 UPLOAD_DIR 下的记录不参与对账
+    """
+    batch_size = batch_size or settings.RECONCILE_BATCH_SIZE
+    root = settings.UPLOAD_DIR
+    prefix = os.path.join(root, "")
+    grace_cutoff = time.time() - settings.RECONCILE_GRACE_MINUTES * 60
+
+    report: Dict[str, object] = {
+        "scannedFiles": 0,
+        "referencedPaths": 0,
+        "orphanFiles": 0,
+        "orphanBytes": 0,
+        "missingFiles": 0,
+        "skippedRecent": 0,
+        "repaired": repair,
+        "orphanSamples": [],
+        "missingSamples": [],
+    }
+    pending_orphans: List[str] = []
+    pending_missing: List[str] = []
+
+    async def flush_orphans() -> None:
+        if not pending_orphans:
+            return
+        await asyncio.to_thread(lambda: [unlink_path(path) for path in pending_orphans])
+        await db.execute(delete(StorageBlob).where(StorageBlob.path.in_(pending_orphans)))
+        await db.commit()
+        pending_orphans.clear()
+
+    async def flush_missing() -> None:
+        if not pending_missing:
+            return
+        await soft_delete_files(db, FileModel.file_path.in_(pending_missing))
+        await db.commit()
+        pending_missing.clear()
+
+    async def on_orphan(path: str, mtime: float) -> None:
+        if mtime > grace_cutoff:
+            # 可能是尚未提交记录的上传
+            report["skippedRecent"] += 1
+            return
+        report["orphanFiles"] += 1
+        try:
+            report["orphanBytes"] += os.path.getsize(path)
+        except OSError:
+            pass
+        if len(report["orphanSamples"]) < sample_limit:
+            report["orphanSamples"].append(path)
+        if repair:
+            pending_orphans.append(path)
+            if len(pending_orphans) >= batch_size:
+                await flush_orphans()
+
+    async def on_missing(path: str) -> None:
+        report["missingFiles"] += 1
+        if len(report["missingSamples"]) < sample_limit:
+            report["missingSamples"].append(path)
+        if repair:
+            pending_missing.append(path)
+            if len(pending_missing) >= batch_size:
+                await flush_missing()
+
+    disk_iter = _aiter_disk_files(root, batch_size)
+    db_iter = _aiter_db_paths(db, prefix, batch_size)
+    disk_item = await _anext(disk_iter)
+    db_item = await _anext(db_iter)
+
+    while disk_item is not None or db_item is not None:
+        if db_item is None or (disk_item is not None and disk_item[0] < db_item[0]):
+            report["scannedFiles"] += 1
+            await on_orphan(*disk_item)
+            disk_item = await _anext(disk_iter)
+        elif disk_item is None or db_item[0] < disk_item[0]:
+            report["referencedPaths"] += 1
+            # 只剩软删除记录的路径等待回收任务处理
+            if db_item[1]:
+                await on_missing(db_item[0])
+            db_item = await _anext(db_iter)
+        else:
+            report["scannedFiles"] += 1
+            report["referencedPaths"] += 1
+            disk_item = await _anext(disk_iter)
+            db_item = await _anext(db_iter)
+
+    if repair:
+        await flush_orphans()
+        await flush_missing()
+
+    report["finishedAt"] = datetime.utcnow()
+    logger.info(
+        "storage reconcile: orphan=%s missing=%s repaired=%s",
+        report["orphanFiles"],
+        report["missingFiles"],
+        repair,
+    )
+    return report
@@ -0,0 +1,159 @@
+import io
+import os
+import re
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+import zipfile
+
+from app.core.config import settings
+
+# 工作表 XML 中平均每个单元格的字节数（<c r="B2" t="s"><v>12</v></c>），无 dimension 时用于估算
+AVG_CELL_XML_BYTES = 30
+# 解析成 DataFrame 后平均每个单元格占用的内存（object 列为主）
+AVG_CELL_MEMORY_BYTES = 80
+# 共享字符串解析成 Python 字符串后的膨胀系数
+SHARED_STRINGS_MEMORY_FACTOR = 3
+# CSV 按前 64KB 的平均行长估算行数
+CSV_SAMPLE_BYTES = 64 * 1024
+# 读取 dimension 时最多解压的字节数
+DIMENSION_PEEK_BYTES = 1024
+# 小于此大小的条目不检查压缩比（很小的 XML 压缩比天然很高）
+MIN_RATIO_CHECK_BYTES = 1024 * 1024
+
+_SHEET_PART_RE = re.compile(r"^xl/worksheets/sheet\d+\.xml$")
+_DIMENSION_RE = re.compile(rb'<dimension ref="[A-Z]+(\d+)(?::([A-Z]+)(\d+))?"')
+
+
+class WorkbookRejected(ValueError):
+    pass
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def _peek_dimension(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> Optional[Dict[str, int]]:
+    """dimension 元素位于工作表 XML 开头，只解压前 1KB 读取行列范围"""
+    with archive.open(info) as f:
+        head = f.read(DIMENSION_PEEK_BYTES)
+    match = _DIMENSION_RE.search(head)
+    if match is None or match.group(2) is None:
+        return None
+    return {"rows": int(match.group(3)), "columns": _column_number(match.group(2).decode())}
+
+
+def _inspect_xlsx(source: BinaryIO) -> Dict[str, Any]:
+    with zipfile.ZipFile(source) as archive:
+        infos = archive.infolist()
+        sheets: List[Dict[str, Any]] = []
+        shared_strings_bytes = 0
+        total_uncompressed = 0
+        max_ratio = 0.0
+        for info in infos:
+            total_uncompressed += info.file_size
+            if info.file_size >= MIN_RATIO_CHECK_BYTES:
+                max_ratio = max(max_ratio, info.file_size / max(info.compress_size, 1))
+            if info.filename == "xl/sharedStrings.xml":
+                shared_strings_bytes = info.file_size
+            elif _SHEET_PART_RE.match(info.filename):
+                sheets.append({"part": info.filename, "uncompressedBytes": info.file_size})
+
+        # 超限时不再读取任何条目内容
+        _check_limits(total_uncompressed, max_ratio, len(infos))
+
+        for sheet in sheets:
+            dimension = _peek_dimension(archive, archive.getinfo(sheet["part"]))
+            if dimension is not None:
+                sheet["estimatedRows"] = dimension["rows"]
+                cells = dimension["rows"] * dimension["columns"]
+            else:
+                cells = sheet["uncompressedBytes"] // AVG_CELL_XML_BYTES
+                sheet["estimatedRows"] = None
+            sheet["estimatedCells"] = cells
+
+    largest_sheet_cells = max((sheet["estimatedCells"] for sheet in sheets), default=0)
+    return {
+        "format": "xlsx",
+        "entries": len(infos),
+        "sheetCount": len(sheets),
+        "sheets": sheets,
+        "sharedStringsBytes": shared_strings_bytes,
+        "uncompressedBytes": total_uncompressed,
+        "maxCompressionRatio": round(max_ratio, 1),
+        "estimatedRows": sum(sheet["estimatedRows"] or 0 for sheet in sheets) or None,
+        # 一次只解析一个工作表：最大的工作表加上共享字符串
+        "estimatedMemoryBytes": (
+            largest_sheet_cells * AVG_CELL_MEMORY_BYTES
+            + shared_strings_bytes * SHARED_STRINGS_MEMORY_FACTOR
+        ),
+    }
+
+
+def _inspect_csv(source: BinaryIO, size: int) -> Dict[str, Any]:
+    sample = source.read(CSV_SAMPLE_BYTES)
+    lines = sample.count(b"\n") or 1
+    columns = (sample.split(b"\n", 1)[0].count(b",") + 1) if sample else 0
+    estimated_rows = lines if size <= len(sample) else int(size / (len(sample) / lines))
+    return {
+        "format": "csv",
+        "entries": 1,
+        "sheetCount": 1,
+        "sheets": [],
+        "sharedStringsBytes": 0,
+        "uncompressedBytes": size,
+        "maxCompressionRatio": 1.0,
+        "estimatedRows": estimated_rows,
+        "estimatedMemoryBytes": estimated_rows * columns * AVG_CELL_MEMORY_BYTES,
+    }
+
+
+def _check_limits(uncompressed_bytes: int, max_ratio: float, entries: int) -> None:
+    if uncompressed_bytes > settings.WORKBOOK_MAX_UNCOMPRESSED_BYTES:
+        raise WorkbookRejected(
+            f"文件解压后过大({uncompressed_bytes / 1024 / 1024:.0f}MB)，"
+            f"超过限制({settings.WORKBOOK_MAX_UNCOMPRESSED_BYTES / 1024 / 1024:.0f}MB)"
+        )
+    if max_ratio > settings.WORKBOOK_MAX_COMPRESSION_RATIO:
+        raise WorkbookRejected(f"文件压缩比异常({max_ratio:.0f}:1)，疑似压缩炸弹")
+    if entries > settings.WORKBOOK_MAX_ENTRIES:
+        raise WorkbookRejected(f"文件包含的条目过多({entries})")
+
+
+def inspect_workbook(source: Union[str, bytes], extension: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    解析前检查工作簿：xlsx 只读取 zip 中央目录（外加每个工作表开头 1KB 的 dimension），
+    给出工作表数、解压后大小、共享字符串大小、估算行数和解析所需内存；
+    解压后大小、压缩比或条目数超限时抛出 WorkbookRejected
+    无法识别的格式（如 xls）和损坏的文件返回 None
+    """
+    if isinstance(source, bytes):
+        size = len(source)
+        stream: BinaryIO = io.BytesIO(source)
+    else:
+        extension = extension or os.path.splitext(source)[1]
+        size = os.path.getsize(source)
+        stream = open(source, "rb")
+
+    try:
+        extension = (extension or "").lower()
+        if extension == ".csv":
+            return _inspect_csv(stream, size)
+        if extension == ".xlsx":
+            try:
+                return _inspect_xlsx(stream)
+            except zipfile.BadZipFile:
+                # 损坏的文件交给解析时报告错误
+                return None
+        return None
+    finally:
+        stream.close()
+
+
+def exceeds_parse_budget(estimated_memory_bytes: Optional[int]) -> bool:
+    """估算的解析内存超出预算时，汇总改走流式逐行处理"""
+    return (
+        estimated_memory_bytes is not None
+        and estimated_memory_bytes > settings.PARSE_MEMORY_BUDGET_BYTES
+    )
@@ -0,0 +1,69 @@
+"""
+基准测试：后台文件名关键词搜索 LIKE '%kw%' vs FTS5 trigram
+
+用法: python benchmarks/bench_admin_search.py [行数，默认1000000]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import REBUILD_SEARCH_INDEX_SQL, SEARCH_INDEX_DDL  # noqa: E402
+
+WORDS = ["会计月", "汇总", "入库", "批发", "退货", "分公司", "台账", "明细", "供应商", "北京", "上海", "广州"]
+
+
+def build(db_path: str, rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE users (id VARCHAR(50) PRIMARY KEY, username VARCHAR(50), nickname VARCHAR(20))")
+    conn.execute("CREATE TABLE files (id VARCHAR(50) PRIMARY KEY, user_id VARCHAR(50), file_name VARCHAR(255))")
+    rnd = random.Random(42)
+
+    def gen():
+        for i in range(rows):
+            name = "".join(rnd.sample(WORDS, 3)) + f"_{rnd.randint(2020, 2026)}{rnd.randint(1, 12):02d}.xlsx"
+            yield (f"file_{i:012x}", "user_bench", name)
+
+    conn.executemany("INSERT INTO files VALUES (?, ?, ?)", gen())
+    for ddl in SEARCH_INDEX_DDL:
+        conn.execute(ddl)
+    for sql in REBUILD_SEARCH_INDEX_SQL:
+        conn.execute(sql)
+    conn.commit()
+    return conn
+
+
+def timed(conn: sqlite3.Connection, sql: str, param: str, repeat: int = 5):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = conn.execute(sql, (param,)).fetchone()[0]
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, count
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        conn = build(os.path.join(tmp, "bench.db"), rows)
+        print(f"构建 {rows} 行 + 索引: {time.perf_counter() - start:.1f}s")
+
+        for keyword in ["分公司台账", "_202403", "不存在的名字"]:
+            like_ms, like_n = timed(conn, "SELECT COUNT(*) FROM files WHERE file_name LIKE ?", f"%{keyword}%")
+            fts_ms, fts_n = timed(
+                conn,
+                "SELECT COUNT(*) FROM files WHERE rowid IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ?)",
+                '"' + keyword + '"',
+            )
+            print(f"{keyword!r:>16}: LIKE {like_ms:8.1f}ms ({like_n})  FTS5 {fts_ms:8.1f}ms ({fts_n})")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+基准测试：AI 调用突发时的准入控制（并发上限 + 按请求方轮转的等待队列 + 429 退避重试）
+本地模拟接口前若干个请求返回 429，统计成功/拒绝数量、各请求方的完成延迟与上游同时处理的请求峰值，
+并检查：只有发起突发的请求方被拒绝、上游请求数 = 成功调用数 + 429 次数、同时处理数不超过并发上限
+
+用法: python benchmarks/bench_ai_admission.py [并发上限] [每个请求方的请求数] [上游返回 429 的请求数]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException  # noqa: E402
+
+from mock_openai import MockOpenAIServer  # noqa: E402
+
+# 一个请求方突发大量请求，其余请求方各发少量请求
+REQUESTERS = {"burst": 4, "user-a": 1, "user-b": 1, "user-c": 1}
+
+
+async def run(per_requester: int):
+    from app.core.ai_client import ai_http
+    from app.services.ai_chat import admitted_complete
+
+    latencies = {requester: [] for requester in REQUESTERS}
+    rejected = {requester: 0 for requester in REQUESTERS}
+
+    async def one(requester: str, index: int):
+        body = {"model": "mock", "messages": [{"role": "user", "content": f"{requester}-{index}"}], "temperature": 0.7}
+        started = time.perf_counter()
+        try:
+            await admitted_complete(body, requester)
+            latencies[requester].append((time.perf_counter() - started) * 1000)
+        except HTTPException:
+            rejected[requester] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        one(requester, index)
+        for requester, factor in REQUESTERS.items()
+        for index in range(per_requester * factor)
+    ])
+    elapsed = time.perf_counter() - started
+    await ai_http.close()
+    return latencies, rejected, elapsed
+
+
+def main() -> None:
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    per_requester = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    throttle = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with MockOpenAIServer(delay=0.05, throttle=throttle, retry_after="0") as upstream:
+        from app.core.ai_admission import ai_admission
+        from app.core.config import settings
+
+        settings.AI_BASE_URL = upstream.base_url
+        settings.AI_API_KEY = "bench"
+        settings.AI_RETRY_BASE_DELAY_SECONDS = 0.05
+        ai_admission.max_concurrency = concurrency
+
+        latencies, rejected, elapsed = asyncio.run(run(per_requester))
+        metrics = ai_admission.metrics()
+        print(f"并发上限 {concurrency}，队列 {metrics['maxQueue']}（每个请求方 {metrics['maxQueuePerUser']}），耗时 {elapsed:.2f}s")
+        for requester, samples in latencies.items():
+            if samples:
+                print(
+                    f"  {requester:<8}: 成功 {len(samples):3d}  拒绝 {rejected[requester]:3d}  "
+                    f"中位 {statistics.median(samples):7.1f}ms  最大 {max(samples):7.1f}ms"
+                )
+            else:
+                print(f"  {requester:<8}: 成功   0  拒绝 {rejected[requester]:3d}")
+        print(
+            f"  上游请求 {upstream.requests}（429: {upstream.throttled}），同时处理峰值 {upstream.max_active}，"
+            f"重试 {metrics['retries']}，平均排队 {metrics['avgWaitMs']}ms"
+        )
+
+        calls = sum(len(samples) for samples in latencies.values())
+        assert upstream.requests == calls + upstream.throttled, "上游请求数应等于成功调用数 + 429 次数"
+        assert upstream.max_active <= concurrency, "上游同时处理的请求数超过并发上限"
+        if per_requester <= metrics["maxQueuePerUser"]:
+            light = {requester: count for requester, count in rejected.items() if requester != "burst"}
+            assert not any(light.values()), f"未突发的请求方被拒绝: {light}"
+            assert rejected["burst"] > 0, "突发请求方未触发排队上限"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+基准测试：AI 对话每次新建 httpx.AsyncClient 与复用应用级连接池的单次延迟对比
+使用本地模拟的 OpenAI 兼容接口（HTTPS 自签名证书），差值即每次请求的 TCP + TLS 握手开销
+
+用法: python benchmarks/bench_ai_client.py [请求次数]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+
+from mock_openai import MockOpenAIServer  # noqa: E402
+
+BODY = {"model": "mock", "messages": [{"role": "user", "content": "你好"}], "temperature": 0.7}
+
+
+def report(label: str, samples) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<22}: 平均 {statistics.mean(samples):6.2f}ms  中位 {statistics.median(samples):6.2f}ms  p95 {p95:6.2f}ms")
+
+
+async def per_request_client(base_url: str, n: int):
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=60) as client:
+            resp = await client.post(f"{base_url}/chat/completions", json=BODY)
+        resp.raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def pooled_client(n: int):
+    from app.core.ai_client import ai_http
+
+    ai_http.start()
+    samples = []
+    try:
+        for _ in range(n):
+            started = time.perf_counter()
+            resp = await ai_http.client.post("/chat/completions", json=BODY)
+            resp.raise_for_status()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        await ai_http.close()
+    return samples
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with MockOpenAIServer(tls=True) as server:
+        os.environ["AI_BASE_URL"] = server.base_url
+        from app.core.config import settings
+
+        settings.AI_BASE_URL = server.base_url
+        print(f"模拟接口: {server.base_url}，每种方式 {n} 次请求")
+        # 预热（导入、首次 TLS 上下文创建）
+        asyncio.run(per_request_client(server.base_url, 5))
+        report("每次新建客户端", asyncio.run(per_request_client(server.base_url, n)))
+        report("应用级连接池", asyncio.run(pooled_client(n)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+基准测试：/ai/chat 流式（SSE）与非流式的首字节时间（TTFB）对比
+上游为本地模拟的 OpenAI 兼容接口，按字符逐段返回；对话接口本身也运行在真实的 uvicorn 上，
+这样测到的是客户端实际收到第一段内容的时间，而不是应用内部的耗时
+
+用法: python benchmarks/bench_ai_stream.py [请求次数] [每段间隔毫秒]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from mock_openai import MockOpenAIServer, free_port, start_server  # noqa: E402
+
+REPLY = "这是一段用于测试流式输出的模拟回复，" * 3
+MESSAGES = [{"role": "user", "content": "你好"}]
+
+
+def report(label: str, samples) -> None:
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    print(f"  {label:<16}: 平均 {statistics.mean(samples):8.1f}ms  中位 {statistics.median(samples):8.1f}ms  p95 {p95:8.1f}ms")
+
+
+async def measure(base_url: str, stream: bool, n: int):
+    ttfb, total = [], []
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for _ in range(n):
+            started = time.perf_counter()
+            async with client.stream("POST", "/api/v1/ai/chat", json={"messages": MESSAGES, "stream": stream}) as resp:
+                resp.raise_for_status()
+                first = None
+                async for _ in resp.aiter_raw():
+                    if first is None:
+                        first = time.perf_counter()
+            ttfb.append((first - started) * 1000)
+            total.append((time.perf_counter() - started) * 1000)
+    return ttfb, total
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    token_delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+
+    with MockOpenAIServer(reply=REPLY, token_delay=token_delay) as upstream:
+        from app.api.v1 import ai
+        from app.core.ai_client import ai_http
+        from app.core.config import settings
+
+        settings.AI_BASE_URL = upstream.base_url
+        settings.AI_API_KEY = "bench"
+        app = FastAPI()
+        app.include_router(ai.router, prefix="/api/v1/ai")
+
+        port = free_port()
+        server, thread = start_server(app, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            print(f"回复 {len(REPLY)} 段，每段间隔 {token_delay * 1000:.0f}ms，每种方式 {n} 次请求")
+            asyncio.run(measure(base_url, True, 1))
+            for stream in (False, True):
+                ttfb, total = asyncio.run(measure(base_url, stream, n))
+                label = "流式" if stream else "非流式"
+                report(f"{label} 首字节", ttfb)
+                report(f"{label} 完整响应", total)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+            # 客户端在 uvicorn 线程的事件循环中创建，随线程结束一起丢弃
+            ai_http._client = None
+
+
+if __name__ == "__main__":
+    main()
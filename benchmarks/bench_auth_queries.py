@@ -0,0 +1,66 @@
+"""
+统计已认证请求的数据库查询次数（用户缓存开启/关闭对比）
+
+用法: python benchmarks/bench_auth_queries.py [请求数，默认50]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORK_DIR}/bench.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(WORK_DIR, "uploads"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core.database import engine  # noqa: E402
+from app.core.principal_cache import principal_cache  # noqa: E402
+import main  # noqa: E402
+
+engine.echo = False
+query_count = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(*args, **kwargs):
+    global query_count
+    query_count += 1
+
+
+def run(client: TestClient, headers: dict, requests: int) -> float:
+    global query_count
+    query_count = 0
+    for _ in range(requests):
+        resp = client.get("/api/v1/auth/profile", headers=headers)
+        assert resp.status_code == 200, resp.text
+    return query_count / requests
+
+
+def main_bench() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with TestClient(main.app) as client:
+        resp = client.post(
+            "/api/v1/auth/register",
+            json={"username": "benchuser", "password": "bench123", "nickname": "bench"},
+        )
+        headers = {"Authorization": f"Bearer {resp.json()['data']['token']}"}
+
+        ttl = principal_cache.ttl_seconds
+        principal_cache.ttl_seconds = 0
+        principal_cache.clear()
+        before = run(client, headers, requests)
+
+        principal_cache.ttl_seconds = ttl
+        after = run(client, headers, requests)
+
+    asyncio.run(engine.dispose())
+    print(f"GET /auth/profile x{requests}")
+    print(f"  缓存关闭: {before:.2f} 次查询/请求")
+    print(f"  缓存开启: {after:.2f} 次查询/请求 (hits={principal_cache.hits}, misses={principal_cache.misses})")
+
+
+if __name__ == "__main__":
+    main_bench()
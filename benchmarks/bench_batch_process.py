@@ -0,0 +1,95 @@
+"""
+基准测试：批量处理的吞吐量随进程池大小的变化（端到端：读取、汇总、写出、入库）
+
+用法: python benchmarks/bench_batch_process.py [文件数，默认24] [每个文件行数，默认20000]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORK_DIR}/bench.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(WORK_DIR, "uploads"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.models.file import File as FileModel, FileStatus, FileType  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.batch_jobs import BatchJob, run_batch_job  # noqa: E402
+from app.services.file_processing import shutdown_process_executor  # noqa: E402
+
+
+def make_ledger(path: str, rows: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        "单位": [f"分公司{seed}"] * rows,
+        "会计月": rng.choice([f"2025{m:02d}" for m in range(1, 13)], rows),
+        "入库金额": rng.random(rows) * 1000,
+        "数量": rng.integers(1, 100, rows),
+        "税额": rng.random(rows) * 100,
+    }).to_excel(path, index=False)
+
+
+async def seed(count: int, rows: int) -> list:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    source_dir = os.path.join(settings.UPLOAD_DIR, "bench")
+    os.makedirs(source_dir, exist_ok=True)
+
+    files = []
+    async with AsyncSessionLocal() as db:
+        db.add(User(id="user_bench", username="bench", password="x", nickname="bench"))
+        for i in range(count):
+            path = os.path.join(source_dir, f"ledger_{i}.xlsx")
+            make_ledger(path, rows, i)
+            file_id = f"file_bench{i:04d}"
+            db.add(FileModel(
+                id=file_id, user_id="user_bench", file_name=f"ledger_{i}.xlsx", file_type=FileType.ORIGINAL,
+                file_path=path, file_size=os.path.getsize(path), status=FileStatus.COMPLETED,
+            ))
+            files.append((file_id, f"ledger_{i}.xlsx"))
+        await db.commit()
+    return files
+
+
+async def run(files: list, workers: int) -> float:
+    settings.BATCH_PROCESS_WORKERS = workers
+    shutdown_process_executor()
+    # 预热进程池（spawn 启动和导入 pandas 不计入）
+    warmup = BatchJob("user_bench", files[:workers])
+    await run_batch_job(warmup)
+
+    job = BatchJob("user_bench", files)
+    started = time.perf_counter()
+    await run_batch_job(job)
+    elapsed = time.perf_counter() - started
+    snapshot = job.snapshot()
+    assert snapshot["completed"] == len(files), snapshot
+    return elapsed
+
+
+async def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    engine.echo = False
+    files = await seed(count, rows)
+    print(f"{count} 个文件 x {rows} 行，CPU 核数 {os.cpu_count()}")
+
+    baseline = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        elapsed = await run(files, workers)
+        baseline = baseline or elapsed
+        print(f"  workers={workers:<2}: {elapsed:6.2f}s  {count / elapsed:5.2f} 文件/s  加速 {baseline / elapsed:4.2f}x")
+
+    shutdown_process_executor()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+基准测试：流式分批清理过期文件
+
+用法: python benchmarks/bench_cleanup.py [过期文件数，默认100000]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORK_DIR}/bench.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(WORK_DIR, "uploads"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.models.file import File as FileModel, FileStatus, FileType  # noqa: E402
+from app.services.cleanup import cleanup_expired_files  # noqa: E402
+
+
+async def seed(count: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    upload_dir = os.path.join(settings.UPLOAD_DIR, "bench")
+    os.makedirs(upload_dir, exist_ok=True)
+    uploaded_at = datetime.utcnow() - timedelta(days=settings.CLEANUP_RETENTION_DAYS + 1)
+
+    rows = []
+    for i in range(count):
+        path = os.path.join(upload_dir, f"file_{i:012x}.xlsx")
+        with open(path, "wb") as f:
+            f.write(b"x")
+        rows.append(
+            {
+                "id": f"file_{i:012x}",
+                "user_id": "user_bench",
+                "file_name": f"bench_{i}.xlsx",
+                "file_type": FileType.ORIGINAL,
+                "file_path": path,
+                "file_size": 1,
+                "upload_time": uploaded_at,
+                "status": FileStatus.COMPLETED,
+                "remark": "",
+            }
+        )
+
+    async with AsyncSessionLocal() as session:
+        for start in range(0, count, 10000):
+            await session.execute(insert(FileModel), rows[start:start + 10000])
+        await session.commit()
+
+
+async def run(count: int) -> None:
+    engine.echo = False
+    start = time.perf_counter()
+    await seed(count)
+    print(f"准备 {count} 个过期文件: {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        result = await cleanup_expired_files(session, settings.CLEANUP_RETENTION_DAYS)
+    elapsed = time.perf_counter() - start
+    print(f"清理完成: {result}")
+    print(f"  耗时 {elapsed:.1f}s，{count / elapsed:.0f} 个/秒，批大小 {settings.CLEANUP_BATCH_SIZE}，"
+          f"删除线程 {settings.CLEANUP_UNLINK_WORKERS}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,80 @@
+"""
+基准测试：bcrypt 成本因子耗时，以及同步哈希/线程池哈希对事件循环延迟的影响
+
+用法: python benchmarks/bench_password_hash.py [并发登录数，默认16]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passlib.context import CryptContext  # noqa: E402
+
+from app.core.hash_pool import HashPool  # noqa: E402
+
+
+def bench_rounds() -> None:
+    print("bcrypt 成本因子（单次 hash / verify）:")
+    for rounds in (10, 11, 12, 13):
+        ctx = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        start = time.perf_counter()
+        hashed = ctx.hash("benchmark-password")
+        hash_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        ctx.verify("benchmark-password", hashed)
+        verify_ms = (time.perf_counter() - start) * 1000
+        print(f"  rounds={rounds}: hash {hash_ms:7.1f}ms  verify {verify_ms:7.1f}ms")
+
+
+async def _measure_loop_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, (time.perf_counter() - start - 0.005) * 1000)
+    return worst
+
+
+async def bench_loop_lag(concurrency: int, ctx: CryptContext, hashed: str) -> None:
+    print(f"\n{concurrency} 个并发 verify 期间事件循环最大延迟:")
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_loop_lag(stop))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    for _ in range(concurrency):
+        ctx.verify("benchmark-password", hashed)
+        await asyncio.sleep(0)
+    total = time.perf_counter() - start
+    stop.set()
+    print(f"  同步调用        : 总耗时 {total * 1000:7.0f}ms  最大延迟 {await lag_task:7.1f}ms")
+
+    for workers in (1, 2, 4):
+        pool = HashPool(max_workers=workers, max_pending=0)
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_measure_loop_lag(stop))
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.run(ctx.verify, "benchmark-password", hashed) for _ in range(concurrency)))
+        total = time.perf_counter() - start
+        stop.set()
+        metrics = pool.metrics()
+        pool.shutdown()
+        print(
+            f"  线程池 workers={workers}: 总耗时 {total * 1000:7.0f}ms  最大延迟 {await lag_task:7.1f}ms"
+            f"  平均排队 {metrics['avgWaitMs']:7.1f}ms"
+        )
+
+
+def main() -> None:
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    bench_rounds()
+    ctx = CryptContext(schemes=["bcrypt"], bcrypt__rounds=12)
+    hashed = ctx.hash("benchmark-password")
+    asyncio.run(bench_loop_lag(concurrency, ctx, hashed))
+
+
+if __name__ == "__main__":
+    main()
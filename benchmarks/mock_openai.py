@@ -0,0 +1,188 @@
+"""
+本地模拟的 OpenAI 兼容接口（/v1/chat/completions），供 AI 相关基准测试使用
+
+    with MockOpenAIServer(tls=True) as server:
+        server.base_url  # https://localhost:端口/v1
+
+tls=True 时生成自签名证书（需要 cryptography），并通过 SSL_CERT_FILE 让 httpx 信任它
+请求体带 stream=true 时按字符以 SSE 逐段返回，每段间隔 token_delay 秒；
+非流式请求同样等待整段回复生成完（token_delay x 段数）后一次返回；客户端中途断开的流计入 cancelled_streams
+truncate=True 时流式回复发完内容后直接断开（没有 finish_reason 和 [DONE]），模拟上游中途失败
+throttle=N 时前 N 个请求返回 429（带 Retry-After: retry_after，为 None 时不带）；
+max_active 记录同时处理中的请求数峰值
+"""
+import asyncio
+import datetime
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+def _self_signed_cert(directory: str):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port: int, **options):
+    """在后台线程中运行 uvicorn，返回 (server, thread)，server.should_exit = True 后 join 线程即可停止"""
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", **options)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+class MockOpenAIServer:
+    def __init__(
+        self,
+        tls: bool = False,
+        reply: str = "你好，这是模拟回复。",
+        delay: float = 0.0,
+        token_delay: float = 0.0,
+        throttle: int = 0,
+        retry_after: Optional[str] = "0",
+        truncate: bool = False,
+    ):
+        self.tls = tls
+        self.reply = reply
+        self.delay = delay
+        self.token_delay = token_delay
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.truncate = truncate
+        self.requests = 0
+        self.throttled = 0
+        self.active = 0
+        self.max_active = 0
+        self.completed_streams = 0
+        self.cancelled_streams = 0
+        self.port = free_port()
+        self._tmp = tempfile.TemporaryDirectory()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://localhost:{self.port}/v1"
+
+    async def _chat(self, request: Request):
+        self.requests += 1
+        body = await request.json()
+        if self.throttled < self.throttle:
+            self.throttled += 1
+            headers = {"Retry-After": self.retry_after} if self.retry_after is not None else {}
+            return JSONResponse({"error": {"message": "Rate limit reached"}}, status_code=429, headers=headers)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if body.get("stream"):
+            # 流结束时 _stream 减少 active
+            return StreamingResponse(self._stream(body.get("model")), media_type="text/event-stream")
+        try:
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay * (len(self.reply) - 1))
+        finally:
+            self.active -= 1
+        return JSONResponse({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply}, "finish_reason": "stop"}],
+        })
+
+    async def _stream(self, model):
+        try:
+            for index, token in enumerate(self.reply):
+                if index and self.token_delay:
+                    await asyncio.sleep(self.token_delay)
+                chunk = {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            if self.truncate:
+                return
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+            self.completed_streams += 1
+        except BaseException:
+            self.cancelled_streams += 1
+            raise
+        finally:
+            self.active -= 1
+
+    def _app(self) -> Starlette:
+        return Starlette(routes=[Route("/v1/chat/completions", self._chat, methods=["POST"])])
+
+    def __enter__(self) -> "MockOpenAIServer":
+        options = {}
+        if self.tls:
+            cert_path, key_path = _self_signed_cert(self._tmp.name)
+            options = {"ssl_certfile": cert_path, "ssl_keyfile": key_path}
+            os.environ["SSL_CERT_FILE"] = cert_path
+        self._server, self._thread = start_server(self._app(), self.port, **options)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+        if self.tls:
+            os.environ.pop("SSL_CERT_FILE", None)
+        self._tmp.cleanup()
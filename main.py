@@ -4,14 +4,26 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from app.core.ai_cache import ai_cache
+from app.core.ai_client import ai_http
 from app.core.config import settings
 from app.core.database import engine, Base, AsyncSessionLocal
+from app.core.file_response import UploadStaticFiles
+from app.core.hash_pool import hash_pool
+from app.core.token_revocation import revocation_list
 from app.api.v1 import auth, files, admin, system, ai
 from app.services.cleanup import cleanup_expired_files
+from app.services.file_processing import shutdown_process_executor
+from app.services.file_reaper import run_reaper
+from app.services.quota import reconcile_user_usage
+from app.services.storage_reconcile import reconcile_storage
 from app.services.schema_bootstrap import ensure_sqlite_compat
+from app.services.search_index import ensure_search_index
+from app.services.stats_rollup import ensure_stats_rollup
 
 # 创建上传目录
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -26,12 +38,40 @@ async def _run_cleanup_job():
     async with AsyncSessionLocal() as session:
         await cleanup_expired_files(session, settings.CLEANUP_RETENTION_DAYS)
 
+
+async def _run_storage_reconcile_job():
+    async with AsyncSessionLocal() as session:
+        await reconcile_storage(session, repair=settings.RECONCILE_AUTO_REPAIR)
+
+
+async def _reconcile_quota_job():
+    async with AsyncSessionLocal() as session:
+        await reconcile_user_usage(session)
+
+
+async def _sync_revocations_job():
+    async with AsyncSessionLocal() as session:
+        await revocation_list.sync(session)
+
+
+async def _prune_revocations_job():
+    async with AsyncSessionLocal() as session:
+        await revocation_list.prune_expired(session)
+
+
+async def _prune_ai_cache_job():
+    await asyncio.to_thread(ai_cache.prune_disk)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时创建数据库表
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     await ensure_sqlite_compat(engine)
+    await ensure_search_index(engine)
+    async with AsyncSessionLocal() as session:
+        await ensure_stats_rollup(session)
+        await revocation_list.load(session)
 
     scheduler.add_job(
         _run_cleanup_job,
@@ -41,10 +81,59 @@ async def lifespan(app: FastAPI):
         id="cleanup_job",
         replace_existing=True,
     )
+    scheduler.add_job(
+        _run_storage_reconcile_job,
+        "cron",
+        hour=settings.RECONCILE_SCHEDULE_HOUR,
+        minute=settings.RECONCILE_SCHEDULE_MINUTE,
+        id="storage_reconcile_job",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _reconcile_quota_job,
+        "cron",
+        hour=settings.QUOTA_RECONCILE_HOUR,
+        minute=settings.QUOTA_RECONCILE_MINUTE,
+        id="quota_reconcile_job",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        run_reaper,
+        "interval",
+        seconds=settings.REAPER_INTERVAL_SECONDS,
+        id="file_reaper_job",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _sync_revocations_job,
+        "interval",
+        seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS,
+        id="token_revocation_sync_job",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _prune_revocations_job,
+        "interval",
+        minutes=settings.TOKEN_REVOCATION_PRUNE_MINUTES,
+        id="token_revocation_prune_job",
+        replace_existing=True,
+    )
+    if settings.AI_CACHE_DIR:
+        scheduler.add_job(
+            _prune_ai_cache_job,
+            "interval",
+            minutes=settings.AI_CACHE_PRUNE_MINUTES,
+            id="ai_cache_prune_job",
+            replace_existing=True,
+        )
     scheduler.start()
+    ai_http.start()
     yield
     # 关闭时清理资源
     scheduler.shutdown(wait=False)
+    hash_pool.shutdown()
+    shutdown_process_executor()
+    await ai_http.close()
     await engine.dispose()
 
 app = FastAPI(
@@ -65,7 +154,7 @@ app.add_middleware(
 
 # 挂载静态文件目录
 if os.path.exists(settings.UPLOAD_DIR):
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+    app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 if os.path.exists("./static"):
     app.mount("/static", StaticFiles(directory="./static"), name="static")
 
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 测试使用独立的临时数据库、上传目录和查询库，须在导入 app 之前设置
+_WORKDIR = tempfile.mkdtemp(prefix="wechat-manage-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_WORKDIR}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_WORKDIR, "uploads")
+os.environ["QUERY_STORE_PATH"] = os.path.join(_WORKDIR, "query_store.db")
+
+# main.py 按相对路径加载 templates/static
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    """整个测试会话共用一个应用实例（lifespan 中的调度器只能启动一次）"""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture()
+def register_user(app_client):
+    """注册一个新用户，返回带 Bearer 令牌的请求头"""
+
+    def register():
+        response = app_client.post(
+            "/api/v1/auth/register",
+            json={"username": f"u{uuid.uuid4().hex[:10]}", "password": "secret123", "nickname": "测试"},
+        )
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['data']['token']}"}
+
+    return register
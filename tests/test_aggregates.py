@@ -0,0 +1,63 @@
+"""
+跨文件汇总：可选度量与汇总结果都不包含已删除的文件
+
+用法: python -m pytest tests/test_aggregates.py
+"""
+import io
+
+import pandas as pd
+
+from app.api.v1 import files as files_api
+
+
+def _xlsx_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _process(app_client, headers, df: pd.DataFrame) -> str:
+    response = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={"file": ("a.xlsx", _xlsx_bytes(df), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+    assert response.status_code == 200, response.text
+    response = app_client.post(
+        "/api/v1/files/process", headers=headers, json={"fileId": response.json()["data"]["fileId"]}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["processedFileId"]
+
+
+def _measures(app_client, headers) -> list:
+    response = app_client.get("/api/v1/files/aggregates/measures", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_measures_exclude_deleted_files(app_client, register_user, monkeypatch):
+    # 软删除后、后台回收之前，事实表中的行仍然存在
+    async def no_reaper():
+        return None
+
+    monkeypatch.setattr(files_api, "run_reaper", no_reaper)
+    headers = register_user()
+    kept = _process(app_client, headers, pd.DataFrame({"会计月": [202501, 202502], "入库金额": [1, 2]}))
+    deleted = _process(app_client, headers, pd.DataFrame({"会计月": [202501], "数量": [5]}))
+    assert _measures(app_client, headers) == ["入库金额", "数量"]
+
+    assert app_client.delete(f"/api/v1/files/{deleted}", headers=headers).status_code == 200
+    assert _measures(app_client, headers) == ["入库金额"]
+
+    response = app_client.get("/api/v1/files/aggregates", headers=headers)
+    assert response.json()["data"]["measures"] == ["入库金额"]
+
+    assert app_client.delete(f"/api/v1/files/{kept}", headers=headers).status_code == 200
+    assert _measures(app_client, headers) == []
+
+
+def test_measures_are_per_user(app_client, register_user):
+    owner = register_user()
+    _process(app_client, owner, pd.DataFrame({"会计月": [202501], "入库金额": [1]}))
+    assert _measures(app_client, register_user()) == []
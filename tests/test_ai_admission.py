@@ -0,0 +1,142 @@
+"""
+AI 调用准入控制：上游 429 的重试与 Retry-After、队列已满时的 503、按请求方的排队上限
+上游为本地模拟接口（前若干个请求返回 429）
+
+用法: python -m pytest tests/test_ai_admission.py
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.ai_admission import AdmissionController
+from app.core.ai_client import ai_http
+from app.core.config import settings
+from app.services import ai_chat
+from mock_openai import MockOpenAIServer
+
+REPLY = "模拟回复"
+
+
+def _body(text: str) -> dict:
+    return {"model": "mock", "messages": [{"role": "user", "content": text}], "temperature": 0.7}
+
+
+@pytest.fixture()
+def controller(monkeypatch):
+    """每个测试使用独立的准入控制器，计数互不影响"""
+    controller = AdmissionController(max_concurrency=2, max_queue=8, max_queue_per_user=2, queue_timeout_seconds=10)
+    monkeypatch.setattr(ai_chat, "ai_admission", controller)
+    monkeypatch.setattr(settings, "AI_API_KEY", "test")
+    monkeypatch.setattr(settings, "AI_RETRY_BASE_DELAY_SECONDS", 0.01)
+    return controller
+
+
+def _run(monkeypatch, upstream: MockOpenAIServer, coroutine_factory):
+    """指向模拟上游后在新的事件循环中执行，客户端随循环创建和关闭"""
+    monkeypatch.setattr(settings, "AI_BASE_URL", upstream.base_url)
+
+    async def main():
+        ai_http._client = None
+        try:
+            return await coroutine_factory()
+        finally:
+            await ai_http.close()
+
+    return asyncio.run(main())
+
+
+def test_429_retried_after_retry_after(monkeypatch, controller):
+    with MockOpenAIServer(reply=REPLY, throttle=2, retry_after="1") as upstream:
+        started = time.perf_counter()
+        reply = _run(monkeypatch, upstream, lambda: ai_chat.admitted_complete(_body("retry"), "user-a"))
+        elapsed = time.perf_counter() - started
+
+    assert reply == REPLY
+    # 两次 429 各按 Retry-After 等待 1 秒
+    assert elapsed >= 2
+    assert upstream.requests == 3
+    assert upstream.throttled == 2
+    assert (controller.throttled, controller.retries) == (2, 2)
+
+
+def test_429_without_retry_after_uses_backoff(monkeypatch, controller):
+    with MockOpenAIServer(reply=REPLY, throttle=2, retry_after=None) as upstream:
+        started = time.perf_counter()
+        reply = _run(monkeypatch, upstream, lambda: ai_chat.admitted_complete(_body("backoff"), "user-a"))
+        elapsed = time.perf_counter() - started
+
+    assert reply == REPLY
+    assert elapsed < 1
+    assert upstream.requests == 3
+
+
+def test_retries_exhausted_returns_503_with_retry_after(monkeypatch, controller):
+    monkeypatch.setattr(settings, "AI_RETRY_MAX_ATTEMPTS", 1)
+    with MockOpenAIServer(reply=REPLY, throttle=10, retry_after="0") as upstream:
+        with pytest.raises(HTTPException) as excinfo:
+            _run(monkeypatch, upstream, lambda: ai_chat.admitted_complete(_body("exhausted"), "user-a"))
+
+    assert excinfo.value.status_code == 503
+    assert int(excinfo.value.headers["Retry-After"]) >= 1
+    assert upstream.requests == 2
+    assert controller.retries == 1
+
+
+def test_full_queue_rejects_with_503_and_retry_after(monkeypatch, controller):
+    controller.max_queue = 1
+
+    async def burst():
+        # 2 个占用名额，1 个排队，其余立即被拒绝
+        return await asyncio.gather(
+            *(ai_chat.admitted_complete(_body(f"full-{index}"), f"user-{index}") for index in range(5)),
+            return_exceptions=True,
+        )
+
+    with MockOpenAIServer(reply=REPLY, delay=0.2) as upstream:
+        outcomes = _run(monkeypatch, upstream, burst)
+
+    rejected = [outcome for outcome in outcomes if isinstance(outcome, HTTPException)]
+    assert [outcome for outcome in outcomes if outcome == REPLY] == [REPLY] * 3
+    assert len(rejected) == 2
+    for error in rejected:
+        assert error.status_code == 503
+        assert int(error.headers["Retry-After"]) >= 1
+    assert controller.rejected == 2
+    assert upstream.requests == 3
+    assert upstream.max_active <= controller.max_concurrency
+
+
+def test_per_requester_cap_only_limits_the_burst(monkeypatch, controller):
+    # 一个请求方突发 10 个请求，其余请求方各 2 个（不超过每个请求方的排队上限）
+    requesters = {"burst": 10, "user-a": 2, "user-b": 2, "user-c": 2}
+    rejected = {requester: 0 for requester in requesters}
+    succeeded = {requester: 0 for requester in requesters}
+
+    async def one(requester: str, index: int):
+        try:
+            await ai_chat.admitted_complete(_body(f"{requester}-{index}"), requester)
+            succeeded[requester] += 1
+        except HTTPException as e:
+            assert e.status_code == 503 and "Retry-After" in e.headers
+            rejected[requester] += 1
+
+    async def burst():
+        await asyncio.gather(*(
+            one(requester, index) for requester, count in requesters.items() for index in range(count)
+        ))
+
+    with MockOpenAIServer(reply=REPLY, delay=0.05, throttle=3, retry_after="0") as upstream:
+        _run(monkeypatch, upstream, burst)
+
+    assert rejected["burst"] > 0
+    assert {requester: rejected[requester] for requester in ("user-a", "user-b", "user-c")} == {
+        "user-a": 0, "user-b": 0, "user-c": 0
+    }
+    calls = sum(succeeded.values())
+    assert calls + sum(rejected.values()) == sum(requesters.values())
+    # 每次成功的调用各访问上游一次，另加被 429 后重试的次数
+    assert upstream.requests == calls + upstream.throttled
+    assert upstream.throttled == 3 and controller.retries == 3
+    assert upstream.max_active <= controller.max_concurrency
@@ -0,0 +1,137 @@
+"""
+/ai/chat 流式返回：首字节时间、完整回复的 done 事件与缓存、上游提前断开时的 error 事件
+上游为本地模拟接口，对话接口运行在真实的 uvicorn 上
+
+用法: python -m pytest tests/test_ai_stream.py
+"""
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.v1 import ai
+from app.core.ai_cache import ai_cache
+from app.core.ai_client import ai_http
+from app.core.config import settings
+from app.services.ai_chat import relay_stream
+from mock_openai import MockOpenAIServer, free_port, start_server
+
+REPLY = "这是一段用于测试流式输出的模拟回复。" * 2
+TOKEN_DELAY = 0.02
+
+
+@contextmanager
+def chat_server(monkeypatch, **mock_options):
+    """启动模拟上游和只包含对话接口的应用，返回 (应用地址, 模拟上游)"""
+    with MockOpenAIServer(reply=REPLY, token_delay=TOKEN_DELAY, **mock_options) as upstream:
+        monkeypatch.setattr(settings, "AI_BASE_URL", upstream.base_url)
+        monkeypatch.setattr(settings, "AI_API_KEY", "test")
+        # 客户端在 uvicorn 线程的事件循环中按需创建，随线程结束一起丢弃
+        ai_http._client = None
+        ai_cache.clear()
+        app = FastAPI()
+        app.include_router(ai.router, prefix="/api/v1/ai")
+        port = free_port()
+        server, thread = start_server(app, port)
+        try:
+            yield f"http://127.0.0.1:{port}", upstream
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+            ai_http._client = None
+            ai_cache.clear()
+
+
+def _parse_events(text: str) -> list:
+    """把 SSE 文本解析为 [(事件名, 数据)]，没有 event 行的为 message"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[5:].strip())
+        events.append((event, data))
+    return events
+
+
+def _chat(base_url: str, stream: bool, temperature: float = 0.7):
+    """返回 (首字节耗时, 完整响应耗时, 响应文本)"""
+    payload = {"messages": [{"role": "user", "content": "你好"}], "stream": stream, "temperature": temperature}
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        started = time.perf_counter()
+        with client.stream("POST", "/api/v1/ai/chat", json=payload) as response:
+            assert response.status_code == 200
+            first = None
+            chunks = []
+            for chunk in response.iter_bytes():
+                if first is None:
+                    first = time.perf_counter() - started
+                chunks.append(chunk)
+        return first, time.perf_counter() - started, b"".join(chunks).decode("utf-8")
+
+
+def test_stream_ttfb_below_full_reply(monkeypatch):
+    full_reply_seconds = TOKEN_DELAY * (len(REPLY) - 1)
+    with chat_server(monkeypatch) as (base_url, _):
+        _chat(base_url, True)
+        stream_ttfb, stream_total, _ = _chat(base_url, True)
+        plain_ttfb, _, _ = _chat(base_url, False)
+
+    # 流式首字节不等待整段回复生成，非流式则至少要等整段回复
+    assert plain_ttfb >= full_reply_seconds
+    assert stream_ttfb < full_reply_seconds / 2
+    assert stream_ttfb < plain_ttfb
+    assert stream_total >= full_reply_seconds
+
+
+def test_complete_stream_sends_done_and_is_cached(monkeypatch):
+    with chat_server(monkeypatch) as (base_url, upstream):
+        _, _, text = _chat(base_url, True, temperature=0)
+        events = _parse_events(text)
+        assert "".join(data["delta"] for event, data in events if event == "message") == REPLY
+        assert events[-1] == ("done", {"model": settings.AI_MODEL, "reply": REPLY, "cached": False})
+
+        _, _, text = _chat(base_url, True, temperature=0)
+        assert _parse_events(text)[-1][1]["cached"] is True
+        assert upstream.requests == 1
+
+
+def test_truncated_stream_sends_error_and_is_not_cached(monkeypatch):
+    with chat_server(monkeypatch, truncate=True) as (base_url, upstream):
+        for attempt in (1, 2):
+            _, _, text = _chat(base_url, True, temperature=0)
+            events = _parse_events(text)
+            assert events[-1][0] == "error"
+            assert "done" not in [event for event, _ in events]
+            # 不完整的回复没有写入缓存，再次请求仍然访问上游
+            assert upstream.requests == attempt
+        assert len(ai_cache) == 0
+
+
+def test_finish_reason_without_done_completes():
+    """部分兼容接口只发送 finish_reason 而不发送 [DONE]"""
+
+    class Ticket:
+        released = False
+
+        def release(self):
+            self.released = True
+
+    async def collect():
+        lines = [
+            'data: {"choices": [{"delta": {"content": "部分"}, "finish_reason": null}]}',
+            'data: {"choices": [{"delta": {}, "finish_reason": "length"}]}',
+        ]
+        resp = httpx.Response(200, content="\n\n".join(lines).encode("utf-8"))
+        ticket = Ticket()
+        chunks = [chunk async for chunk in relay_stream(resp, ticket, {"model": "m", "temperature": 0.7})]
+        return b"".join(chunks).decode("utf-8"), ticket
+
+    text, ticket = asyncio.run(collect())
+    assert _parse_events(text)[-1] == ("done", {"model": "m", "reply": "部分", "cached": False})
+    assert ticket.released
@@ -0,0 +1,68 @@
+"""
+合并汇总：提交前失败时不留下规范形式和物理文件，成功时规范形式以正式 id 保存
+
+用法: python -m pytest tests/test_consolidate.py
+"""
+import io
+import os
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services import consolidation
+from app.services.result_formats import RESULTS_DIR, canonical_path
+
+
+def _xlsx_bytes(amount: float) -> bytes:
+    df = pd.DataFrame({"会计月": [202501, 202502], "入库金额": [amount, amount * 2]})
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _upload(app_client, headers, amount: float) -> str:
+    response = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={
+            "file": ("a.xlsx", _xlsx_bytes(amount), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["fileId"]
+
+
+def _consolidated_results() -> set:
+    """结果目录和上传目录中属于合并结果的文件"""
+    names = set()
+    for dirpath, _, filenames in os.walk(settings.UPLOAD_DIR):
+        names.update(os.path.join(dirpath, name) for name in filenames if "consolidated_" in name)
+    return names
+
+
+def test_consolidate_saves_canonical(app_client, register_user):
+    headers = register_user()
+    file_ids = [_upload(app_client, headers, 1.0), _upload(app_client, headers, 10.0)]
+
+    response = app_client.post("/api/v1/files/consolidate", headers=headers, json={"fileIds": file_ids})
+    assert response.status_code == 200, response.text
+    consolidated_id = response.json()["data"]["processedFileId"]
+    assert os.path.exists(canonical_path(consolidated_id))
+    canonical_dir = os.path.join(settings.UPLOAD_DIR, RESULTS_DIR, "canonical")
+    # 临时 id 形如 {id}.{uuid}，提交后不再留下
+    assert not [name for name in os.listdir(canonical_dir) if name.startswith(consolidated_id) and name.count(".") > 2]
+
+
+def test_failed_consolidate_leaves_nothing(app_client, register_user, monkeypatch):
+    headers = register_user()
+    file_ids = [_upload(app_client, headers, 1.0), _upload(app_client, headers, 10.0)]
+    before = _consolidated_results()
+
+    async def broken_record_file_added(*args, **kwargs):
+        raise RuntimeError("提交前失败")
+
+    monkeypatch.setattr(consolidation, "record_file_added", broken_record_file_added)
+    response = app_client.post("/api/v1/files/consolidate", headers=headers, json={"fileIds": file_ids})
+    assert response.status_code == 500
+
+    assert _consolidated_results() == before
@@ -0,0 +1,87 @@
+"""
+下载响应的缓存校验与断点续传：304 / If-Range / Range
+
+用法: python -m pytest tests/test_file_response.py
+"""
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.core.file_response import UploadStaticFiles
+
+CONTENT = bytes(range(256)) * 16
+CAS_NAME = "ab" * 32 + ".xlsx"
+
+
+@pytest.fixture()
+def client(tmp_path):
+    (tmp_path / "report.csv").write_bytes(CONTENT)
+    (tmp_path / CAS_NAME).write_bytes(CONTENT)
+    app = Starlette(routes=[Mount("/uploads", UploadStaticFiles(directory=str(tmp_path)))])
+    return TestClient(app)
+
+
+def test_full_response_has_validators(client):
+    resp = client.get("/uploads/report.csv")
+    assert resp.status_code == 200
+    assert resp.content == CONTENT
+    assert resp.headers["etag"]
+    assert resp.headers["last-modified"]
+    assert resp.headers["accept-ranges"] == "bytes"
+
+
+def test_cas_file_uses_content_hash_as_etag(client):
+    resp = client.get(f"/uploads/{CAS_NAME}")
+    assert resp.headers["etag"] == f'"{os.path.splitext(CAS_NAME)[0]}"'
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/uploads/report.csv").headers["etag"]
+    resp = client.get("/uploads/report.csv", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    # 弱比较与多个候选值
+    resp = client.get("/uploads/report.csv", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert resp.status_code == 304
+
+
+def test_if_none_match_mismatch_returns_200(client):
+    resp = client.get("/uploads/report.csv", headers={"If-None-Match": '"stale"'})
+    assert resp.status_code == 200
+    assert resp.content == CONTENT
+
+
+def test_if_modified_since_returns_304(client):
+    last_modified = client.get("/uploads/report.csv").headers["last-modified"]
+    resp = client.get("/uploads/report.csv", headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 304
+
+
+def test_range_resumes_download(client):
+    resp = client.get("/uploads/report.csv", headers={"Range": "bytes=1000-"})
+    assert resp.status_code == 206
+    assert resp.content == CONTENT[1000:]
+    assert resp.headers["content-range"] == f"bytes 1000-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+@pytest.mark.parametrize("validator", ["etag", "last-modified"])
+def test_matching_if_range_returns_206(client, validator):
+    value = client.get("/uploads/report.csv").headers[validator]
+    resp = client.get("/uploads/report.csv", headers={"Range": "bytes=0-99", "If-Range": value})
+    assert resp.status_code == 206
+    assert resp.content == CONTENT[:100]
+
+
+def test_mismatched_if_range_returns_full_file(client):
+    resp = client.get("/uploads/report.csv", headers={"Range": "bytes=0-99", "If-Range": '"stale"'})
+    assert resp.status_code == 200
+    assert resp.content == CONTENT
+
+
+def test_unsatisfiable_range_returns_416(client):
+    resp = client.get("/uploads/report.csv", headers={"Range": f"bytes={len(CONTENT) + 10}-"})
+    assert resp.status_code == 416
@@ -0,0 +1,23 @@
+"""
+已认证用户缓存：登录更新用户记录后，缓存中的旧对象随之失效
+
+用法: python -m pytest tests/test_principal_cache.py
+"""
+import uuid
+
+from app.core.principal_cache import principal_cache
+
+
+def test_login_invalidates_cached_principal(app_client):
+    credentials = {"username": f"pc{uuid.uuid4().hex[:10]}", "password": "secret123"}
+    response = app_client.post("/api/v1/auth/register", json={**credentials, "nickname": "缓存"})
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+
+    response = app_client.get("/api/v1/auth/profile", headers={"Authorization": f"Bearer {data['token']}"})
+    assert response.status_code == 200
+    assert principal_cache.get(data["id"]) is not None
+
+    response = app_client.post("/api/v1/auth/login", json=credentials)
+    assert response.status_code == 200, response.text
+    assert principal_cache.get(data["id"]) is None
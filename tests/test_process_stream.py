@@ -0,0 +1,104 @@
+"""
+汇总后直接流式返回：在进程池中汇总、超出内存预算时逐行汇总、旧文件补做解压检查
+
+用法: python -m pytest tests/test_process_stream.py
+"""
+import io
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services.excel_processor import ExcelProcessor
+
+
+def _xlsx_bytes() -> bytes:
+    df = pd.DataFrame({"会计月": [202501, 202501, 202502], "入库金额": [1, 2, 4]})
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _upload(app_client, headers) -> str:
+    response = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={"file": ("a.xlsx", _xlsx_bytes(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["fileId"]
+
+
+def _stream_csv(app_client, headers, file_id: str):
+    return app_client.get(f"/api/v1/files/process-stream/{file_id}", headers=headers, params={"format": "csv"})
+
+
+def _database_path() -> str:
+    return os.environ["DATABASE_URL"].split("///", 1)[1]
+
+
+def _estimate_of(file_id: str):
+    with sqlite3.connect(_database_path()) as conn:
+        return conn.execute("SELECT estimated_memory_bytes FROM files WHERE id = ?", (file_id,)).fetchone()[0]
+
+
+def _forget_estimate(file_id: str) -> None:
+    """模拟上传早于估算功能的记录"""
+    with sqlite3.connect(_database_path()) as conn:
+        conn.execute(
+            "UPDATE files SET estimated_rows = NULL, estimated_memory_bytes = NULL WHERE id = ?", (file_id,)
+        )
+
+
+def _rows(text: str) -> list:
+    return pd.read_csv(io.StringIO(text)).to_dict("records")
+
+
+@pytest.fixture()
+def no_load_in_api_process(monkeypatch):
+    """汇总在进程池中执行，API 进程内不应整表载入"""
+
+    def fail(self):
+        raise AssertionError("API 进程中调用了 load_file")
+
+    monkeypatch.setattr(ExcelProcessor, "load_file", fail)
+
+
+def test_stream_aggregates_in_process_pool(app_client, register_user, no_load_in_api_process):
+    headers = register_user()
+    response = _stream_csv(app_client, headers, _upload(app_client, headers))
+    assert response.status_code == 200, response.text
+    assert _rows(response.text) == [{"会计月": 202501, "入库金额": 3}, {"会计月": 202502, "入库金额": 4}]
+
+
+def test_stream_over_budget_matches_full_load(app_client, register_user, monkeypatch):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+    expected = _rows(_stream_csv(app_client, headers, file_id).text)
+
+    monkeypatch.setattr(settings, "PARSE_MEMORY_BUDGET_BYTES", 1)
+    response = _stream_csv(app_client, headers, file_id)
+    assert response.status_code == 200, response.text
+    assert _rows(response.text) == expected
+
+
+def test_stream_backfills_estimate_for_legacy_file(app_client, register_user):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+    _forget_estimate(file_id)
+
+    assert _stream_csv(app_client, headers, file_id).status_code == 200
+    assert _estimate_of(file_id) is not None
+
+
+def test_stream_rejects_legacy_zip_bomb(app_client, register_user, monkeypatch, no_load_in_api_process):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+    _forget_estimate(file_id)
+
+    monkeypatch.setattr(settings, "WORKBOOK_MAX_UNCOMPRESSED_BYTES", 1)
+    response = _stream_csv(app_client, headers, file_id)
+    assert response.status_code == 400
+    assert _estimate_of(file_id) is None
@@ -0,0 +1,44 @@
+"""
+物理删除：物理文件在批次提交成功后才删除，提交前失败时记录和文件都保持完好
+
+用法: python -m pytest tests/test_purge.py
+"""
+import io
+
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services import cleanup
+
+
+def _xlsx_bytes() -> bytes:
+    df = pd.DataFrame({"会计月": [202501], "入库金额": [1.0], "备注": ["purge"]})
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_failed_batch_keeps_files(app_client, register_user, monkeypatch):
+    headers = register_user()
+    content = _xlsx_bytes()
+    response = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={"file": ("a.xlsx", content, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+    assert response.status_code == 200, response.text
+    file_id = response.json()["data"]["fileId"]
+
+    async def broken_record_files_removed(*args, **kwargs):
+        raise RuntimeError("提交前失败")
+
+    # 所有文件都已过期，第一批在提交前失败
+    monkeypatch.setattr(settings, "CLEANUP_RETENTION_DAYS", -1)
+    monkeypatch.setattr(cleanup, "record_files_removed", broken_record_files_removed)
+    with pytest.raises(RuntimeError):
+        app_client.post("/api/v1/admin/cleanup/run")
+
+    response = app_client.get(f"/api/v1/files/direct-download/{file_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.content == content
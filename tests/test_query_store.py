@@ -0,0 +1,57 @@
+"""
+查询索引：按请求的工作表导入原始文件，处理结果导入完整的规范形式
+
+用法: python -m pytest tests/test_query_store.py
+"""
+import io
+
+import pandas as pd
+
+
+def _xlsx_bytes() -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        pd.DataFrame({"会计月": [202501, 202502], "入库金额": [1.0, 2.0]}).to_excel(writer, sheet_name="A", index=False)
+        pd.DataFrame({"会计月": [202503], "入库金额": [8.0]}).to_excel(writer, sheet_name="B", index=False)
+    return buffer.getvalue()
+
+
+def _upload(app_client, headers) -> str:
+    response = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={"file": ("a.xlsx", _xlsx_bytes(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["fileId"]
+
+
+def _months(app_client, headers, file_id: str, **params) -> list:
+    response = app_client.post(f"/api/v1/files/query-store/{file_id}", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    response = app_client.post(f"/api/v1/files/query/{file_id}", headers=headers, json={"limit": 100})
+    assert response.status_code == 200, response.text
+    return [row["会计月"] for row in response.json()["data"]["rows"]]
+
+
+def test_ingest_requested_sheet(app_client, register_user):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+
+    assert _months(app_client, headers, file_id) == [202501, 202502]
+    assert _months(app_client, headers, file_id, sheet="B") == [202503]
+
+    response = app_client.post(f"/api/v1/files/query-store/{file_id}", headers=headers, params={"sheet": "C"})
+    assert response.status_code == 400
+
+
+def test_ingest_processed_result(app_client, register_user):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+    response = app_client.post(
+        "/api/v1/files/process", headers=headers, json={"fileId": file_id, "sheets": ["A", "B"]}
+    )
+    assert response.status_code == 200, response.text
+    processed_id = response.json()["data"]["processedFileId"]
+
+    assert sorted(_months(app_client, headers, processed_id)) == [202501, 202502, 202503]
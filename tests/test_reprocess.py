@@ -0,0 +1,101 @@
+"""
+重新处理同一原始文件：成功时替换上一次的结果，失败时上一次的结果（记录与物理文件）保持可用
+
+用法: python -m pytest tests/test_reprocess.py
+"""
+import io
+import os
+from typing import List
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services import file_processing
+from app.services.result_formats import RESULTS_DIR
+
+
+def _xlsx_bytes() -> bytes:
+    """两个工作表的数据不同，分别处理时得到内容不同的结果文件"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        pd.DataFrame({"会计月": [202501, 202501, 202502], "入库金额": [1.0, 2.0, 4.0]}).to_excel(
+            writer, sheet_name="A", index=False
+        )
+        pd.DataFrame({"会计月": [202503], "入库金额": [8.0]}).to_excel(writer, sheet_name="B", index=False)
+    return buffer.getvalue()
+
+
+def _upload(app_client, headers) -> str:
+    response = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={"file": ("a.xlsx", _xlsx_bytes(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["fileId"]
+
+
+def _process(app_client, headers, file_id: str, sheets: List[str]):
+    return app_client.post("/api/v1/files/process", headers=headers, json={"fileId": file_id, "sheets": sheets})
+
+
+def _download_csv(app_client, headers, file_id: str) -> str:
+    response = app_client.get(f"/api/v1/files/download/{file_id}", headers=headers, params={"format": "csv"})
+    assert response.status_code == 200, response.text
+    download = app_client.get(response.json()["data"]["downloadUrl"])
+    assert download.status_code == 200
+    return download.text
+
+
+def _download_xlsx(app_client, headers, file_id: str) -> bytes:
+    response = app_client.get(f"/api/v1/files/direct-download/{file_id}", headers=headers)
+    assert response.status_code == 200
+    return response.content
+
+
+def _staged_canonicals() -> list:
+    canonical_dir = os.path.join(settings.UPLOAD_DIR, RESULTS_DIR, "canonical")
+    return [name for name in os.listdir(canonical_dir) if name.count(".") > 2]
+
+
+def test_reprocess_replaces_previous_result(app_client, register_user):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+
+    first = _process(app_client, headers, file_id, ["A"])
+    assert first.status_code == 200, first.text
+    old_path = first.json()["data"]["processedFilePath"]
+    second = _process(app_client, headers, file_id, ["B"])
+    assert second.status_code == 200, second.text
+    processed_id = second.json()["data"]["processedFileId"]
+    assert processed_id == first.json()["data"]["processedFileId"]
+
+    csv_text = _download_csv(app_client, headers, processed_id)
+    assert "202503" in csv_text and "202501" not in csv_text
+    # 提交后旧的物理文件被删除，新文件完好
+    assert second.json()["data"]["processedFilePath"] != old_path
+    assert not os.path.exists(old_path)
+    assert _download_xlsx(app_client, headers, processed_id)
+    assert _staged_canonicals() == []
+
+
+def test_failed_reprocess_keeps_previous_result(app_client, register_user, monkeypatch):
+    headers = register_user()
+    file_id = _upload(app_client, headers)
+    first = _process(app_client, headers, file_id, ["A"])
+    assert first.status_code == 200, first.text
+    processed_id = first.json()["data"]["processedFileId"]
+    csv_before = _download_csv(app_client, headers, processed_id)
+    xlsx_before = _download_xlsx(app_client, headers, processed_id)
+
+    async def broken_write_facts(*args, **kwargs):
+        raise RuntimeError("写入事实表失败")
+
+    # 新结果（内容不同）已生成、即将提交时失败
+    monkeypatch.setattr(file_processing, "write_facts", broken_write_facts)
+    failed = _process(app_client, headers, file_id, ["B"])
+    assert failed.status_code == 500
+
+    assert _download_csv(app_client, headers, processed_id) == csv_before
+    assert _download_xlsx(app_client, headers, processed_id) == xlsx_before
+    assert _staged_canonicals() == []
@@ -0,0 +1,44 @@
+"""
+关键词搜索索引：索引与原表不一致时，通过管理接口全量重建后恢复
+
+用法: python -m pytest tests/test_search_index.py
+"""
+import os
+import sqlite3
+import uuid
+
+import pytest
+
+from app.services.search_index import fts_enabled
+
+
+def _database_path() -> str:
+    return os.environ["DATABASE_URL"].split("///", 1)[1]
+
+
+def _search_users(app_client, keyword: str) -> list:
+    response = app_client.get("/api/v1/admin/users", params={"keyword": keyword})
+    assert response.status_code == 200, response.text
+    return [item["username"] for item in response.json()["data"]["list"]]
+
+
+def test_rebuild_restores_drifted_index(app_client):
+    if not fts_enabled():
+        pytest.skip("当前 SQLite 不支持 FTS5 trigram")
+
+    username = f"idx{uuid.uuid4().hex[:10]}"
+    response = app_client.post(
+        "/api/v1/auth/register", json={"username": username, "password": "secret123", "nickname": "索引"}
+    )
+    assert response.status_code == 200, response.text
+    assert _search_users(app_client, username) == [username]
+
+    # 模拟 VACUUM 后 rowid 变化导致索引失效
+    with sqlite3.connect(_database_path()) as conn:
+        conn.execute("INSERT INTO users_fts(users_fts) VALUES ('delete-all')")
+    assert _search_users(app_client, username) == []
+
+    response = app_client.post("/api/v1/admin/search-index/rebuild")
+    assert response.status_code == 200, response.text
+    assert response.json()["data"] == {"rebuilt": True}
+    assert _search_users(app_client, username) == [username]
@@ -0,0 +1,124 @@
+"""
+签名下载链接：有效、过期、篡改、他人文件与路径越界
+
+用法: python -m pytest tests/test_signed_url.py
+"""
+import io
+import json
+import time
+from typing import Optional
+
+import pandas as pd
+import pytest
+
+from app.core import signed_url
+from app.core.config import settings
+from app.core.signed_url import _b64decode, _b64encode, sign_download, verify_download
+
+
+def _tamper_payload(token: str, **changes) -> str:
+    encoded_payload, encoded_signature = token.split(".", 1)
+    payload = json.loads(_b64decode(encoded_payload))
+    payload.update(changes)
+    return f"{_b64encode(json.dumps(payload, separators=(',', ':')).encode())}.{encoded_signature}"
+
+
+def _xlsx_bytes() -> bytes:
+    df = pd.DataFrame({"会计月": [202501, 202502], "入库金额": [1.0, 2.0]})
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+# ---- 令牌本身 ----
+
+def test_valid_token_round_trip():
+    token = sign_download("cas/ab/cd/file.xlsx", "user_a", "汇总结果.xlsx")
+    signed = verify_download(token)
+    assert signed is not None
+    assert (signed.path, signed.owner_id, signed.filename) == ("cas/ab/cd/file.xlsx", "user_a", "汇总结果.xlsx")
+
+
+def test_expired_token_rejected():
+    token = sign_download("a.xlsx", "user_a", "a.xlsx", expires_in=60)
+    assert verify_download(token, now=time.time() + 59) is not None
+    assert verify_download(token, now=time.time() + 61) is None
+
+
+def test_default_expiry_follows_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_URL_EXPIRE_SECONDS", 30)
+    signed = verify_download(sign_download("a.xlsx", "user_a", "a.xlsx"))
+    assert signed.expires_at - time.time() <= 30
+
+
+@pytest.mark.parametrize("changes", [{"p": "other.xlsx"}, {"u": "user_b"}, {"n": "x.xlsx"}, {"e": 2 ** 40}])
+def test_tampered_payload_rejected(changes):
+    token = sign_download("a.xlsx", "user_a", "a.xlsx")
+    assert verify_download(_tamper_payload(token, **changes)) is None
+
+
+@pytest.mark.parametrize("token", ["", "abc", "abc.def", "....", "not-base64!.also-not!"])
+def test_malformed_token_rejected(token):
+    assert verify_download(token) is None
+
+
+def test_signature_from_another_key_rejected(monkeypatch):
+    token = sign_download("a.xlsx", "user_a", "a.xlsx")
+    monkeypatch.setattr(signed_url, "_SIGNING_KEY", b"another-key")
+    assert verify_download(token) is None
+
+
+# ---- 下载接口 ----
+
+def _upload(app_client, headers) -> str:
+    upload = app_client.post(
+        "/api/v1/files/upload",
+        headers=headers,
+        files={"file": ("台账.xlsx", _xlsx_bytes(), "application/octet-stream")},
+    )
+    assert upload.status_code == 200, upload.text
+    return upload.json()["data"]["fileId"]
+
+
+def _download_url(app_client, headers, file_id: Optional[str] = None) -> str:
+    file_id = file_id or _upload(app_client, headers)
+    response = app_client.get(f"/api/v1/files/download/{file_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["downloadUrl"]
+
+
+def test_signed_download_serves_file(app_client, register_user):
+    url = _download_url(app_client, register_user())
+    response = app_client.get(url)
+    assert response.status_code == 200
+    assert response.content[:2] == b"PK"
+
+
+def test_expired_link_returns_403(app_client, register_user, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_URL_EXPIRE_SECONDS", -1)
+    url = _download_url(app_client, register_user())
+    assert app_client.get(url).status_code == 403
+
+
+def test_tampered_link_returns_403(app_client, register_user):
+    url = _download_url(app_client, register_user())
+    prefix, token = url.rsplit("/", 1)
+    assert app_client.get(f"{prefix}/{_tamper_payload(token, n='other.xlsx')}").status_code == 403
+    assert app_client.get(f"{prefix}/{token[:-4]}AAAA").status_code == 403
+
+
+def test_link_cannot_be_moved_to_another_user(app_client, register_user):
+    owner_headers, other_headers = register_user(), register_user()
+    file_id = _upload(app_client, owner_headers)
+    url = _download_url(app_client, owner_headers, file_id)
+    prefix, token = url.rsplit("/", 1)
+    # 改写所有者会破坏签名
+    assert app_client.get(f"{prefix}/{_tamper_payload(token, u='someone-else')}").status_code == 403
+    # 其他用户不能为该文件生成链接
+    assert app_client.get(f"/api/v1/files/download/{file_id}", headers=other_headers).status_code == 404
+
+
+@pytest.mark.parametrize("path", ["../outside.txt", "../../etc/passwd", "/etc/passwd"])
+def test_path_escape_rejected_even_with_valid_signature(app_client, path):
+    token = sign_download(path, "user_a", "x.txt")
+    assert app_client.get(f"/api/v1/files/signed-download/{token}").status_code == 403
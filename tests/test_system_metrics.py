@@ -0,0 +1,19 @@
+"""
+运行指标：启用管理员认证后只对管理员开放
+
+用法: python -m pytest tests/test_system_metrics.py
+"""
+from app.core.config import settings
+
+
+def test_metrics_require_admin(app_client, register_user, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_AUTH_ENABLED", True)
+
+    assert app_client.get("/api/v1/system/metrics").status_code == 401
+    assert app_client.get("/api/v1/system/metrics", headers=register_user()).status_code == 403
+
+
+def test_metrics_without_admin_auth(app_client):
+    response = app_client.get("/api/v1/system/metrics")
+    assert response.status_code == 200, response.text
+    assert set(response.json()["data"]) == {"passwordHashPool", "aiCache", "aiAdmission"}
@@ -0,0 +1,31 @@
+"""
+令牌注销：同一令牌被并发注销时都成功，只保留一条记录
+
+用法: python -m pytest tests/test_token_revocation.py
+"""
+import asyncio
+from datetime import datetime, timedelta
+import uuid
+
+from sqlalchemy import func, select
+
+from app.core.database import AsyncSessionLocal
+from app.core.token_revocation import revocation_list
+from app.models.revoked_token import RevokedToken
+
+
+def test_concurrent_revoke_same_jti(app_client):
+    jti = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    async def revoke():
+        async with AsyncSessionLocal() as session:
+            await revocation_list.revoke(session, jti, "u", expires_at)
+
+    async def run():
+        await asyncio.gather(*(revoke() for _ in range(4)))
+        async with AsyncSessionLocal() as session:
+            return await session.scalar(select(func.count()).where(RevokedToken.jti == jti))
+
+    assert app_client.portal.call(run) == 1
+    assert revocation_list.is_revoked(jti)